@@ -0,0 +1,160 @@
+# bench_java_scanner.py
+# 旧実装（正規表現を5回走らせる parse_java_file）と
+# 1パススキャナ版 parse_java_source の速度・出力一致を比較する
+
+import re
+import random
+import time
+from pathlib import Path
+
+from extract_java_metadata import parse_java_source, detect_class_role, to_rel_path
+
+# ===== 設定 =====
+BASE_DIR = Path(__file__).resolve().parents[2]
+SAMPLE_DIR = BASE_DIR / "dummy_sample"
+SYNTHETIC_FILES = 5000
+REPEAT = 5
+RANDOM_SEED = 42
+
+
+# ===== 旧実装（比較用にそのまま保持） =====
+def legacy_split_camel_case(name):
+    tokens = re.findall(
+        r'[A-Z]?[a-z]+|[A-Z]+(?=[A-Z]|$)',
+        name
+    )
+    return [t.lower() for t in tokens]
+
+
+def legacy_parse_java_source(content, rel_path):
+    package_match = re.search(r'package\s+([\w\.]+);', content)
+    if not package_match:
+        return None
+    package = package_match.group(1)
+
+    class_match = re.search(
+        r'(public\s+)?(abstract\s+)?(class|interface)\s+(\w+)',
+        content
+    )
+    if not class_match:
+        return None
+
+    class_name = class_match.group(4)
+
+    imports = re.findall(r'import\s+([\w\.]+);', content)
+    imports = [i for i in imports if not i.startswith("java.lang")]
+
+    method_names = re.findall(
+        r'public\s+[^\s]+\s+(\w+)\s*\(',
+        content
+    )
+
+    return {
+        "file_path": rel_path,
+        "package": package,
+        "package_tokens": package.split("."),
+        "class_name": class_name,
+        "class_name_tokens": legacy_split_camel_case(class_name),
+        "class_role": detect_class_role(class_name),
+        "imports": imports,
+        "import_packages": list(
+            dict.fromkeys(".".join(i.split(".")[:-1]) for i in imports)
+        ),
+        "methods": [{"name": m} for m in method_names]
+    }
+
+
+# ===== 合成コーパス =====
+WORDS = [
+    "user", "order", "item", "payment", "account", "service", "controller",
+    "repository", "config", "event", "handler", "factory", "builder", "cache",
+]
+
+
+def camel(rng, n):
+    return "".join(rng.choice(WORDS).capitalize() for _ in range(n))
+
+
+def synthetic_source(rng):
+    pkg = "com.example." + ".".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+    lines = [
+        "/*",
+        " * Licensed under the Apache License. This class is generated.",
+        " */",
+        f"package {pkg};",
+        "",
+    ]
+    if rng.random() < 0.3:
+        # package と import の間のコメント（中の "class" で import の走査を止めない）
+        lines.append(rng.choice([
+            "// Helper class for parsing",
+            "/* Imports for the interface below. */",
+        ]))
+    for _ in range(rng.randint(3, 25)):
+        lines.append(f"import com.example.{rng.choice(WORDS)}.{camel(rng, 2)};")
+    lines.append("import java.lang.String;")
+    lines.append("import static org.junit.Assert.assertEquals;")
+    lines.append("")
+
+    kind = rng.choice(["class", "interface", "abstract class"])
+    lines.append(f"public {kind} {camel(rng, 2)} {{")
+
+    for _ in range(rng.randint(5, 60)):
+        name = rng.choice(WORDS) + camel(rng, 1)
+        ret = rng.choice(["void", "int", "String", "List<String>", "static void"])
+        lines.append(f"    /** Returns the {name}. */")
+        lines.append(f"    public {ret} {name}(int a, String b) {{")
+        for _ in range(rng.randint(1, 8)):
+            lines.append(f"        a += {rng.choice(WORDS)}.size(); // call helper")
+        lines.append("    }")
+        lines.append("")
+
+    if rng.random() < 0.3:
+        lines.append(f"    public static class {camel(rng, 1)}Inner {{ }}")
+    if rng.random() < 0.2:
+        lines.append(f"    public enum {camel(rng, 1)}Kind {{ A, B }}")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def load_sample():
+    sources = []
+    for p in sorted(SAMPLE_DIR.rglob("*.java")):
+        with open(p, encoding="utf-8", errors="ignore") as f:
+            sources.append((to_rel_path(p, SAMPLE_DIR), f.read()))
+    return sources
+
+
+# ===== 計測 =====
+def bench(name, func, sources):
+    best = float("inf")
+    results = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        results = [func(content, rel) for rel, content in sources]
+        best = min(best, time.perf_counter() - start)
+    total_mb = sum(len(c) for _, c in sources) / 1e6
+    print(f"  {name:8s}: {best * 1000:9.2f} ms  ({total_mb / best:7.1f} MB/s)")
+    return best, results
+
+
+def run(label, sources):
+    print(f"[BENCH] {label}: {len(sources)} files")
+    t_old, r_old = bench("legacy", legacy_parse_java_source, sources)
+    t_new, r_new = bench("scanner", parse_java_source, sources)
+
+    mismatches = [rel for (rel, _), a, b in zip(sources, r_old, r_new) if a != b]
+    print(f"  speedup = {t_old / t_new:.2f}x, mismatches = {len(mismatches)}")
+    for rel in mismatches[:5]:
+        print(f"    [DIFF] {rel}")
+
+
+if __name__ == "__main__":
+    run("dummy_sample", load_sample())
+
+    rng = random.Random(RANDOM_SEED)
+    synthetic = [
+        (f"gen/File{i}.java", synthetic_source(rng))
+        for i in range(SYNTHETIC_FILES)
+    ]
+    run("synthetic", synthetic)
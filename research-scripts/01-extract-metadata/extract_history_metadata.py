@@ -0,0 +1,315 @@
+# extract_history_metadata.py
+# チェックアウトせずに git のオブジェクトストアから
+# 各コミット時点の Java ファイルのメタデータを抽出する
+
+import json
+import subprocess
+from collections import OrderedDict
+from pathlib import Path
+
+from extract_java_metadata import parse_java_source, decode_java_source
+from java_walker import is_target_path
+
+# ===== パス設定 =====
+BASE_DIR = Path(__file__).resolve().parents[2]        # java-data/
+OUTPUT_DIR = BASE_DIR / "research-scripts" / "outputs" / "metadata_history"
+
+# ===== 設定 =====
+MAX_REVISIONS = None     # None なら HEAD から辿れる全コミット
+TARGET_EXT = ".java"
+TREE_CACHE_SIZE = 20_000   # 展開済みサブツリーを覚えておく数（LRU、ルートツリーは入れない）
+SNAPSHOT_CACHE_SIZE = 16   # 差分の基準にする直近のリビジョンの {パス: blob id} を覚えておく数
+HISTORY_VERSION = 2        # 保存形式を変えたら上げる（古い形式はリビジョンを取り直す。blob は使い回す）
+
+
+class GitBlobReader:
+    """
+    `git cat-file --batch` を1プロセスだけ起動し続け、
+    オブジェクト ID を渡して中身を読む
+    """
+
+    def __init__(self, repo_dir: Path):
+        self.proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=repo_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def read(self, object_id):
+        """
+        (type, 中身 bytes) を返す。存在しなければ (None, None)
+        """
+        self.proc.stdin.write(object_id.encode("ascii") + b"\n")
+        self.proc.stdin.flush()
+
+        header = self.proc.stdout.readline().split()
+        if len(header) != 3:            # "<id> missing"
+            return None, None
+
+        _, obj_type, size = header
+        data = self.proc.stdout.read(int(size))
+        self.proc.stdout.read(1)        # 末尾の改行
+        return obj_type.decode("ascii"), data
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            self.proc.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_tree(data: bytes):
+    """
+    tree オブジェクト（バイナリ）を (mode, name, object_id) に分解
+    """
+    entries = []
+    pos = 0
+    while pos < len(data):
+        space = data.index(b" ", pos)
+        nul = data.index(b"\0", space)
+        mode = data[pos:space].decode("ascii")
+        name = data[space + 1:nul].decode("utf-8", errors="surrogateescape")
+        object_id = data[nul + 1:nul + 21].hex()
+        entries.append((mode, name, object_id))
+        pos = nul + 21
+    return entries
+
+
+def parse_commit(data: bytes):
+    """
+    コミットオブジェクト → (tree id, 最初の親のコミット id または None)
+    """
+    tree_id = parent = None
+    for line in data.split(b"\n"):
+        if not line:
+            break                       # ヘッダの終わり
+        key, _, value = line.partition(b" ")
+        if key == b"tree":
+            tree_id = value.decode("ascii")
+        elif key == b"parent" and parent is None:
+            parent = value.decode("ascii")
+    return tree_id, parent
+
+
+def diff_files(before, after):
+    """
+    {パス: blob id} 2つ → 差分 {added, modified, removed}
+    """
+    return {
+        "added": {p: b for p, b in after.items() if p not in before},
+        "modified": {p: b for p, b in after.items() if p in before and before[p] != b},
+        "removed": sorted(p for p in before if p not in after),
+    }
+
+
+def apply_diff(files, delta):
+    for path in delta["removed"]:
+        files.pop(path, None)
+    files.update(delta["added"])
+    files.update(delta["modified"])
+    return files
+
+
+class HistoryMetadataExtractor:
+    """
+    コミットごとの {相対パス: blob id} と、blob id ごとのメタデータを保持する
+    - 同じ内容のファイルは何コミットに現れても1回だけ解析（blob id で重複排除）
+    - 変更のないサブツリーも tree id で展開結果を使い回す
+      （ルートツリーはコミットごとにほぼ別物なので覚えない。サブツリーも TREE_CACHE_SIZE 個までの LRU）
+    """
+
+    def __init__(self, reader: GitBlobReader, blobs=None,
+                 tree_cache_size=TREE_CACHE_SIZE, snapshot_cache_size=SNAPSHOT_CACHE_SIZE):
+        self.reader = reader
+        self.blobs = blobs if blobs is not None else {}
+        self.tree_cache = OrderedDict()
+        self.tree_cache_size = tree_cache_size
+        self.snapshots = OrderedDict()
+        self.snapshot_cache_size = snapshot_cache_size
+        self.parsed = 0
+
+    @staticmethod
+    def _remember(cache, size, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > size:
+            cache.popitem(last=False)
+
+    def list_java_blobs(self, tree_id, root=False):
+        """
+        tree 以下の Java ファイル [(相対パス, blob id)]
+        """
+        files = self.tree_cache.get(tree_id)
+        if files is not None:
+            self.tree_cache.move_to_end(tree_id)
+            return files
+
+        obj_type, data = self.reader.read(tree_id)
+        files = []
+        if obj_type == "tree":
+            for mode, name, object_id in parse_tree(data):
+                if mode == "40000":
+                    for path, blob_id in self.list_java_blobs(object_id):
+                        files.append((f"{name}/{path}", blob_id))
+                elif mode.startswith("100") and name.endswith(TARGET_EXT):
+                    files.append((name, object_id))
+
+        if not root:
+            self._remember(self.tree_cache, self.tree_cache_size, tree_id, files)
+        return files
+
+    def blob_metadata(self, blob_id):
+        if blob_id not in self.blobs:
+            obj_type, raw = self.reader.read(blob_id)
+            data = None
+            if obj_type == "blob":
+                data = parse_java_source(decode_java_source(raw), None)
+                if data:
+                    del data["file_path"]    # パスはリビジョン側で持つ
+            self.blobs[blob_id] = data
+            self.parsed += 1
+        return self.blobs[blob_id]
+
+    def read_commit(self, commit):
+        """
+        (そのコミット時点の {相対パス: blob id}, 最初の親) / コミットでなければ (None, None)
+        """
+        obj_type, data = self.reader.read(commit)
+        if obj_type != "commit":
+            return None, None
+        tree_id, parent = parse_commit(data)
+
+        files = self.snapshots.get(commit)
+        if files is None:
+            files = {}
+            for path, blob_id in self.list_java_blobs(tree_id, root=True):
+                # extract_project_metadata と同じ除外ルール
+                if not is_target_path(path):
+                    continue
+                if self.blob_metadata(blob_id):
+                    files[path] = blob_id
+            self._remember(self.snapshots, self.snapshot_cache_size, commit, files)
+        return files, parent
+
+    def extract_revision(self, commit):
+        files, _ = self.read_commit(commit)
+        return files
+
+    def extract_delta(self, commit, known):
+        """
+        最初の親に対する差分 {parent, added, modified, removed}
+        親が known（保存済み・処理済みのリビジョン）に無ければ parent=None で全ファイルを added にする
+        """
+        files, parent = self.read_commit(commit)
+        if files is None:
+            return None
+        before = {}
+        if parent is not None and parent in known:
+            before, _ = self.read_commit(parent)
+        else:
+            parent = None
+        return {"parent": parent, **diff_files(before, files)}
+
+
+def list_revisions(repo_dir: Path, max_revisions=MAX_REVISIONS):
+    cmd = ["git", "rev-list", "--topo-order", "HEAD"]
+    if max_revisions:
+        cmd.append(f"--max-count={max_revisions}")
+    result = subprocess.run(
+        cmd, cwd=repo_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        encoding="utf-8", errors="ignore"
+    )
+    if result.returncode != 0:
+        return []
+    return result.stdout.split()
+
+
+def load_history(path: Path):
+    """
+    {version, blobs: {blob id: メタデータ}, revisions: {コミット: 最初の親に対する差分}}
+    """
+    history = {"version": HISTORY_VERSION, "blobs": {}, "revisions": {}}
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        history["blobs"] = saved.get("blobs", {})
+        if saved.get("version") == HISTORY_VERSION:
+            history["revisions"] = saved["revisions"]
+    return history
+
+
+def files_at(history, commit):
+    """
+    保存済み履歴から、あるコミット時点の {相対パス: blob id} を復元する
+    （親をたどって parent=None のリビジョンから差分を順に当てる）
+    """
+    revisions = history["revisions"]
+    chain = []
+    while commit is not None and commit in revisions:
+        chain.append(revisions[commit])
+        commit = revisions[commit]["parent"]
+    files = {}
+    for delta in reversed(chain):
+        apply_diff(files, delta)
+    return files
+
+
+def metadata_at(history, commit):
+    """
+    保存済み履歴から、あるコミット時点のメタデータを
+    extract_java_metadata.py の出力と同じ形式（リスト）で復元する
+    """
+    results = []
+    for path, blob_id in sorted(files_at(history, commit).items()):
+        results.append({"file_path": path, **history["blobs"][blob_id]})
+    return results
+
+
+def process_repository(repo_dir: Path, output_path: Path, revisions=None):
+    print(f"[REPO] {repo_dir.name}")
+
+    if revisions is None:
+        revisions = list_revisions(repo_dir)
+    if not revisions:
+        print(f"[SKIP] no revisions: {repo_dir.name}")
+        return
+
+    history = load_history(output_path)
+    # 親が先に入るよう古い順に処理する（rev-list --topo-order の逆順）
+    todo = [c for c in reversed(revisions) if c not in history["revisions"]]
+
+    with GitBlobReader(repo_dir) as reader:
+        extractor = HistoryMetadataExtractor(reader, history["blobs"])
+        for commit in todo:
+            delta = extractor.extract_delta(commit, history["revisions"])
+            if delta is not None:
+                history["revisions"][commit] = delta
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(history, f)
+
+    print(
+        f"[DONE] {repo_dir.name}: {len(todo)} new revisions, "
+        f"{extractor.parsed} blobs parsed, "
+        f"{len(history['blobs'])} unique blobs total"
+    )
+
+
+# ===== main =====
+if __name__ == "__main__":
+
+    for repo_dir in sorted(BASE_DIR.iterdir()):
+        if not repo_dir.is_dir():
+            continue
+
+        if not (repo_dir / ".git").exists():
+            continue
+
+        process_repository(repo_dir, OUTPUT_DIR / f"{repo_dir.name}.json")
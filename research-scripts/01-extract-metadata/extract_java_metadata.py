@@ -1,13 +1,29 @@
 import re
 import json
 from pathlib import Path
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+from java_scanner import scan_java_source, primary_class_name
+from java_walker import iter_java_files, INCLUDE_GLOBS, EXCLUDE_DIRS, EXCLUDE_GLOBS
+from metadata_cache import MetadataCache, content_digest
+
+# ===== 並列設定 =====
+N_WORKERS = 1              # 1 なら逐次処理 / 2 以上でプロセスプール
+CHUNK_SIZE = 64            # 1タスクあたりに渡すファイル数
+PARALLEL_PROJECTS = False  # True ならプロジェクト単位でも並列化
+
+# ===== キャッシュ設定 =====
+USE_CACHE = True           # 変更のないファイルは再解析しない
+CLEAR_CACHE = False        # True ならキャッシュを破棄して全件解析
+
+
+_CAMEL_RE = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?=[A-Z]|$)')
 
 
 def split_camel_case(name):
-    tokens = re.findall(
-        r'[A-Z]?[a-z]+|[A-Z]+(?=[A-Z]|$)',
-        name
-    )
+    tokens = _CAMEL_RE.findall(name)
     return [t.lower() for t in tokens]
 
 
@@ -21,43 +37,29 @@ def detect_class_role(class_name):
     }
 
 
-def parse_java_file(file_path: Path, project_root: Path):
+def to_rel_path(file_path: Path, project_root: Path):
+    rel_path = file_path.relative_to(project_root)
+    return str(rel_path).replace("\\", "/")
+
+
+def parse_java_source(content, rel_path):
     """
-    1 Javaファイルから構造メタデータを抽出
-    file_path は project_root からの相対パスで保存する
+    Javaソース文字列から構造メタデータを抽出
+    （ファイル読み込みを伴わない本体。キャッシュ・履歴抽出からも使う）
     """
 
-    try:
-        with open(file_path, encoding="utf-8", errors="ignore") as f:
-            content = f.read()
-    except Exception:
-        return None
+    scan = scan_java_source(content)
 
-    package_match = re.search(r'package\s+([\w\.]+);', content)
-    if not package_match:
+    package = scan["package"]
+    if not package:
         return None
-    package = package_match.group(1)
 
-    class_match = re.search(
-        r'(public\s+)?(abstract\s+)?(class|interface)\s+(\w+)',
-        content
-    )
-    if not class_match:
+    class_name = primary_class_name(scan["types"])
+    if not class_name:
         return None
 
-    class_name = class_match.group(4)
-
-    imports = re.findall(r'import\s+([\w\.]+);', content)
-    imports = [i for i in imports if not i.startswith("java.lang")]
-
-    method_names = re.findall(
-        r'public\s+[^\s]+\s+(\w+)\s*\(',
-        content
-    )
-
-    # ★★ ここが最重要修正点 ★★
-    rel_path = file_path.relative_to(project_root)
-    rel_path = str(rel_path).replace("\\", "/")
+    imports = [i for i in scan["imports"] if not i.startswith("java.lang")]
+    method_names = scan["methods"]
 
     return {
         "file_path": rel_path,   # ← 相対パスのみ
@@ -70,34 +72,166 @@ def parse_java_file(file_path: Path, project_root: Path):
         "class_role": detect_class_role(class_name),
 
         "imports": imports,
+        # 出現順で重複除去（set だと実行ごとに順序が変わる）
         "import_packages": list(
-            set(".".join(i.split(".")[:-1]) for i in imports)
+            dict.fromkeys(".".join(i.split(".")[:-1]) for i in imports)
         ),
 
         "methods": [{"name": m} for m in method_names]
     }
 
 
-def extract_project_metadata(project_root: Path, output_path: Path):
-    project_root = Path(project_root)
+def parse_java_file(file_path: Path, project_root: Path):
+    """
+    1 Javaファイルから構造メタデータを抽出
+    file_path は project_root からの相対パスで保存する
+    """
 
-    java_files = list(project_root.rglob("*.java"))
-    results = []
+    try:
+        with open(file_path, encoding="utf-8", errors="ignore") as f:
+            content = f.read()
+    except Exception:
+        return None
+
+    # ★★ ここが最重要修正点 ★★
+    return parse_java_source(content, to_rel_path(file_path, project_root))
+
+
+def decode_java_source(raw: bytes):
+    """
+    open(..., errors="ignore") で読んだ場合と同じ文字列に変換
+    """
+    text = raw.decode("utf-8", errors="ignore")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _parse_for_cache(item, project_root):
+    """
+    キャッシュミスしたファイルを読み込み、内容ハッシュと共に解析
+    内容ハッシュがキャッシュ済みのものと同じなら解析を省略する
+    """
+    file_path, known_digest = item
+    try:
+        raw = file_path.read_bytes()
+    except OSError:
+        return None, None, False
+
+    digest = content_digest(raw)
+    if digest == known_digest:
+        return digest, None, True
+
+    rel_path = to_rel_path(file_path, project_root)
+    return digest, parse_java_source(decode_java_source(raw), rel_path), False
+
+
+def _chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse_chunk(parse_func, items, project_root):
+    """
+    ワーカープロセス側の処理単位（チャンク内は逐次）
+    """
+    return [parse_func(item, project_root) for item in items]
+
+
+def iter_parsed_files(java_files, project_root, n_workers=1, chunksize=CHUNK_SIZE,
+                      parse_func=parse_java_file):
+    """
+    parse_func(各要素, project_root) の結果を java_files と同じ順序で返す
+    n_workers > 1 の場合はチャンク単位でプロセスプールに投げる
+    （投入中のチャンク数を抑えてメモリを一定に保つ）
+    """
+    if n_workers <= 1:
+        for java_file in java_files:
+            yield parse_func(java_file, project_root)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        pending = deque()
+        for chunk in _chunked(java_files, chunksize):
+            pending.append(
+                executor.submit(_parse_chunk, parse_func, chunk, project_root)
+            )
+            if len(pending) >= n_workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _iter_with_cache(java_files, project_root, cache, n_workers, chunksize):
+    """
+    stat（mtime, size）が一致するファイルはキャッシュから返し、
+    それ以外だけを読み込んで解析する（結果は java_files の順）
+    """
+    rel_paths = []
+    results = {}
+    misses = []
 
     for java_file in java_files:
-        # test ディレクトリ除外
-        if "test" in java_file.parts:
+        rel_path = to_rel_path(java_file, project_root)
+        rel_paths.append(rel_path)
+
+        try:
+            st = java_file.stat()
+        except OSError:
+            continue
+
+        hit, data = cache.lookup(rel_path, st)
+        if hit:
+            results[rel_path] = data
+        else:
+            misses.append((java_file, rel_path, st))
+
+    parsed = iter_parsed_files(
+        [(f, cache.digest_of(rel)) for f, rel, _ in misses],
+        project_root, n_workers, chunksize,
+        parse_func=_parse_for_cache
+    )
+    for (_, rel_path, st), (digest, data, unchanged) in zip(misses, parsed):
+        if digest is None:
             continue
+        if unchanged:
+            data = cache.refresh(rel_path, st)
+        else:
+            cache.store(rel_path, st, digest, data)
+        results[rel_path] = data
 
-        data = parse_java_file(java_file, project_root)
-        if data:
-            results.append(data)
+    for rel_path in rel_paths:
+        yield results.get(rel_path)
+
+
+def extract_project_metadata(project_root: Path, output_path: Path,
+                             n_workers=1, chunksize=CHUNK_SIZE, cache_path=None,
+                             include=INCLUDE_GLOBS, exclude_dirs=EXCLUDE_DIRS,
+                             exclude=EXCLUDE_GLOBS):
+    project_root = Path(project_root)
+
+    # test / build / .git などは降りる前に除外し、パス順に逐次取り出す
+    java_files = iter_java_files(project_root, include, exclude_dirs, exclude)
+
+    if cache_path is None:
+        parsed = iter_parsed_files(java_files, project_root, n_workers, chunksize)
+    else:
+        cache = MetadataCache(cache_path)
+        parsed = _iter_with_cache(java_files, project_root, cache, n_workers, chunksize)
+
+    results = [data for data in parsed if data]
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(results, f, indent=2)
 
+    if cache_path is not None:
+        cache.save()
+        print(f"[CACHE] {project_root.name}: {cache.stats_line()}")
+
     print(f"[DONE] {project_root.name}: {len(results)} files")
 
 
@@ -106,8 +240,46 @@ if __name__ == "__main__":
     BASE_DIR = Path(__file__).resolve().parents[2]
     PROJECTS_DIR = BASE_DIR
     OUTPUT_DIR = BASE_DIR / "research-scripts" / "outputs" / "metadata"
+    CACHE_DIR = BASE_DIR / "research-scripts" / "outputs" / "metadata_cache"
+
+    def cache_path_for(project):
+        if not USE_CACHE:
+            return None
+        path = CACHE_DIR / f"{project.name}.json"
+        if CLEAR_CACHE and path.exists():
+            path.unlink()
+        return path
+
+    projects = sorted(p for p in PROJECTS_DIR.iterdir() if p.is_dir())
 
-    for project in PROJECTS_DIR.iterdir():
-        if project.is_dir():
+    if PARALLEL_PROJECTS and N_WORKERS > 1:
+        # プロジェクト単位で並列化（ネストしたプールは作らない）
+        with ProcessPoolExecutor(max_workers=N_WORKERS) as executor:
+            futures = {
+                executor.submit(
+                    extract_project_metadata,
+                    project,
+                    OUTPUT_DIR / f"{project.name}.json",
+                    cache_path=cache_path_for(project)
+                ): project
+                for project in projects
+            }
+            # 1 プロジェクトの失敗で全体を止めず、最後にまとめて報告する
+            failed = []
+            for future, project in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"[ERROR] {project.name}: {e!r}")
+                    failed.append(project.name)
+        if failed:
+            print(f"[FAILED] {len(failed)}/{len(projects)} projects: "
+                  f"{', '.join(failed)}")
+    else:
+        for project in projects:
             out_file = OUTPUT_DIR / f"{project.name}.json"
-            extract_project_metadata(project, out_file)
+            extract_project_metadata(
+                project, out_file,
+                n_workers=N_WORKERS,
+                cache_path=cache_path_for(project)
+            )
@@ -0,0 +1,92 @@
+import re
+
+# ===== パターン（モジュール読み込み時に1回だけコンパイル） =====
+# 旧実装の個別パターンと同じ意味になるようにしている
+#   package : package\s+([\w\.]+);
+#   import  : import\s+([\w\.]+);
+#   type    : (public\s+)?(abstract\s+)?(class|interface)\s+(\w+)  (+ enum)
+#   method  : public\s+[^\s]+\s+(\w+)\s*\(
+# 修飾子部分は名前の抽出に影響しないので省く（先頭がリテラルの方が速い）
+_TYPE_RE = re.compile(r'(class|interface|enum)\s+(\w+)')
+_PACKAGE_RE = re.compile(r'package\s+([\w.]+);')
+_IMPORT_RE = re.compile(r'import\s+([\w.]+);')
+_METHOD_RE = re.compile(r'public\s+[^\s]+\s+(\w+)\s*\(')
+_COMMENT_START_RE = re.compile(r'/[/*]')
+
+# class_name として採用する型の種類（旧実装と同じ）
+CLASS_KINDS = ("class", "interface")
+
+
+def _header_end(content, start):
+    """
+    start 以降で、コメントの外にある最初の型宣言の位置（なければ末尾）
+    ヘッダ中の "// Helper class for ..." のようなコメントで import の走査を打ち切らないため
+    """
+    pos = start
+    while True:
+        m = _TYPE_RE.search(content, pos)
+        if not m:
+            return len(content)
+        c = _COMMENT_START_RE.search(content, pos, m.start())
+        if c is None:
+            return m.start()
+        # コメントの後ろから探し直す（型宣言がコメント中なら読み飛ばされる）
+        close = "\n" if c.group() == "//" else "*/"
+        end = content.find(close, c.end())
+        pos = len(content) if end < 0 else end + len(close)
+
+
+def scan_java_source(content, header_only=False, all_types=False):
+    """
+    Javaソースを「ヘッダ部（package 〜 最初の型宣言）」と「本体部」に分け、
+    それぞれを1回だけ走査して
+    package / 型宣言 / import / public メソッド名 を取り出す
+
+    - package と先頭の型宣言は最初の一致で打ち切る
+    - import はヘッダ部だけ、public メソッドは本体部だけを走査する
+    - header_only=True なら本体部は走査しない
+    - all_types=True なら本体部のネスト型・後続の型宣言も集める
+    """
+    types = []
+    imports = []
+    methods = []
+
+    pkg = _PACKAGE_RE.search(content)
+    package = pkg.group(1) if pkg else None
+    header_start = pkg.end() if pkg else 0
+
+    # class_name 用の先頭の型宣言（旧実装同様ファイル全体で最初のもの）
+    first = _TYPE_RE.search(content)
+    if first:
+        types.append((first.group(1), first.group(2)))
+        if first.group(1) not in CLASS_KINDS or all_types:
+            # enum が先に来た場合は class / interface が見つかるまで進める
+            for m in _TYPE_RE.finditer(content, first.end()):
+                types.append((m.group(1), m.group(2)))
+                if not all_types and m.group(1) in CLASS_KINDS:
+                    break
+
+    # ヘッダの終わり = package 以降で、コメントの外にある最初の型宣言
+    header_end = _header_end(content, header_start)
+
+    imports = _IMPORT_RE.findall(content, header_start, header_end)
+
+    if not header_only:
+        methods = _METHOD_RE.findall(content, header_end)
+
+    return {
+        "package": package,
+        "types": types,
+        "imports": imports,
+        "methods": methods,
+    }
+
+
+def primary_class_name(types):
+    """
+    最初に現れる class / interface 宣言の名前（なければ None）
+    """
+    for kind, name in types:
+        if kind in CLASS_KINDS:
+            return name
+    return None
@@ -0,0 +1,70 @@
+import os
+from fnmatch import fnmatch
+from pathlib import Path
+
+# ===== デフォルト設定 =====
+# ディレクトリ名がこれらに一致したら中に降りない
+EXCLUDE_DIRS = (".git", "build", "target", "node_modules", "test")
+# ファイル名がこれらのどれかに一致したら対象
+INCLUDE_GLOBS = ("*.java",)
+# project_root からの相対パス（/ 区切り）がこれらに一致したら除外
+EXCLUDE_GLOBS = ()
+
+
+def _match_any(name, patterns):
+    return any(fnmatch(name, p) for p in patterns)
+
+
+def is_excluded_dir(name, rel_path, exclude_dirs=EXCLUDE_DIRS, exclude=EXCLUDE_GLOBS):
+    return _match_any(name, exclude_dirs) or _match_any(rel_path, exclude)
+
+
+def is_target_file(name, rel_path, include=INCLUDE_GLOBS, exclude=EXCLUDE_GLOBS):
+    return _match_any(name, include) and not _match_any(rel_path, exclude)
+
+
+def is_target_path(rel_path, include=INCLUDE_GLOBS,
+                   exclude_dirs=EXCLUDE_DIRS, exclude=EXCLUDE_GLOBS):
+    """
+    相対パス1つに対して iter_java_files と同じ判定を行う
+    （ディレクトリを走査しない git 履歴からの抽出用）
+    """
+    parts = rel_path.split("/")
+    for i, name in enumerate(parts[:-1]):
+        if is_excluded_dir(name, "/".join(parts[:i + 1]), exclude_dirs, exclude):
+            return False
+    return is_target_file(parts[-1], rel_path, include, exclude)
+
+
+def iter_java_files(root, include=INCLUDE_GLOBS,
+                    exclude_dirs=EXCLUDE_DIRS, exclude=EXCLUDE_GLOBS):
+    """
+    os.scandir で root 以下を深さ優先に辿り、対象ファイルの Path を1つずつ返す
+    - 除外ディレクトリには降りない（rglob と違い走査前に枝刈り）
+    - 各ディレクトリ内は名前順なので sorted(rglob(...)) と同じ順序になる
+    - シンボリックリンクのディレクトリは辿らない（rglob と同じ）
+    """
+    root = Path(root)
+    yield from _walk(root, "", include, exclude_dirs, exclude)
+
+
+def _walk(dir_path, rel_dir, include, exclude_dirs, exclude):
+    try:
+        with os.scandir(dir_path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+
+    for entry in entries:
+        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            continue
+
+        if is_dir:
+            if not is_excluded_dir(entry.name, rel_path, exclude_dirs, exclude):
+                yield from _walk(dir_path / entry.name, rel_path,
+                                 include, exclude_dirs, exclude)
+        elif is_target_file(entry.name, rel_path, include, exclude):
+            yield dir_path / entry.name
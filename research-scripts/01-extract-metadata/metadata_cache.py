@@ -0,0 +1,110 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+
+# 解析ロジックやメタデータのスキーマを変えたら上げる（古いキャッシュは破棄）
+CACHE_VERSION = 3
+
+
+def content_digest(raw: bytes):
+    """
+    ファイル内容のハッシュ（git の blob id と同じ計算方法）
+    """
+    h = hashlib.sha1(b"blob %d\0" % len(raw))
+    h.update(raw)
+    return h.hexdigest()
+
+
+class MetadataCache:
+    """
+    1プロジェクト分の parse_java_file 結果を保持する永続キャッシュ
+
+    キー: project_root からの相対パス
+    値  : {"mtime_ns", "size", "digest", "data"}
+
+    - mtime / size が一致すればファイルを開かずにヒット
+    - 一致しなくても内容ハッシュが同じならヒット（解析は省略）
+    - 今回の実行で参照されなかったエントリ（削除されたファイル）は save 時に破棄
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries = {}
+        self.seen = set()
+
+        self.stat_hits = 0
+        self.digest_hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        if self.path.exists():
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                cached = {}
+            # バージョン違いは丸ごと無効化
+            if cached.get("version") == CACHE_VERSION:
+                self.entries = cached.get("entries", {})
+
+    def lookup(self, rel_path, st):
+        """
+        stat が一致すれば (True, data)、しなければ (False, None)
+        """
+        self.seen.add(rel_path)
+        entry = self.entries.get(rel_path)
+        if (
+            entry is not None
+            and entry["mtime_ns"] == st.st_mtime_ns
+            and entry["size"] == st.st_size
+        ):
+            self.stat_hits += 1
+            return True, entry["data"]
+        return False, None
+
+    def digest_of(self, rel_path):
+        entry = self.entries.get(rel_path)
+        return entry["digest"] if entry else None
+
+    def refresh(self, rel_path, st):
+        """
+        内容は同じで stat だけ変わった場合（touch, checkout など）
+        """
+        self.digest_hits += 1
+        entry = self.entries[rel_path]
+        entry["mtime_ns"] = st.st_mtime_ns
+        entry["size"] = st.st_size
+        return entry["data"]
+
+    def store(self, rel_path, st, digest, data):
+        self.misses += 1
+        self.seen.add(rel_path)
+        self.entries[rel_path] = {
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "digest": digest,
+            "data": data,
+        }
+
+    def invalidate(self):
+        self.entries = {}
+
+    def save(self):
+        stale = [rel for rel in self.entries if rel not in self.seen]
+        for rel in stale:
+            del self.entries[rel]
+        self.evicted = len(stale)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "entries": self.entries}, f)
+        os.replace(tmp_path, self.path)
+
+    def stats_line(self):
+        hits = self.stat_hits + self.digest_hits
+        return (
+            f"hits={hits} (stat={self.stat_hits}, hash={self.digest_hits}) "
+            f"misses={self.misses} evicted={self.evicted}"
+        )
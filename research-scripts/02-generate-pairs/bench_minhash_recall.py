@@ -0,0 +1,121 @@
+# bench_minhash_recall.py
+# MinHash + LSH の近似 top-k を、全件比較による厳密な Jaccard top-k と比べて
+# recall@k・クエリ時間・候補数（全件に対する割合）を表示する
+#
+#   python bench_minhash_recall.py                 # 合成データ
+#   python bench_minhash_recall.py metadata.json   # 実メタデータ
+#   python bench_minhash_recall.py --bands 16 --rows 8   # LSH の分割を変える（署名長 = bands * rows）
+
+import sys
+import json
+import argparse
+import time
+import random
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from minhash_lsh import MinHashLSHIndex, tokens_from_metadata, BANDS, NUM_PERM
+from jaccard_engine import build_token_matrix, jaccard_pairs
+
+# ===== 設定 =====
+TOP_K = 10
+N_QUERIES = 200
+N_SYNTHETIC = 5000
+RANDOM_SEED = 42
+
+
+def synthetic_metadata(n, rng):
+    """
+    似たクラスのまとまり（クラスタ）を持つ合成メタデータ
+    実データの java.util や get / toString のように、クラスタをまたいで多くのクラスが持つ
+    トークン（順位 r のものを確率 ~ 1/r で持つ）も混ぜる
+    """
+    vocab = [f"tok{i}" for i in range(3000)]
+    common = [f"common{r}" for r in range(200)]
+    classes = []
+    n_clusters = max(1, n // 20)
+    bases = [rng.sample(vocab, 30) for _ in range(n_clusters)]
+    for i in range(n):
+        base = bases[rng.randrange(n_clusters)]
+        tokens = [t for t in base if rng.random() < 0.8] + rng.sample(vocab, 5)
+        tokens += [t for r, t in enumerate(common) if rng.random() < min(0.9, 1.5 / (r + 1))]
+        classes.append({
+            "file_path": f"gen/C{i}.java",
+            "class_name_tokens": tokens[:3],
+            "import_packages": tokens[3:15],
+            "methods": [{"name": t} for t in tokens[15:]],
+        })
+    return classes
+
+
+def exact_top_k(matrix, q, k):
+    n = matrix.shape[0]
+    others = np.array([i for i in range(n) if i != q], dtype=np.int64)
+    sims = jaccard_pairs(matrix, np.full(len(others), q), others)
+    order = np.argsort(-sims, kind="stable")[:k]
+    return [(int(others[i]), float(sims[i])) for i in order if sims[i] > 0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("metadata", nargs="?", help="extract_java_metadata.py の出力（省略時は合成データ）")
+    parser.add_argument("--bands", type=int, default=BANDS)
+    parser.add_argument("--rows", type=int, default=NUM_PERM // BANDS)
+    args = parser.parse_args()
+
+    rng = random.Random(RANDOM_SEED)
+
+    if args.metadata:
+        with open(args.metadata, encoding="utf-8") as f:
+            classes = json.load(f)
+        label = Path(args.metadata).name
+    else:
+        classes = synthetic_metadata(N_SYNTHETIC, rng)
+        label = "synthetic"
+
+    token_sets = [tokens_from_metadata(c) for c in classes]
+    keys = [c["file_path"] for c in classes]
+    position = {key: i for i, key in enumerate(keys)}
+
+    start = time.perf_counter()
+    index = MinHashLSHIndex(num_perm=args.bands * args.rows, bands=args.bands)
+    for key, tokens in zip(keys, token_sets):
+        index.insert(key, tokens)
+    build_time = time.perf_counter() - start
+
+    matrix = build_token_matrix([{"tokens": list(t)} for t in token_sets], "tokens")
+    queries = rng.sample(range(len(classes)), min(N_QUERIES, len(classes)))
+
+    exact_time = approx_time = 0.0
+    hits = total = n_candidates = 0
+    for q in queries:
+        start = time.perf_counter()
+        exact = exact_top_k(matrix, q, TOP_K)
+        exact_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        approx = index.query(keys[q], TOP_K)
+        approx_time += time.perf_counter() - start
+        n_candidates += len(index.candidates(index.signatures[keys[q]])) - 1
+
+        # 同率の取りこぼしで不利にならないよう、k 番目の類似度以上なら正解とみなす
+        if exact:
+            threshold = exact[-1][1]
+            truth = {i for i, s in exact}
+            found = {position[key] for key, _ in approx}
+            hits += len(truth & found) + sum(
+                1 for i in found - truth
+                if jaccard_pairs(matrix, [q], [i])[0] >= threshold
+            )
+            total += len(exact)
+
+    threshold = (1 / args.bands) ** (1 / args.rows)
+    print(f"[BENCH] {label}: {len(classes)} classes, {len(queries)} queries, k={TOP_K}")
+    print(f"  LSH         : {args.bands} bands x {args.rows} rows (threshold ~ {threshold:.2f})")
+    print(f"  build       : {build_time:.2f} s")
+    print(f"  exact query : {exact_time / len(queries) * 1000:.2f} ms/query")
+    print(f"  LSH query   : {approx_time / len(queries) * 1000:.2f} ms/query")
+    print(f"  recall@{TOP_K}   : {hits / total if total else 0.0:.3f}")
+    print(f"  candidates  : {n_candidates / len(queries) / max(len(classes) - 1, 1):.1%} of classes per query")
@@ -0,0 +1,77 @@
+# build_minhash_index.py
+# metadata/*.json から MinHash + LSH の近傍インデックスを作る（既存があれば差分更新）
+
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from minhash_lsh import MinHashLSHIndex, tokens_from_metadata, NUM_PERM, BANDS
+
+# === 入出力ディレクトリ ===
+BASE_DIR = Path(__file__).resolve().parents[2]                              # =java-data/
+METADATA_DIR = BASE_DIR / "research-scripts" / "outputs" / "metadata"       # .jsonの場所
+OUTPUT_DIR = BASE_DIR / "research-scripts" / "outputs" / "minhash_index"    # 出力先
+
+TOP_K = 10
+
+
+def load_metadata(json_path):
+    with open(json_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def update_index(index, classes):
+    """
+    メタデータに合わせてインデックスを差分更新
+    署名が変わったファイルだけ入れ直し、消えたファイルは削除する
+    """
+    inserted = 0
+    current = set()
+    for item in classes:
+        key = item["file_path"]
+        current.add(key)
+        tokens = tokens_from_metadata(item)
+        sig = index.hasher.signature(tokens)
+        old = index.signatures.get(key)
+        if old is None or not (old == sig).all():
+            index.insert_signature(key, sig, tokens)
+            inserted += 1
+
+    removed = [key for key in index.signatures if key not in current]
+    for key in removed:
+        index.remove(key)
+
+    return inserted, len(removed)
+
+
+def load_or_create_index(index_path):
+    # 署名の長さ・バンド数が今の設定と違う保存済みインデックスは作り直す
+    if index_path.exists():
+        index = MinHashLSHIndex.load(index_path)
+        if (index.num_perm, index.bands) == (NUM_PERM, BANDS):
+            return index
+    return MinHashLSHIndex()
+
+
+if __name__ == "__main__":
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    for json_file in METADATA_DIR.glob("*.json"):
+        project_name = json_file.stem
+        print(f"[PROCESS] {project_name}")
+
+        index_path = OUTPUT_DIR / f"{project_name}.npz"
+        index = load_or_create_index(index_path)
+        inserted, removed = update_index(index, load_metadata(json_file))
+        index.save(index_path)
+
+        print(f"[DONE] {project_name}: {len(index)} classes "
+              f"(inserted={inserted}, removed={removed})")
+
+        # 例: 先頭クラスの近傍
+        for key in list(index.signatures)[:1]:
+            print(f"  [QUERY] {key}")
+            for other, sim in index.query(key, TOP_K):
+                print(f"    {sim:.3f}  {other}")
@@ -1,7 +1,13 @@
-import json
+import sys
 from pathlib import Path
-import itertools
-import random
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from compact_metadata import CompactMetadata
+from jaccard_engine import jaccard_pairs
+from pair_sampler import sample_pairs, sample_stratified_pairs
+from pair_table import write_table
 
 # === 入出力ディレクトリ ===
 BASE_DIR = Path(__file__).resolve().parents[2]                              # =java-data/
@@ -10,77 +16,79 @@ OUTPUT_DIR = BASE_DIR / "research-scripts" / "outputs" / "pairs"            # 
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 MAX_PAIRS=2000
+RANDOM_SEED = 42
+SAME_PACKAGE_RATIO = None   # None: 全ペアから一様 / 0〜1: 同一パッケージ内ペアの割合
 
 def load_metadata(json_path):                      # .json -> データ構造に変換して返す
     """
-    1プロジェクト分の metadata.json を読み込む
+    1プロジェクト分の metadata.json を読み込む（CompactMetadata: 文字列は共有語彙の ID）
     """
-    with open(json_path, encoding="utf-8") as f:
-        return json.load(f)
+    return CompactMetadata.load_json(json_path)
 
 
-def generate_class_pairs(class_list):
+def generate_class_pairs(classes, max_pairs=MAX_PAIRS, seed=RANDOM_SEED,
+                         same_package_ratio=SAME_PACKAGE_RATIO):
     """
-    クラスのリストから、順序なしペアをすべて作る
+    クラス（CompactMetadata）から、順序なしペア (i < j) のインデックスを最大 max_pairs 個
+    ランダムに（重複なく）選ぶ。全組み合わせは作らない
     """
-    return list(itertools.combinations(class_list, 2))
+    if same_package_ratio is None:
+        return sample_pairs(len(classes), max_pairs, seed=seed)
 
+    packages = classes.vocab.decode(classes.column("package"))
+    return sample_stratified_pairs(packages, max_pairs, same_package_ratio, seed=seed)
 
-def compute_pair_features(a, b):
+
+def compute_pair_features(classes, idx_a, idx_b):
     """
-    クラスAとBから、構造的特徴量を計算
+    ペア (records[idx_a[k]], records[idx_b[k]]) の構造的特徴量をまとめて計算
+    classes は CompactMetadata（パッケージ・トークンは語彙 ID のまま比べる）
     """
+    idx_a = np.asarray(idx_a, dtype=np.int64)
+    idx_b = np.asarray(idx_b, dtype=np.int64)
+    records = classes.records
 
     # 同一パッケージか
-    same_package = int(a["package"] == b["package"])
+    packages = classes.column("package")
+    same_package = (packages[idx_a] == packages[idx_b]).astype(int)
 
-    # パッケージ共通prefix長
-    pa = set(a["package_tokens"])
-    pb = set(b["package_tokens"])
+    # パッケージ共通prefix長（現状は常に 0 / 長いほうの個数）
     common = 0
-
-    if pa or pb:
-        package_token_similarity = len(pa & pb) / len(pa | pb)
-    else:
-        package_token_similarity = 0.0
-
-    package_prefix_ratio = common / max(len(pa), len(pb))  # 率=共通/長いほうの個数
+    n_tokens = np.diff(classes.token_matrix("package_tokens").indptr)
+    package_prefix_ratio = common / np.maximum(n_tokens[idx_a], n_tokens[idx_b])  # 率=共通/長いほうの個数
 
     # クラス名トークンのJaccard類似度
-    set_a = set(a["class_name_tokens"])
-    set_b = set(b["class_name_tokens"])
-    name_jaccard = len(set_a & set_b) / len(set_a | set_b) if set_a | set_b else 0.0
-
-    # 役割一致（Controller / Service など）
-    same_role = int(any(
-        a["class_role"][k] and b["class_role"][k]
-        for k in a["class_role"]
-    ))
-
-    return {
-        "file_a": a["file_path"],
-        "file_b": b["file_path"],
-        "same_package": same_package,
-        "package_prefix_ratio": package_prefix_ratio,
-        "class_name_jaccard": name_jaccard,
-        "same_role": same_role
-    }
+    name_jaccard = jaccard_pairs(
+        classes.token_matrix("class_name_tokens"), idx_a, idx_b
+    )
+
+    # 役割一致（Controller / Service など）: roles は class_role のビットマスク
+    roles = classes.column("roles")
+    same_role = ((roles[idx_a] & roles[idx_b]) != 0).astype(int)
+
+    return [
+        {
+            "file_a": records[a].file_path,
+            "file_b": records[b].file_path,
+            "same_package": sp,
+            "package_prefix_ratio": pr,
+            "class_name_jaccard": nj,
+            "same_role": sr
+        }
+        for a, b, sp, pr, nj, sr in zip(
+            idx_a.tolist(), idx_b.tolist(), same_package.tolist(),
+            package_prefix_ratio.tolist(), name_jaccard.tolist(), same_role.tolist()
+        )
+    ]
 
 
 def process_project(json_path):
     classes = load_metadata(json_path)
     pairs = generate_class_pairs(classes)
 
-    # 制限してランダム生成
-    random.shuffle(pairs)
-    pairs = pairs[:MAX_PAIRS]
-
-    results = []
-    for a, b in pairs:
-        features = compute_pair_features(a, b)
-        results.append(features)
-
-    return results
+    idx_a = [a for a, _ in pairs]
+    idx_b = [b for _, b in pairs]
+    return compute_pair_features(classes, idx_a, idx_b)
 
 
 if __name__ == "__main__":
@@ -92,7 +100,6 @@ if __name__ == "__main__":
         pair_data = process_project(json_file)
 
         out_path = OUTPUT_DIR / f"{project_name}_pairs.json"
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(pair_data, f, indent=2)
+        write_table(out_path, pair_data)
 
         print(f"[DONE] {project_name}: {len(pair_data)} pairs")
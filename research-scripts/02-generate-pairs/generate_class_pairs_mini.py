@@ -1,6 +1,11 @@
+import sys
 import json
 from pathlib import Path
-import itertools
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from jaccard_engine import build_token_matrix, jaccard_pairs
+from pair_sampler import sample_pairs, sample_stratified_pairs
+from pair_table import write_table
 
 # === 入出力ディレクトリ ===
 BASE_DIR = Path(__file__).resolve().parents[2]                              # =java-data/
@@ -9,6 +14,8 @@ OUTPUT_DIR = BASE_DIR / "research-scripts" / "outputs" / "pairs"            # 
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 MAX_PAIRS=2000
+RANDOM_SEED = 42
+SAME_PACKAGE_RATIO = None   # None: 全ペアから一様 / 0〜1: 同一パッケージ内ペアの割合
 
 def load_metadata(json_path):                      # .json -> データ構造に変換して返す
     """
@@ -18,56 +25,55 @@ def load_metadata(json_path):                      # .json -> データ構造に
         return json.load(f)
 
 
-def generate_class_pairs(class_list):
+def generate_class_pairs(classes, max_pairs=MAX_PAIRS, seed=RANDOM_SEED,
+                         same_package_ratio=SAME_PACKAGE_RATIO):
     """
-    クラスのリストから、順序なしペアをすべて作る
+    クラスのリストから、順序なしペア (i < j) のインデックスを最大 max_pairs 個
+    ランダムに（重複なく）選ぶ。全組み合わせは作らない
     """
-    return list(itertools.combinations(class_list, 2))
+    if same_package_ratio is None:
+        return sample_pairs(len(classes), max_pairs, seed=seed)
+
+    packages = [c["package"] for c in classes]
+    return sample_stratified_pairs(packages, max_pairs, same_package_ratio, seed=seed)
 
 
-def compute_pair_features(a, b):                                    
+def compute_pair_features(classes, idx_a, idx_b):
     """
-    クラスAとBから、構造的特徴量を計算
+    ペア (classes[idx_a[k]], classes[idx_b[k]]) の構造的特徴量をまとめて計算
     """
 
     # パッケージ類似度
-    pa = set(a["package_tokens"])
-    pb = set(b["package_tokens"])
-
-    if pa or pb:
-        package_token_similarity = len(pa & pb) / len(pa | pb)
-    else:
-        package_token_similarity = 0.0
-
+    package_token_similarity = jaccard_pairs(
+        build_token_matrix(classes, "package_tokens"), idx_a, idx_b
+    )
 
     # クラス名トークンのJaccard類似度
-    set_a = set(a["class_name_tokens"])
-    set_b = set(b["class_name_tokens"])
-
-    if set_a or set_b:
-        name_jaccard = len(set_a & set_b) / len(set_a | set_b) 
-    else:
-        name_jaccard = 0.0
-
+    name_jaccard = jaccard_pairs(
+        build_token_matrix(classes, "class_name_tokens"), idx_a, idx_b
+    )
 
     # まとめ
-    return {
-        "file_a": a["file_path"],
-        "file_b": b["file_path"],
-        "package_similarity": package_token_similarity,
-        "class_name_similarity": name_jaccard
-    }
+    return [
+        {
+            "file_a": classes[a]["file_path"],
+            "file_b": classes[b]["file_path"],
+            "package_similarity": ps,
+            "class_name_similarity": nj
+        }
+        for a, b, ps, nj in zip(
+            idx_a, idx_b, package_token_similarity.tolist(), name_jaccard.tolist()
+        )
+    ]
 
 
 def process_project(json_path):                                      
     classes = load_metadata(json_path)
-    pairs = generate_class_pairs(classes)[:MAX_PAIRS]
-    results = []
-    for a, b in pairs:
-        features = compute_pair_features(a, b)
-        results.append(features)
+    pairs = generate_class_pairs(classes)
 
-    return results
+    idx_a = [a for a, _ in pairs]
+    idx_b = [b for _, b in pairs]
+    return compute_pair_features(classes, idx_a, idx_b)
 
 
 if __name__ == "__main__":
@@ -79,7 +85,6 @@ if __name__ == "__main__":
         pair_data = process_project(json_file)
 
         out_path = OUTPUT_DIR / f"{project_name}_pairs_mini.json"
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(pair_data, f, indent=2)
+        write_table(out_path, pair_data)
 
         print(f"[DONE] {project_name}: {len(pair_data)} pairs")
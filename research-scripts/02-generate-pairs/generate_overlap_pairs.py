@@ -0,0 +1,74 @@
+# generate_overlap_pairs.py
+# 転置インデックスで「共通の import を持つクラスのペア」だけを列挙し、類似度を付けて出力する
+# import が1つも重ならないペア（import_similarity = 0）は最初から作らない
+
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from inverted_index import InvertedIndex, INDEX_FIELDS
+from jaccard_engine import JaccardEngine
+from pair_table import write_table
+
+# === 入出力ディレクトリ ===
+BASE_DIR = Path(__file__).resolve().parents[2]                              # =java-data/
+METADATA_DIR = BASE_DIR / "research-scripts" / "outputs" / "metadata"       # .jsonの場所
+OUTPUT_DIR = BASE_DIR / "research-scripts" / "outputs" / "pairs"            # 出力先
+OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+CANDIDATE_INDEX = "import"   # 候補を作るインデックス（INDEX_FIELDS のキー）
+MIN_OVERLAP = 1              # 共通トークン数の下限
+MAX_POSTING = 0.2            # これより多くのファイルが持つトークンは候補作りに使わない
+                             # （int: ファイル数 / float: 全ファイルに対する割合 / None: 制限なし）
+
+# 出力列名 → メタデータのフィールド
+FEATURE_FIELDS = {
+    "package_similarity": "package_tokens",
+    "class_name_similarity": "class_name_tokens",
+    "import_similarity": "import_packages",
+    "method_similarity": "methods",
+}
+
+
+def load_metadata(json_path):
+    with open(json_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def generate_overlap_pairs(classes, candidate_index=CANDIDATE_INDEX,
+                           min_overlap=MIN_OVERLAP, max_posting=MAX_POSTING):
+    """
+    共通トークンが min_overlap 個以上あるペアだけについて特徴量を計算
+    """
+    index = InvertedIndex(classes, INDEX_FIELDS[candidate_index], max_posting)
+    idx_a, idx_b, overlap = index.overlap_counts(min_overlap)
+
+    sims = JaccardEngine(classes, FEATURE_FIELDS.values()).pairs(idx_a, idx_b)
+    columns = {name: sims[field].tolist() for name, field in FEATURE_FIELDS.items()}
+
+    return [
+        {
+            "file_a": classes[a]["file_path"],
+            "file_b": classes[b]["file_path"],
+            f"{candidate_index}_overlap": c,
+            **{name: values[k] for name, values in columns.items()}
+        }
+        for k, (a, b, c) in enumerate(zip(idx_a.tolist(), idx_b.tolist(), overlap.tolist()))
+    ]
+
+
+if __name__ == "__main__":
+
+    for json_file in METADATA_DIR.glob("*.json"):
+        project_name = json_file.stem
+        print(f"[PROCESS] {project_name}")
+
+        classes = load_metadata(json_file)
+        pair_data = generate_overlap_pairs(classes)
+
+        out_path = OUTPUT_DIR / f"{project_name}_overlap_pairs.json"
+        write_table(out_path, pair_data)
+
+        n_all = len(classes) * (len(classes) - 1) // 2
+        print(f"[DONE] {project_name}: {len(pair_data)} / {n_all} pairs")
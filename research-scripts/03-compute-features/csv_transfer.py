@@ -1,18 +1,20 @@
 # csv_transfer.py
-import json
+import sys
 import csv
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from pair_table import read_records, find_tables
+
 # ===== パス設定 =====
 BASE_DIR = Path(__file__).resolve().parents[1]
 PAIR_DIR = BASE_DIR / "outputs" / "pairs"
 CSV_DIR = BASE_DIR / "outputs" / "csv"
 CSV_DIR.mkdir(parents=True, exist_ok=True)
 
-# ===== JSON読み込み =====
+# ===== 読み込み（使う列だけ） =====
 def load_pairs(json_path):
-    with open(json_path, encoding="utf-8") as f:
-        return json.load(f)
+    return read_records(json_path, ["package_similarity", "class_name_similarity"])
 
 # ===== 特徴量抽出 =====
 def extract_features(pair):
@@ -42,7 +44,7 @@ def save_csv(rows, out_path):
 # ===== main =====
 if __name__ == "__main__":
 
-    for json_file in PAIR_DIR.glob("*_pairs_mini.json"):
+    for json_file in find_tables(PAIR_DIR, "*_pairs_mini.json"):
         print(f"[LOAD] {json_file.name}")
 
         pairs = load_pairs(json_file)
@@ -0,0 +1,78 @@
+# bench_fp_growth.py
+# FP-growth と、各コミットの部分集合を全部数える素朴な方法を比べる
+# （結果が一致するか・時間）
+#
+#   python bench_fp_growth.py                     # outputs/commit_logs の一番大きい履歴
+#   python bench_fp_growth.py <repo>_commits.json # 指定した履歴
+# 履歴が無ければ合成データで測る
+
+import sys
+import json
+import time
+import random
+from itertools import combinations
+from pathlib import Path
+
+from build_cochange_pairs import iter_commit_files
+from fp_growth import fp_growth
+
+# ===== 設定 =====
+BASE_DIR = Path(__file__).resolve().parents[1]
+COMMIT_DIR = BASE_DIR / "outputs" / "commit_logs"
+
+MIN_SUPPORT = 3
+MAX_LEN = 3
+MEMORY_BUDGETS = [None, 100_000]
+N_SYNTHETIC = 20000
+RANDOM_SEED = 42
+
+
+def naive_itemsets(transactions, min_count, max_len):
+    counts = {}
+    for t in transactions:
+        items = sorted(set(t))
+        for k in range(1, min(max_len, len(items)) + 1):
+            for itemset in combinations(items, k):
+                counts[itemset] = counts.get(itemset, 0) + 1
+    return {s: c for s, c in counts.items() if c >= min_count}
+
+
+def synthetic_transactions(n, rng):
+    # モジュール（一緒に変わりやすいファイル群）から数ファイルずつ選ぶ
+    modules = [[f"m{m}/F{k}.java" for k in range(12)] for m in range(300)]
+    return [
+        rng.sample(modules[rng.randrange(len(modules))], rng.randint(1, 8))
+        for _ in range(n)
+    ]
+
+
+def load_transactions():
+    if len(sys.argv) > 1:
+        path = Path(sys.argv[1])
+    else:
+        logs = sorted(COMMIT_DIR.glob("*_commits.json"), key=lambda p: p.stat().st_size)
+        path = logs[-1] if logs else None
+
+    if path is None:
+        return "synthetic", synthetic_transactions(N_SYNTHETIC, random.Random(RANDOM_SEED))
+    with open(path, encoding="utf-8") as f:
+        return path.name, list(iter_commit_files(json.load(f)))
+
+
+if __name__ == "__main__":
+
+    label, transactions = load_transactions()
+    print(f"[BENCH] {label}: {len(transactions)} commits, "
+          f"min_support={MIN_SUPPORT}, max_len={MAX_LEN}")
+
+    start = time.perf_counter()
+    expected = naive_itemsets(transactions, MIN_SUPPORT, MAX_LEN)
+    print(f"  naive     : {time.perf_counter() - start:.2f} s  ({len(expected)} itemsets)")
+
+    for budget in MEMORY_BUDGETS:
+        start = time.perf_counter()
+        result = fp_growth(transactions, MIN_SUPPORT, MAX_LEN, budget)
+        elapsed = time.perf_counter() - start
+        print(f"  fp-growth : {elapsed:.2f} s  ({len(result)} itemsets, "
+              f"budget={budget}, passes={result.passes}, "
+              f"same={result.itemsets == expected})")
@@ -0,0 +1,134 @@
+# bench_git_log_stream.py
+# git log の読み込みを
+#   buffered : subprocess.run + splitlines + リスト化 + json.dump（従来の方法）
+#   stream   : Popen から1行ずつ読み、1コミットずつ JSON Lines / 配列に書く
+#   jsonl    : stream のうち JSON Lines だけ書く
+# で比べ、時間・ピーク RSS・tracemalloc のピークを表示する
+# 計測が混ざらないよう、各モードは別プロセスで実行する
+#
+#   python bench_git_log_stream.py              # 合成リポジトリ（N_COMMITS コミット）
+#   python bench_git_log_stream.py <repo_dir>   # 既存のリポジトリ
+
+import sys
+import json
+import time
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from git_log import iter_git_log, iter_commits, LOG_PRETTY
+from extract_commit_log_to_json import write_commits
+
+# ===== 設定 =====
+N_COMMITS = 20000
+FILES_PER_COMMIT = 8
+MODES = ["buffered", "stream", "jsonl"]   # jsonl: JSON Lines だけ書く
+
+
+def make_synthetic_repo(repo_dir: Path, n_commits=N_COMMITS, files_per_commit=FILES_PER_COMMIT):
+    """
+    git fast-import で n_commits 個のコミットを持つリポジトリを作る
+    """
+    subprocess.run(["git", "init", "-q", str(repo_dir)], check=True)
+    # 入力はコミットごとに流し込む（このプロセスの RSS を増やさないため）
+    proc = subprocess.Popen(["git", "fast-import", "--quiet"], cwd=repo_dir, stdin=subprocess.PIPE)
+    for c in range(n_commits):
+        lines = [
+            "commit refs/heads/master",
+            f"committer bench <bench@example.com> {1600000000 + c} +0000",
+            "data 4\nmsg\n",
+        ]
+        for k in range(files_per_commit):
+            f = (c * 7 + k * 131) % 5000
+            content = f"class C{f} {{ int v = {c}; }}\n"
+            path = f"src/main/java/pkg{f % 50}/very/long/package/name/C{f}.java"
+            lines.append(f"M 100644 inline {path}")
+            lines.append(f"data {len(content.encode())}\n{content}")
+        proc.stdin.write(("\n".join(lines) + "\n").encode())
+    proc.stdin.close()
+    if proc.wait() != 0:
+        raise RuntimeError("git fast-import failed")
+    subprocess.run(["git", "reset", "-q", "--hard", "master"], cwd=repo_dir, check=True)
+
+
+# ===== 従来の方法 =====
+def run_buffered(repo_dir: Path, out_dir: Path):
+    result = subprocess.run(
+        ["git", "log", "--name-status", f"--pretty=format:{LOG_PRETTY}"],
+        cwd=repo_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        errors="ignore"
+    )
+    lines = result.stdout.splitlines()
+    commits = list(iter_commits(lines))
+    with open(out_dir / "buffered.json", "w", encoding="utf-8") as f:
+        json.dump(commits, f, indent=2)
+    return len(commits)
+
+
+def run_stream(repo_dir: Path, out_dir: Path):
+    return write_commits(
+        iter_commits(iter_git_log(repo_dir)),
+        out_dir / "stream.jsonl",
+        out_dir / "stream.json",
+    )
+
+
+def run_jsonl(repo_dir: Path, out_dir: Path):
+    return write_commits(iter_commits(iter_git_log(repo_dir)), out_dir / "jsonl.jsonl")
+
+
+RUNNERS = {"buffered": run_buffered, "stream": run_stream, "jsonl": run_jsonl}
+
+
+def child(mode, repo_dir, out_dir, trace):
+    func = RUNNERS[mode]
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    n = func(Path(repo_dir), Path(out_dir))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # Linux は KB
+    print(json.dumps({"commits": n, "time": elapsed, "rss_kb": rss_kb, "traced": peak}))
+
+
+def run_child(mode, repo_dir, out_dir, trace):
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode, str(repo_dir), str(out_dir), str(int(trace))],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout)
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5] == "1")
+        sys.exit()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        if len(sys.argv) > 1:
+            repo_dir = Path(sys.argv[1])
+        else:
+            repo_dir = tmp / "repo"
+            print(f"[BENCH] creating synthetic repo: {N_COMMITS} commits")
+            make_synthetic_repo(repo_dir)
+
+        print(f"[BENCH] {repo_dir.name}")
+        for mode in MODES:
+            timed = run_child(mode, repo_dir, tmp, trace=False)
+            traced = run_child(mode, repo_dir, tmp, trace=True)
+            print(f"  {mode:<9}: {timed['commits']} commits  "
+                  f"time={timed['time']:.2f}s  "
+                  f"peak RSS={timed['rss_kb'] / 1024:.1f}MB  "
+                  f"tracemalloc peak={traced['traced'] / 2**20:.1f}MB")
+
+        same = (tmp / "buffered.json").read_bytes() == (tmp / "stream.json").read_bytes()
+        print(f"  json output identical: {same}")
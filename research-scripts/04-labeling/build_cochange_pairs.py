@@ -1,7 +1,20 @@
+import sys
 import json
 from pathlib import Path
 from itertools import combinations
 
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from pair_table import write_table, read_records, table_exists
+from commit_store import open_store
+from cochange_matrix import CochangeMatrix
+from pair_sketch import PairSketch
+from extract_commit_log_to_json import (
+    load_state, plan_update, delta_path, read_commits_jsonl,
+    read_state_file, write_state_file,
+)
+
 # ===== パス設定 =====
 BASE_DIR = Path(__file__).resolve().parents[1]
 COMMIT_DIR = BASE_DIR / "outputs" / "commit_logs"
@@ -11,8 +24,30 @@ OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 # ===== 設定 =====
 ALLOWED_TYPES = {"A", "M"}
-MAX_FILES_PER_COMMIT = 50   # 爆発防止
+MAX_FILES_PER_COMMIT = 50   # 爆発防止（None: 巨大コミットも除外しない）
 TARGET_EXT = ".java"
+USE_DELTA = True            # 前回から増えたコミット（<repo>_commits_delta.jsonl）だけ処理する
+# "per_commit": コミット×ペアごとに1件（commit 列付き、従来の出力）
+# "aggregated": ペアごとに1件（weight / support / confidence / lift 付き、commit 列なし）
+#   出力の形と件数が変わる。build_negative_pairs.py は weight の合計を正例数として負例数を決める
+OUTPUT_MODE = "per_commit"
+MIN_COUNT = 1               # aggregated で出力する共変更回数の下限（PAIR_WEIGHTING="inverse" では重みの合計と比べる）
+
+# 巨大コミットを除外せずに数える場合（aggregated のみ）:
+#   MAX_FILES_PER_COMMIT = None, PAIR_WEIGHTING = "inverse", PAIR_COUNTER = "sketch"
+PAIR_WEIGHTING = "uniform"  # "uniform": 1コミット1回 / "inverse": k ファイルのコミットのペアを 1/(k-1) で数える
+PAIR_COUNTER = "exact"      # "exact": 全ペアを辞書で正確に / "sketch": Count-Min で近似し上位ペアだけ保持（メモリ一定）
+SKETCH_WIDTH = 1 << 20
+SKETCH_DEPTH = 4
+SKETCH_CAPACITY = 200_000   # sketch で出力する上位ペアの数
+
+# 設定が前回と違えば差分は使えない（全件やり直し）
+SETTINGS = {
+    "allowed_types": sorted(ALLOWED_TYPES), "max_files": MAX_FILES_PER_COMMIT, "ext": TARGET_EXT,
+    "mode": OUTPUT_MODE, "min_count": MIN_COUNT,
+    "weighting": PAIR_WEIGHTING, "counter": PAIR_COUNTER,
+    "sketch": [SKETCH_WIDTH, SKETCH_DEPTH, SKETCH_CAPACITY],
+}
 
 def extract_am_files(commit):
     files = []
@@ -21,6 +56,9 @@ def extract_am_files(commit):
             files.append(ch["file"])
     return files
 
+def within_limit(n_files):
+    return MAX_FILES_PER_COMMIT is None or n_files <= MAX_FILES_PER_COMMIT
+
 def build_pairs(repo_name, commits):
     pairs = []
 
@@ -31,7 +69,7 @@ def build_pairs(repo_name, commits):
             continue
 
         # 巨大コミット除外
-        if len(files) > MAX_FILES_PER_COMMIT:
+        if not within_limit(len(files)):
             continue
 
         for f1, f2 in combinations(sorted(files), 2):
@@ -45,6 +83,86 @@ def build_pairs(repo_name, commits):
 
     return pairs
 
+def iter_store_commit_files(store, min_files=1):
+    """
+    列形式のコミットストアから、対象の変更（種別・拡張子）が min_files 件以上
+    MAX_FILES_PER_COMMIT 件以下のコミットについて (コミット位置, ファイル名のソート済みリスト)
+    対象判定とコミットごとの件数は配列演算で済ませる
+    """
+    file_ids = np.asarray(store.file_ids)
+    offsets = np.asarray(store.offsets)
+    keep = store.type_mask(ALLOWED_TYPES) & store.path_mask(lambda p: p.endswith(TARGET_EXT))[file_ids]
+
+    # 対象の変更だけを詰めた CSR（kept_offsets はコミットごとの区切り）
+    kept_ids = file_ids[keep].tolist()
+    kept_offsets = np.concatenate([[0], np.cumsum(keep)])[offsets]
+    n_kept = np.diff(kept_offsets)
+    max_files = np.inf if MAX_FILES_PER_COMMIT is None else MAX_FILES_PER_COMMIT
+    targets = np.flatnonzero((n_kept >= min_files) & (n_kept <= max_files))
+    kept_offsets = kept_offsets.tolist()
+
+    # パス文字列の順位（sorted(files) と同じ並びにするため）
+    paths = store.paths
+    rank = [0] * len(paths)
+    for r, f in enumerate(sorted(range(len(paths)), key=paths.__getitem__)):
+        rank[f] = r
+
+    for i in targets.tolist():
+        ids = sorted(kept_ids[kept_offsets[i]:kept_offsets[i + 1]], key=rank.__getitem__)
+        yield i, [paths[f] for f in ids]
+
+def build_pairs_from_store(repo_name, store):
+    """
+    build_pairs と同じ結果を、列形式のコミットストアから作る
+    """
+    pairs = []
+    for i, files in iter_store_commit_files(store, min_files=2):
+        commit = store.commits[i].decode("ascii")
+        for f1, f2 in combinations(files, 2):
+            pairs.append({
+                "repo": repo_name,
+                "commit": commit,
+                "file1": f1,
+                "file2": f2,
+                "label": 1
+            })
+
+    return pairs
+
+# ===== 集計モード =====
+def iter_commit_files(commits):
+    """
+    コミットごとの対象ファイル（巨大コミットは除外、1ファイルだけのコミットも返す）
+    """
+    for c in commits:
+        files = extract_am_files(c)
+        if files and within_limit(len(files)):
+            yield files
+
+def new_matrix():
+    """
+    PAIR_WEIGHTING / PAIR_COUNTER の設定どおりの空の共変更行列
+    """
+    sketch = None
+    if PAIR_COUNTER == "sketch":
+        sketch = PairSketch(SKETCH_WIDTH, SKETCH_DEPTH, SKETCH_CAPACITY)
+    return CochangeMatrix(PAIR_WEIGHTING, sketch)
+
+def build_matrix(commits=None, store=None, matrix=None):
+    """
+    コミット（dict の iterable）またはストアから共変更行列を作る
+    matrix を渡すとそこに足す（差分の取り込み）
+    """
+    if matrix is None:
+        matrix = new_matrix()
+    if store is not None:
+        return matrix.add_commits(files for _, files in iter_store_commit_files(store))
+    return matrix.add_commits(iter_commit_files(commits))
+
+def load_pairs(path):
+    return read_records(path)
+
+
 # ===== main =====
 if __name__ == "__main__":
 
@@ -55,13 +173,54 @@ if __name__ == "__main__":
         repo = jf.stem.replace("_commits", "")
         print(f"[PROCESS] {repo}")
 
-        with open(jf, encoding="utf-8") as f:
-            commits = json.load(f)
-
-        pairs = build_pairs(repo, commits)
-
         out_path = OUT_DIR / f"{repo}_cochange_pairs_am.json"
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(pairs, f, indent=2, ensure_ascii=False)
+        consumed_path = OUT_DIR / f"{repo}_cochange_state.json"
+        counts_path = OUT_DIR / f"{repo}_cochange_counts.npz"    # aggregated の途中結果
+
+        # どこまで取り込み済みか（出力が無ければ全件）
+        log_state = load_state(repo)
+        consumed = read_state_file(consumed_path) if table_exists(out_path) else None
+        if consumed and consumed.get("settings") != SETTINGS:
+            consumed = None
+        if OUTPUT_MODE == "aggregated" and not counts_path.exists():
+            consumed = None
+        mode = plan_update(log_state, consumed and consumed["head"]) if USE_DELTA else "full"
+
+        if mode == "none":
+            print(f"[SKIP] {repo}: up to date")
+            continue
+
+        # 列形式のストアを使う（差分の取得で古くなっていれば作り直す）
+        store = None
+        if mode == "full":
+            store = open_store(COMMIT_DIR, repo, log_state)
+
+        def load_commits():
+            if mode == "delta":
+                return read_commits_jsonl(delta_path(repo))
+            with open(jf, encoding="utf-8") as f:
+                return json.load(f)
+
+        if OUTPUT_MODE == "aggregated":
+            matrix = CochangeMatrix.load(counts_path) if mode == "delta" else None
+            matrix = build_matrix(None if store else load_commits(), store, matrix)
+            matrix.save(counts_path)
+            pairs = matrix.to_records(repo, MIN_COUNT)
+            print(f"  commits = {matrix.n_commits}, files = {len(matrix.paths)}")
+
+        elif mode == "delta":
+            # 差分は git log 順で先頭に入るので、新しいペアを前につなぐ
+            new_pairs = build_pairs(repo, load_commits())
+            pairs = new_pairs + load_pairs(out_path)
+            print(f"  delta: +{len(new_pairs)} pairs")
+        elif store is not None:
+            pairs = build_pairs_from_store(repo, store)
+        else:
+            pairs = build_pairs(repo, load_commits())
+
+        write_table(out_path, pairs, ensure_ascii=False)
+
+        if log_state is not None:
+            write_state_file(consumed_path, {"head": log_state["head"], "settings": SETTINGS})
 
         print(f"[DONE] {repo}: {len(pairs)} positive pairs")
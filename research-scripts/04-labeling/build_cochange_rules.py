@@ -0,0 +1,59 @@
+# build_cochange_rules.py
+# コミットごとの Java ファイル集合から FP-growth で共変更ルール
+# 「{A, B} が変わると C も変わる」を求めて出力する
+
+import json
+from pathlib import Path
+
+from commit_store import open_store
+from extract_commit_log_to_json import load_state
+from build_cochange_pairs import iter_commit_files, iter_store_commit_files
+from fp_growth import fp_growth, generate_rules, RuleIndex
+
+# ===== パス設定 =====
+BASE_DIR = Path(__file__).resolve().parents[1]
+COMMIT_DIR = BASE_DIR / "outputs" / "commit_logs"
+OUT_DIR = BASE_DIR / "outputs" / "cochange_rules"
+
+OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# ===== 設定 =====
+MIN_SUPPORT = 3             # int: 最小コミット数 / 1 未満の float: 全コミットに対する割合
+MAX_LEN = 3                 # 頻出集合の最大サイズ（前件 + 後件）
+MIN_CONFIDENCE = 0.5
+MAX_CONSEQUENT = 1          # 後件のファイル数の上限
+MEMORY_BUDGET = None        # 一度に射影するデータベースの大きさ（アイテム数）の上限（None: 制限なし）
+
+
+def transaction_source(repo, json_path):
+    """
+    コミットごとのファイル集合を何度でも読み直せる関数（メモリ上限モードで読み直すため）
+    列形式のストアがあればそちらから読む
+    """
+    store = open_store(COMMIT_DIR, repo, load_state(repo))
+    if store is not None:
+        return lambda: (files for _, files in iter_store_commit_files(store))
+
+    def from_json():
+        with open(json_path, encoding="utf-8") as f:
+            commits = json.load(f)
+        return iter_commit_files(commits)
+    return from_json
+
+
+# ===== main =====
+if __name__ == "__main__":
+
+    for jf in COMMIT_DIR.glob("*_commits.json"):
+        repo = jf.stem.replace("_commits", "")
+        print(f"[PROCESS] {repo}")
+
+        frequent = fp_growth(transaction_source(repo, jf), MIN_SUPPORT, MAX_LEN, MEMORY_BUDGET)
+        rules = generate_rules(frequent, MIN_CONFIDENCE, MAX_CONSEQUENT)
+        index = RuleIndex(rules)
+
+        out_path = OUT_DIR / f"{repo}_cochange_rules.json"
+        index.save(out_path)
+
+        print(f"  commits = {frequent.n_transactions}, itemsets = {len(frequent)}, passes = {frequent.passes}")
+        print(f"[DONE] {repo}: {len(rules)} rules")
@@ -1,44 +1,34 @@
-import json
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from pair_table import write_table, read_columns, find_tables, table_exists
+
 # ===== パス設定 =====
 BASE_DIR = Path(__file__).resolve().parents[1]
 PAIR_DIR = BASE_DIR / "outputs" / "cochange_pairs"
 OUT_DIR = BASE_DIR / "outputs" / "dataset"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-def load_json(path):
-    with open(path, encoding="utf-8") as f:
-        return json.load(f)
+COLUMNS = ["repo", "file1", "file2"]
+
+def load_pairs(path):
+    # 必要な列だけ読む（列形式なら weight などの列は読まない）
+    data = read_columns(path, COLUMNS)
+    return {name: list(data.get(name, [])) for name in COLUMNS}
 
 def normalize_positive(data):
-    rows = []
-    for p in data:
-        rows.append({
-            "repo": p["repo"],
-            "file1": p["file1"],
-            "file2": p["file2"],
-            "label": 1
-        })
-    return rows
+    return {**data, "label": [1] * len(data["file1"])}
 
 def normalize_negative(data):
-    rows = []
-    for p in data:
-        rows.append({
-            "repo": p["repo"],
-            "file1": p["file1"],
-            "file2": p["file2"],
-            "label": 0
-        })
-    return rows
+    return {**data, "label": [0] * len(data["file1"])}
 
 # ===== main =====
 if __name__ == "__main__":
 
     repos = set()
 
-    for pos_file in PAIR_DIR.glob("*_cochange_pairs_am.json"):
+    for pos_file in find_tables(PAIR_DIR, "*_cochange_pairs_am.json"):
         repo = pos_file.stem.replace("_cochange_pairs_am", "")
         repos.add(repo)
 
@@ -48,20 +38,20 @@ if __name__ == "__main__":
         pos_path = PAIR_DIR / f"{repo}_cochange_pairs_am.json"
         neg_path = PAIR_DIR / f"{repo}_negative_pairs_am.json"
 
-        if not pos_path.exists() or not neg_path.exists():
+        if not table_exists(pos_path) or not table_exists(neg_path):
             print("  [SKIP] missing files")
             continue
 
-        positives = normalize_positive(load_json(pos_path))
-        negatives = normalize_negative(load_json(neg_path))
+        positives = normalize_positive(load_pairs(pos_path))
+        negatives = normalize_negative(load_pairs(neg_path))
 
-        dataset = positives + negatives
+        dataset = {name: positives[name] + negatives[name] for name in positives}
 
         out_path = OUT_DIR / f"{repo}_pairs_mini_dataset.json"
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(dataset, f, indent=2, ensure_ascii=False)
+        write_table(out_path, dataset, ensure_ascii=False)
 
-        print(f"  positives = {len(positives)}")
-        print(f"  negatives = {len(negatives)}")
-        print(f"  total = {len(dataset)}")
+        n_pos, n_neg = len(positives["label"]), len(negatives["label"])
+        print(f"  positives = {n_pos}")
+        print(f"  negatives = {n_neg}")
+        print(f"  total = {n_pos + n_neg}")
         print("-" * 40)
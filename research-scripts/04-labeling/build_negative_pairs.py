@@ -1,7 +1,17 @@
+import sys
 import json
-import random
 from pathlib import Path
-from itertools import combinations
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from pair_sampler import sample_negative_pairs
+from pair_table import write_table, read_columns, table_exists
+from commit_store import open_store
+from extract_commit_log_to_json import (
+    load_state, plan_update, delta_path, read_commits_jsonl,
+    read_state_file, write_state_file,
+)
 
 # ===== パス =====
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -12,7 +22,7 @@ OUT_DIR = BASE_DIR / "outputs" / "cochange_pairs"
 # ===== 設定 =====
 TARGET_EXT = ".java"
 RANDOM_SEED = 42
-random.seed(RANDOM_SEED)
+USE_DELTA = True   # ファイル一覧を前回の結果 + 増えたコミットから作る
 
 def collect_all_java_files(commits):
     files = set()
@@ -22,28 +32,30 @@ def collect_all_java_files(commits):
                 files.add(ch["file"])
     return sorted(files)
 
+def collect_all_java_files_from_store(store):
+    # 変更に一度でも現れたファイル ID → パス
+    used = np.unique(np.asarray(store.file_ids))
+    paths = store.paths
+    return sorted(paths[f] for f in used.tolist() if paths[f].endswith(TARGET_EXT))
+
 def load_positive_pairs(pos_path):
-    with open(pos_path, encoding="utf-8") as f:
-        data = json.load(f)
+    """
+    (正例ペアの集合, 正例数)
+    aggregated（ペアごとに1件）の出力なら、正例数は weight の合計（= コミット×ペアの件数）
+    """
+    data = read_columns(pos_path, ["file1", "file2", "weight"])
+    file1, file2 = data.get("file1", []), data.get("file2", [])
 
     pairs = set()
-    for p in data:
-        pairs.add(tuple(sorted((p["file1"], p["file2"]))))
-    return pairs, len(data)
-
-def build_negative_pairs(repo, all_files, positive_pairs, target_size):
-    candidates = []
-
-    for f1, f2 in combinations(all_files, 2):
-        key = tuple(sorted((f1, f2)))
-        if key not in positive_pairs:
-            candidates.append(key)
-
-    if not candidates:
-        return []
+    for f1, f2 in zip(file1, file2):
+        pairs.add((f1, f2) if f1 <= f2 else (f2, f1))
+    if "weight" in data:
+        return pairs, int(round(float(np.sum(data["weight"]))))
+    return pairs, len(file1)
 
-    sample_size = min(target_size, len(candidates))
-    sampled = random.sample(candidates, sample_size)
+def build_negative_pairs(repo, all_files, positive_pairs, target_size, seed=RANDOM_SEED):
+    # 全組み合わせは作らず、ランダムなペアを引いて正例なら棄却する
+    sampled = sample_negative_pairs(all_files, positive_pairs, target_size, seed=seed)
 
     negatives = []
     for f1, f2 in sampled:
@@ -64,15 +76,37 @@ if __name__ == "__main__":
         print(f"[PROCESS] {repo}")
 
         pos_path = POS_DIR / f"{repo}_cochange_pairs_am.json"
-        if not pos_path.exists():
+        if not table_exists(pos_path):
             print("  [SKIP] no positive pairs")
             continue
 
-        # load commits
-        with open(commit_json, encoding="utf-8") as f:
-            commits = json.load(f)
+        # ファイル一覧: 差分が使えれば前回の一覧に増えたコミットの分を足すだけ
+        state_path = OUT_DIR / f"{repo}_negative_state.json"
+        log_state = load_state(repo)
+        consumed = read_state_file(state_path)
+        if consumed and consumed.get("ext") != TARGET_EXT:
+            consumed = None
+        mode = plan_update(log_state, consumed and consumed["head"]) if USE_DELTA else "full"
+
+        if mode == "none":
+            all_files = consumed["java_files"]
+        elif mode == "delta":
+            added = collect_all_java_files(read_commits_jsonl(delta_path(repo)))
+            all_files = sorted(set(consumed["java_files"]).union(added))
+        else:
+            store = open_store(COMMIT_DIR, repo, log_state)
+            if store is not None:
+                all_files = collect_all_java_files_from_store(store)
+            else:
+                with open(commit_json, encoding="utf-8") as f:
+                    commits = json.load(f)
+                all_files = collect_all_java_files(commits)
+
+        if log_state is not None:
+            write_state_file(state_path, {
+                "head": log_state["head"], "ext": TARGET_EXT, "java_files": all_files
+            })
 
-        all_files = collect_all_java_files(commits)
         print(f"  java files = {len(all_files)}")
 
         positive_pairs, pos_size = load_positive_pairs(pos_path)
@@ -86,8 +120,7 @@ if __name__ == "__main__":
         )
 
         out_path = OUT_DIR / f"{repo}_negative_pairs_am.json"
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(negatives, f, indent=2, ensure_ascii=False)
+        write_table(out_path, negatives, ensure_ascii=False)
 
         print(f"  negative pairs = {len(negatives)}")
         print("-" * 40)
@@ -0,0 +1,81 @@
+# build_window_cochange_pairs.py
+# WINDOW_SECONDS 以内に（必要なら同じ作者が）変更したファイルのペアを共変更として数え、
+# 重複のない重み付き正例を出力する（同一コミットだけの版は build_cochange_pairs.py）
+
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from commit_store import open_store
+from cochange_window import build_window_matrix
+from extract_commit_log_to_json import load_state
+from build_cochange_pairs import extract_am_files, iter_store_commit_files, within_limit, new_matrix
+from pair_table import write_table
+
+# ===== パス設定 =====
+BASE_DIR = Path(__file__).resolve().parents[1]
+COMMIT_DIR = BASE_DIR / "outputs" / "commit_logs"
+OUT_DIR = BASE_DIR / "outputs" / "cochange_pairs"
+
+OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+# ===== 設定 =====
+WINDOW_SECONDS = 60 * 60    # 時間窓（秒）
+SAME_AUTHOR = False         # True: 同じ作者のコミットどうしだけを窓に入れる
+MIN_COUNT = 1               # 出力する共変更回数の下限
+
+
+def commits_from_json(commits):
+    """
+    コミット dict → (time, author, files)
+    time の無い古い形式のログは None（extract_commit_log_to_json.py で取り直す）
+    """
+    rows = []
+    for c in commits:
+        if "time" not in c:
+            return None
+        files = extract_am_files(c)
+        if files and within_limit(len(files)):
+            rows.append((c["time"], c.get("author"), files))
+    return rows
+
+
+def commits_from_store(store):
+    timestamps = store.timestamps
+    author_ids = store.author_ids
+    rows = []
+    for i, files in iter_store_commit_files(store):
+        if timestamps[i] < 0:
+            return None
+        rows.append((int(timestamps[i]), int(author_ids[i]), files))
+    return rows
+
+
+# ===== main =====
+if __name__ == "__main__":
+
+    for jf in COMMIT_DIR.glob("*_commits.json"):
+        repo = jf.stem.replace("_commits", "")
+        print(f"[PROCESS] {repo}")
+
+        # 列形式のストアがあればそちらを使う
+        store = open_store(COMMIT_DIR, repo, load_state(repo))
+        if store is not None:
+            rows = commits_from_store(store)
+        else:
+            with open(jf, encoding="utf-8") as f:
+                rows = commits_from_json(json.load(f))
+
+        if rows is None:
+            print("  [SKIP] commit log has no timestamps")
+            continue
+
+        matrix = build_window_matrix(rows, WINDOW_SECONDS, SAME_AUTHOR, new_matrix())
+        pairs = matrix.to_records(repo, MIN_COUNT)
+
+        out_path = OUT_DIR / f"{repo}_window_cochange_pairs.json"
+        write_table(out_path, pairs, ensure_ascii=False)
+
+        print(f"[DONE] {repo}: {len(pairs)} positive pairs "
+              f"(window={WINDOW_SECONDS}s, same_author={SAME_AUTHOR})")
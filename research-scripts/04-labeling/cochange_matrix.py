@@ -0,0 +1,246 @@
+# cochange_matrix.py
+# コミットを1件ずつ流しながら、ファイル×ファイルの共変更回数（疎な対称行列の上三角）と
+# ファイルごとの変更回数を数える
+# 同じペアが何回共変更しても1エントリなので、メモリと出力はペアの種類数に比例する
+#
+#   support(a, b)    = count(a, b) / コミット数
+#   confidence(a→b)  = count(a, b) / count(a)
+#   lift(a, b)       = count(a, b) * コミット数 / (count(a) * count(b))
+# 時間窓モード（add_commit に window_files を渡す）では、count(a) は
+# 「a を変更したか、a が窓に入っていたコミット数」（window_counts）にする
+# （窓内のペアはそのコミットごとに数えるので、a の変更回数を分母にすると confidence が 1 を超える）
+#
+# 巨大コミット向けの設定
+#   weighting="inverse" : k ファイルのコミットのペアを 1/(k-1) で数える
+#     （各ファイルがそのコミットで持つペアの重みの合計が 1 になるので、巨大コミットも
+#       小さなコミットと同じ重さになり、confidence も 1 を超えない。ファイルの変更回数は重み付けしない）
+#   sketch=PairSketch() : ペア回数を Count-Min sketch で近似し、上位ペアだけ保持する（メモリが一定）
+
+import json
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+
+from pair_sketch import PairSketch
+
+WEIGHTINGS = ("uniform", "inverse")
+PAIR_BLOCK = 1_000_000      # 1コミットのペアがこれより多ければ numpy でこの数ずつ作る
+
+
+def iter_pair_keys(ids, others=(), block_size=PAIR_BLOCK):
+    """
+    ids（昇順のファイル ID）の全ペアと、ids × others のペアのキー (i << 32) | j (i < j)
+    小さいコミットは list 1つ、大きいコミットは block_size 前後ずつの int64 配列で返す
+    """
+    n_pairs = len(ids) * (len(ids) - 1) // 2 + len(ids) * len(others)
+    if n_pairs <= block_size:
+        keys = [(i << 32) | j for i, j in combinations(ids, 2)]
+        keys += [(i << 32) | j if i < j else (j << 32) | i for i in ids for j in others]
+        yield keys
+        return
+
+    ids = np.asarray(ids, dtype=np.int64)
+    others = np.asarray(sorted(others), dtype=np.int64)
+    block, size = [], 0
+    for r in range(len(ids)):
+        partners = np.concatenate([ids[r + 1:], others])
+        lo, hi = np.minimum(ids[r], partners), np.maximum(ids[r], partners)
+        block.append((lo << 32) | hi)
+        size += len(partners)
+        if size >= block_size:
+            yield np.concatenate(block)
+            block, size = [], 0
+    if block:
+        yield np.concatenate(block)
+
+
+class CochangeMatrix:
+    """
+    - paths / file_index : ファイル ID ↔ パス
+    - file_counts        : ファイル ID ごとの変更コミット数
+    - window_counts      : 時間窓モードのとき、ファイル ID ごとの「変更した or 窓に入っていた」コミット数
+    - pair_counts        : (i << 32) | j  (i < j) → 共変更コミット数（weighting="inverse" なら重みの合計）
+                           sketch を使うときは PairSketch
+    - n_commits          : 数えたコミット数
+    """
+
+    def __init__(self, weighting="uniform", sketch=None):
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"unknown weighting: {weighting}")
+        self.paths = []
+        self.file_index = {}
+        self.file_counts = []
+        self.window_counts = []
+        self.windowed = False
+        self.pair_counts = {} if sketch is None else sketch
+        self.weighting = weighting
+        self.n_commits = 0
+
+    @property
+    def sketch(self):
+        return self.pair_counts if isinstance(self.pair_counts, PairSketch) else None
+
+    def pair_weight(self, k):
+        # k ファイルが一緒に変わったときの1ペアの重み
+        if self.weighting == "inverse" and k > 2:
+            return 1 / (k - 1)
+        return 1
+
+    def file_id(self, path):
+        i = self.file_index.get(path)
+        if i is None:
+            i = self.file_index[path] = len(self.paths)
+            self.paths.append(path)
+            self.file_counts.append(0)
+            self.window_counts.append(0)
+        return i
+
+    def add_commit(self, files, window_files=None):
+        """
+        1コミットで変更されたファイルの列（重複は1回と数える）
+        window_files: 時間窓モードで、窓内の直前のコミットで変更されたファイル
+          このコミットの各ファイルとのペアも、このコミットにつき1回ずつ数える
+        """
+        ids = sorted({self.file_id(f) for f in files})
+        if not ids:
+            return
+        self.n_commits += 1
+        for i in ids:
+            self.file_counts[i] += 1
+
+        others = set()
+        if window_files is not None:
+            self.windowed = True
+            others = {self.file_id(g) for g in window_files}.difference(ids)
+            for i in [*ids, *others]:
+                self.window_counts[i] += 1
+        weight = self.pair_weight(len(ids) + len(others))
+        for keys in iter_pair_keys(ids, others):
+            self._add_pairs(keys, weight)
+
+    def _add_pairs(self, keys, weight):
+        if self.sketch is not None:
+            self.sketch.add(keys, weight)
+            return
+        counts = self.pair_counts
+        if isinstance(keys, np.ndarray):
+            keys = keys.tolist()
+        for key in keys:
+            counts[key] = counts.get(key, 0) + weight
+
+    def add_commits(self, file_lists):
+        for files in file_lists:
+            self.add_commit(files)
+        return self
+
+    def __len__(self):
+        return len(self.pair_counts)
+
+    def count(self, file1, file2):
+        i, j = self.file_index.get(file1), self.file_index.get(file2)
+        if i is None or j is None:
+            return 0
+        if i > j:
+            i, j = j, i
+        return self.pair_counts.get((i << 32) | j, 0)
+
+    # ===== 配列での取り出し =====
+    def pair_arrays(self, min_count=1):
+        """
+        共変更回数が min_count 以上のペア (i, j, count)
+        sketch なら保持している上位ペアと推定値
+        """
+        if self.sketch is not None:
+            keys, counts = self.sketch.arrays()
+        else:
+            dtype = np.float64 if self.weighting == "inverse" else np.int64
+            keys = np.fromiter(self.pair_counts.keys(), dtype=np.int64, count=len(self.pair_counts))
+            counts = np.fromiter(self.pair_counts.values(), dtype=dtype, count=len(self.pair_counts))
+        keep = counts >= min_count
+        keys, counts = keys[keep], counts[keep]
+        return keys >> 32, keys & 0xFFFFFFFF, counts
+
+    def metrics(self, i, j, counts):
+        """
+        ペア配列に対する support / confidence（両方向）/ lift
+        時間窓モードではファイルの回数に window_counts を使う
+        sketch の推定値は過大になりうるので、confidence は 1 で頭打ちにする
+        """
+        file_counts = np.asarray(self.window_counts if self.windowed else self.file_counts, dtype=np.float64)
+        n = max(self.n_commits, 1)
+        ci, cj = file_counts[i], file_counts[j]
+        return {
+            "support": counts / n,
+            "confidence_ij": np.minimum(counts / ci, 1.0),
+            "confidence_ji": np.minimum(counts / cj, 1.0),
+            "lift": counts * n / (ci * cj),
+        }
+
+    def to_records(self, repo, min_count=1):
+        """
+        重複のない正例 [{repo, file1, file2, label, weight, support, confidence_12, confidence_21, lift}]
+        file1 < file2（文字列順）、共変更回数の多い順
+        """
+        i, j, counts = self.pair_arrays(min_count)
+        m = self.metrics(i, j, counts)
+        paths = self.paths
+
+        records = []
+        for k, (a, b, c) in enumerate(zip(i.tolist(), j.tolist(), counts.tolist())):
+            conf_ab, conf_ba = m["confidence_ij"][k], m["confidence_ji"][k]
+            f1, f2 = paths[a], paths[b]
+            if f1 > f2:
+                f1, f2, conf_ab, conf_ba = f2, f1, conf_ba, conf_ab
+            records.append({
+                "repo": repo,
+                "file1": f1,
+                "file2": f2,
+                "label": 1,
+                "weight": c,
+                "support": float(m["support"][k]),
+                "confidence_12": float(conf_ab),   # file1 が変わったとき file2 も変わる割合
+                "confidence_21": float(conf_ba),
+                "lift": float(m["lift"][k]),
+            })
+        records.sort(key=lambda r: (-r["weight"], r["file1"], r["file2"]))
+        return records
+
+    # ===== 保存・読み込み（差分コミットを後から足すため） =====
+    def save(self, path):
+        i, j, counts = self.pair_arrays(min_count=0)
+        path = Path(path)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        sketch = self.sketch.to_arrays() if self.sketch is not None else {}
+        np.savez(
+            tmp,
+            i=i.astype(np.int32), j=j.astype(np.int32), counts=counts,
+            file_counts=np.asarray(self.file_counts, dtype=np.int64),
+            window_counts=np.asarray(self.window_counts, dtype=np.int64),
+            windowed=np.bool_(self.windowed),
+            n_commits=np.int64(self.n_commits),
+            paths=np.frombuffer(json.dumps(self.paths).encode("utf-8"), dtype=np.uint8),
+            weighting=np.array(self.weighting),
+            **sketch,
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            weighting = str(z["weighting"]) if "weighting" in z else "uniform"
+            sketch = PairSketch.from_arrays(z) if "sketch_table" in z else None
+            matrix = cls(weighting, sketch)
+            matrix.paths = json.loads(z["paths"].tobytes().decode("utf-8"))
+            matrix.file_index = {p: k for k, p in enumerate(matrix.paths)}
+            matrix.file_counts = z["file_counts"].tolist()
+            if "window_counts" in z:
+                matrix.window_counts = z["window_counts"].tolist()
+                matrix.windowed = bool(z["windowed"])
+            else:
+                matrix.window_counts = [0] * len(matrix.file_counts)
+            matrix.n_commits = int(z["n_commits"])
+            if sketch is None:
+                keys = (z["i"].astype(np.int64) << 32) | z["j"].astype(np.int64)
+                matrix.pair_counts = dict(zip(keys.tolist(), z["counts"].tolist()))
+        return matrix
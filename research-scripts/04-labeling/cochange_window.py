@@ -0,0 +1,71 @@
+# cochange_window.py
+# 同じコミットだけでなく、時間の近いコミット（WINDOW 秒以内）で一緒に変更された
+# ファイルのペアも共変更として数える
+# 時刻順のコミットを2つのポインタ（窓の先頭・末尾）で1回なめ、
+# 窓に入るコミットのファイルを足し、窓から出るコミットのファイルを引く
+# → コミット数に対して線形（窓内のファイル数ぶんの手間はかかる）
+#   コミットが密な履歴で窓を長くすると、窓内のファイル数（= 出力のペア数）が増えるので注意
+
+from collections import deque
+
+from cochange_matrix import CochangeMatrix
+
+
+class _Window:
+    """
+    窓に入っているコミット（時刻, ファイル集合）と、ファイルごとの出現コミット数
+    """
+
+    def __init__(self):
+        self.commits = deque()
+        self.file_counts = {}
+
+    def expire(self, oldest):
+        # 時刻が oldest より前のコミットを窓から出す
+        while self.commits and self.commits[0][0] < oldest:
+            _, files = self.commits.popleft()
+            for f in files:
+                n = self.file_counts[f] - 1
+                if n:
+                    self.file_counts[f] = n
+                else:
+                    del self.file_counts[f]
+
+    def add(self, time, files):
+        self.commits.append((time, files))
+        for f in files:
+            self.file_counts[f] = self.file_counts.get(f, 0) + 1
+
+
+def sort_by_time(commits):
+    """
+    (time, author, files) を時刻の古い順に
+    git log は新しい順なので、逆順にしてから安定ソートする（同時刻は古い方が先）
+    """
+    return sorted(reversed(list(commits)), key=lambda c: c[0])
+
+
+def iter_windows(commits, window_seconds, same_author=False):
+    """
+    時刻順の (time, author, files) を受け取り、コミットごとに
+    (files, 窓内の直前のコミットで変更されたファイル) を返す
+    窓は [time - window_seconds, time]。same_author なら作者ごとに別の窓
+    """
+    windows = {}
+    for time, author, files in commits:
+        window = windows.setdefault(author if same_author else None, _Window())
+        window.expire(time - window_seconds)
+        yield files, window.file_counts.keys()
+        window.add(time, frozenset(files))
+
+
+def build_window_matrix(commits, window_seconds, same_author=False, matrix=None):
+    """
+    (time, author, files) の iterable（git log 順）→ 時間窓つきの共変更行列
+    window_seconds = 0 なら同時刻のコミットだけを同じ窓として扱う
+    """
+    if matrix is None:
+        matrix = CochangeMatrix()
+    for files, window_files in iter_windows(sort_by_time(commits), window_seconds, same_author):
+        matrix.add_commit(files, window_files)
+    return matrix
@@ -0,0 +1,244 @@
+# commit_store.py
+# コミットログを列ごとの配列で持つストア
+#   <repo>_commits.store/
+#     commits.npy     : コミットハッシュ (S40)
+#     offsets.npy     : コミット i の変更は [offsets[i], offsets[i+1])（CSR, int64）
+#     file_ids.npy    : 変更ごとのファイル ID (int32) → paths.json の位置
+#     types.npy       : 変更ごとの種別 (uint8) → CHANGE_TYPES の位置
+#     timestamps.npy  : コミット時刻（UNIX 秒, 不明なら -1）
+#     author_ids.npy  : 作者 ID (int32, 不明なら -1) → authors.json の位置
+#     paths.json / authors.json : 文字列表
+# .npy は mmap で開くので、必要な部分しか読まない
+
+import os
+import json
+import shutil
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+# 変更種別（git log --name-status の1文字目）
+CHANGE_TYPES = ("A", "M", "D", "R", "C", "T", "U", "X", "B")
+TYPE_CODE = {t: i for i, t in enumerate(CHANGE_TYPES)}
+
+STORE_VERSION = 1
+ARRAYS = ("commits", "offsets", "file_ids", "types", "timestamps", "author_ids")
+
+
+def store_path(commit_dir: Path, repo_name):
+    return Path(commit_dir) / f"{repo_name}_commits.store"
+
+
+class CommitStoreWriter:
+    """
+    コミット（{commit, time, author, changes: [{type, file}]}）を1件ずつ受け取り、
+    配列に詰めていく。全コミットの dict をメモリに持たない
+    """
+
+    def __init__(self):
+        self.commits = []
+        self.offsets = array("q", [0])
+        self.file_ids = array("i")
+        self.types = array("B")
+        self.timestamps = array("q")
+        self.author_ids = array("i")
+        self.path_ids = {}
+        self.author_index = {}
+
+    def add(self, commit):
+        self.commits.append(commit["commit"])
+        for ch in commit["changes"]:
+            self.file_ids.append(self.path_ids.setdefault(ch["file"], len(self.path_ids)))
+            self.types.append(TYPE_CODE[ch["type"][0]])
+        self.offsets.append(len(self.file_ids))
+        self.timestamps.append(commit.get("time", -1))
+        author = commit.get("author")
+        self.author_ids.append(
+            -1 if author is None else self.author_index.setdefault(author, len(self.author_index))
+        )
+
+    def save(self, path: Path, head=None):
+        """
+        一時ディレクトリに書いてから置き換える
+        head: このストアがどの HEAD までのコミットか（古いストアの検出用）
+        """
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        np.save(tmp / "commits.npy", np.array(self.commits, dtype="S40"))
+        np.save(tmp / "offsets.npy", np.frombuffer(self.offsets, dtype=np.int64))
+        np.save(tmp / "file_ids.npy", np.frombuffer(self.file_ids, dtype=np.int32))
+        np.save(tmp / "types.npy", np.frombuffer(self.types, dtype=np.uint8))
+        np.save(tmp / "timestamps.npy", np.frombuffer(self.timestamps, dtype=np.int64))
+        np.save(tmp / "author_ids.npy", np.frombuffer(self.author_ids, dtype=np.int32))
+        with open(tmp / "paths.json", "w", encoding="utf-8") as f:
+            json.dump(list(self.path_ids), f, ensure_ascii=False)
+        with open(tmp / "authors.json", "w", encoding="utf-8") as f:
+            json.dump(list(self.author_index), f, ensure_ascii=False)
+        with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"version": STORE_VERSION, "head": head,
+                       "n_commits": len(self.commits), "n_changes": len(self.file_ids)}, f)
+
+        if path.exists():
+            old = path.with_name(path.name + ".old")
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(path, old)
+            os.replace(tmp, path)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(tmp, path)
+
+
+def build_store(commits, path: Path, head=None):
+    """
+    コミットの iterable（git log 順）→ ストアを書き出してコミット数を返す
+    head を省略した場合は先頭（最新）のコミット
+    """
+    writer = CommitStoreWriter()
+    for c in commits:
+        writer.add(c)
+    writer.save(path, head or (writer.commits[0] if writer.commits else None))
+    return len(writer.commits)
+
+
+def convert_json(json_path: Path, path: Path, head=None):
+    """
+    既存の <repo>_commits.json / .jsonl からストアを作る（.jsonl は1行ずつ読む）
+    """
+    json_path = Path(json_path)
+    if json_path.suffix == ".jsonl":
+        from git_log import read_commits_jsonl
+        commits = read_commits_jsonl(json_path)
+    else:
+        with open(json_path, encoding="utf-8") as f:
+            commits = json.load(f)
+    return build_store(commits, path, head)
+
+
+def open_store(commit_dir: Path, repo_name, log_state):
+    """
+    <repo>_commits.store を開く。extract_commit_log_to_json の状態（log_state）より古ければ、
+    その場で <repo>_commits.jsonl から作り直す
+    （差分の取得ではストアを作り直さず、全件を読む段階で必要になったときだけ作る）
+    ストアも .jsonl も使えなければ None
+    """
+    path = store_path(commit_dir, repo_name)
+    store = CommitStore.open(path)
+    if store is not None and store.matches(log_state):
+        return store
+    jsonl_path = Path(commit_dir) / f"{repo_name}_commits.jsonl"
+    if log_state is None or not jsonl_path.exists():
+        return None
+    convert_json(jsonl_path, path, log_state["head"])
+    return CommitStore.open(path)
+
+
+class CommitStore:
+    """
+    ストアを読み込み専用で開く。配列は最初に触ったときに mmap で開く
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"unsupported commit store version: {meta.get('version')}")
+        self.n_commits = meta["n_commits"]
+        self.head = meta.get("head")
+        self._arrays = {}
+        self._paths = None
+        self._authors = None
+
+    @classmethod
+    def open(cls, path):
+        """
+        無ければ（または読めなければ）None
+        """
+        try:
+            return cls(path)
+        except (OSError, ValueError):
+            return None
+
+    def __len__(self):
+        return self.n_commits
+
+    def matches(self, log_state):
+        """
+        extract_commit_log_to_json の状態（<repo>_state.json）と同じ HEAD のストアか
+        状態が無ければ（手で変換したストアなど）そのまま使う
+        """
+        return log_state is None or self.head == log_state["head"]
+
+    def __getattr__(self, name):
+        if name in ARRAYS:
+            if name not in self._arrays:
+                self._arrays[name] = np.load(self.path / f"{name}.npy", mmap_mode="r")
+            return self._arrays[name]
+        raise AttributeError(name)
+
+    @property
+    def paths(self):
+        if self._paths is None:
+            with open(self.path / "paths.json", encoding="utf-8") as f:
+                self._paths = json.load(f)
+        return self._paths
+
+    @property
+    def authors(self):
+        if self._authors is None:
+            with open(self.path / "authors.json", encoding="utf-8") as f:
+                self._authors = json.load(f)
+        return self._authors
+
+    def path_mask(self, predicate):
+        """
+        ファイル ID ごとに predicate(path) を評価した bool 配列
+        """
+        return np.fromiter((predicate(p) for p in self.paths), dtype=bool, count=len(self.paths))
+
+    def type_mask(self, change_types):
+        codes = [TYPE_CODE[t] for t in change_types]
+        return np.isin(np.asarray(self.types), codes)
+
+    def changes_of(self, i):
+        """
+        コミット i の (file_ids, types)
+        """
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.file_ids[start:end], self.types[start:end]
+
+    def commit(self, i):
+        """
+        コミット i を従来の JSON と同じ dict で返す
+        """
+        ids, types = self.changes_of(i)
+        item = {"commit": self.commits[i].decode("ascii")}
+        if self.timestamps[i] >= 0:
+            item["time"] = int(self.timestamps[i])
+        if self.author_ids[i] >= 0:
+            item["author"] = self.authors[self.author_ids[i]]
+        item["changes"] = [
+            {"type": CHANGE_TYPES[t], "file": self.paths[f]}
+            for f, t in zip(ids.tolist(), types.tolist())
+        ]
+        return item
+
+    def iter_commits(self):
+        for i in range(self.n_commits):
+            yield self.commit(i)
+
+
+# ===== 既存の JSON からの変換 =====
+if __name__ == "__main__":
+    import sys
+
+    # python commit_store.py <repo>_commits.json [出力ディレクトリ]
+    src = Path(sys.argv[1])
+    repo = src.name.split("_commits")[0]
+    out = Path(sys.argv[2]) if len(sys.argv) > 2 else store_path(src.parent, repo)
+    n = convert_json(src, out)
+    print(f"[DONE] {out}: {n} commits")
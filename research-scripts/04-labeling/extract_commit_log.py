@@ -1,7 +1,11 @@
-import subprocess
+import sys
 import csv
+import subprocess
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from git_log import iter_git_log
+
 # ===== 設定 =====
 REPO_DIR = Path(r"C:\Users\07yug\OneDrive\Desktop\project\java-data\awaitility")   # ← 各プロジェクトごとに変更
 if not REPO_DIR.exists():
@@ -15,26 +19,15 @@ OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 OUT_CSV = OUT_DIR / f"{REPO_DIR.name}_commits.csv"
 
-# ===== git log 実行 =====
+# ===== git log 実行（1行ずつ読む） =====
 def get_git_log(repo_dir):
-    cmd = [
-        "git",
-        "log",
-        "--name-status",
-        "--pretty=format:%H,%cI"
-    ]
-    result = subprocess.run(
-        cmd,
-        cwd=repo_dir,
-        capture_output=True,
-        text=True,
-        encoding="utf-8"
-    )
-    return result.stdout.splitlines()
+    return iter_git_log(repo_dir, pretty="%H,%cI")
 
 # ===== パース =====
-def parse_git_log(lines):
-    rows = []
+def iter_rows(lines):
+    """
+    git log の出力行から CSV の行を1つずつ返す
+    """
     current_commit = None
     current_time = None
 
@@ -53,34 +46,44 @@ def parse_git_log(lines):
             if not path.endswith(".java"):
                 continue
 
-            rows.append([
+            yield [
                 current_commit,
                 current_time,
                 path,
                 change_type
-            ])
+            ]
 
-    return rows
+
+def parse_git_log(lines):
+    return list(iter_rows(lines))
 
 # ===== main =====
 if __name__ == "__main__":
     print(f"[REPO] {REPO_DIR.name}")
 
-    lines = get_git_log(REPO_DIR)
-    rows = parse_git_log(lines)
-
-    if not rows:
+    tmp_csv = OUT_CSV.with_name(OUT_CSV.name + ".tmp")
+    n_rows = 0
+    try:
+        with open(tmp_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([
+                "commit_hash",
+                "commit_time",
+                "file_path",
+                "change_type"
+            ])
+            for row in iter_rows(get_git_log(REPO_DIR)):
+                writer.writerow(row)
+                n_rows += 1
+    except subprocess.CalledProcessError:
+        # 途中まで書いた .tmp は残さない
+        tmp_csv.unlink(missing_ok=True)
+        raise
+
+    if not n_rows:
+        tmp_csv.unlink()
         print("[WARN] no java changes found")
         exit()
 
-    with open(OUT_CSV, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "commit_hash",
-            "commit_time",
-            "file_path",
-            "change_type"
-        ])
-        writer.writerows(rows)
-
-    print(f"[DONE] {OUT_CSV} ({len(rows)} rows)")
+    tmp_csv.replace(OUT_CSV)
+    print(f"[DONE] {OUT_CSV} ({n_rows} rows)")
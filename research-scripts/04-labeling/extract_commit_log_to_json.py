@@ -1,108 +1,330 @@
+import os
+import sys
+import time
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import json
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from git_log import iter_git_log, iter_commits, read_commits_jsonl
+from commit_store import convert_json, store_path
+
 # ===== パス設定 =====
 BASE_DIR = Path(__file__).resolve().parents[2]        # java-data/
 OUTPUT_DIR = BASE_DIR / "research-scripts" / "outputs" / "commit_logs"
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# ===== 設定 =====
+LOG_FORMAT_VERSION = 2    # git_log.LOG_PRETTY / 出力の形を変えたら上げる（前回分は取り直し）
+WRITE_JSON_ARRAY = True   # 従来の <repo>_commits.json（配列）も書き出す
+INCREMENTAL = True        # 前回の HEAD 以降のコミットだけ取得して追記する
+WRITE_STORE = True        # 全件取得のとき列形式のコミットストア（commit_store.py）も作る
+                          # （差分のときは作り直さない。読む側が commit_store.open_store で必要なときに作る）
+MAX_PARALLEL_REPOS = 4    # 同時に処理するリポジトリ数（1 なら順番に処理）
+USE_PROCESSES = False     # True: スレッドではなくプロセスで並行（出力のパースも CPU を分け合う）
+
+
+def _pretty(commit):
+    # json.dump(commits, indent=2) の中での1要素分の表記
+    return json.dumps(commit, indent=2).replace("\n", "\n  ")
+
 
-def get_git_log(repo_dir: Path):
+def write_commits(commits, jsonl_path: Path, json_path: Path = None):
     """
-    git log から
-    commit hash / 変更種別(A,M,D) / ファイルパス
-    を取得する（v1: 同一コミット内共変更用）
+    コミットを1件ずつ JSON Lines に書き出す
+    json_path を渡すと、json.dump(commits, indent=2) と同じ内容の配列も同時に書く
+    どちらも一時ファイルに書いてから置き換え、0件なら何も残さない
     """
+    paths = [p for p in (jsonl_path, json_path) if p is not None]
+    tmp_paths = [p.with_name(p.name + ".tmp") for p in paths]
+    files = [open(t, "w", encoding="utf-8") for t in tmp_paths]
+    jsonl_f = files[0]
+    json_f = files[1] if json_path is not None else None
+
+    count = 0
+    try:
+        for c in commits:
+            jsonl_f.write(json.dumps(c) + "\n")
+            if json_f is not None:
+                json_f.write(("[\n  " if count == 0 else ",\n  ") + _pretty(c))
+            count += 1
+        if json_f is not None:
+            json_f.write("\n]" if count else "[]")
+    except BaseException:
+        # 途中で失敗したら書きかけのファイルは残さない
+        count = 0
+        raise
+    finally:
+        for f in files:
+            f.close()
+        if not count:
+            for t in tmp_paths:
+                t.unlink(missing_ok=True)
+
+    if count:
+        for t, p in zip(tmp_paths, paths):
+            os.replace(t, p)
+    return count
+
+
+def prepend_commits(delta_path: Path, jsonl_path: Path, json_path: Path = None):
+    """
+    delta_path（新しいコミット、git log 順）を既存の JSON Lines / 配列の先頭につなぐ
+    既存部分はパースせずバイト列のままコピーするので、全体を読み直すより軽い
+    差分のコミットがすべて前回の HEAD 以降の時刻なら、最初から git log した場合と同じ内容になる
+    （git log は時刻順なので、古いコミットがマージされると既存のコミットの間に並ぶ。
+      その場合は呼び出し側で全件取り直す → has_commits_before）
+    """
+    tmp = jsonl_path.with_name(jsonl_path.name + ".tmp")
+    with open(tmp, "wb") as out:
+        for src in (delta_path, jsonl_path):
+            with open(src, "rb") as f:
+                shutil.copyfileobj(f, out)
+    os.replace(tmp, jsonl_path)
+
+    if json_path is None:
+        return
+
+    tmp = json_path.with_name(json_path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as out:
+        count = 0
+        for c in read_commits_jsonl(delta_path):
+            out.write(("[\n  " if count == 0 else ",\n  ") + _pretty(c))
+            count += 1
+        with open(json_path, encoding="utf-8") as f:
+            head = f.read(4)
+            if head != "[\n  ":            # 既存の配列が空（"[]"）
+                out.write("\n]" if count else "[]")
+            else:
+                out.write(",\n  " if count else "[\n  ")
+                shutil.copyfileobj(f, out)
+    os.replace(tmp, json_path)
+
+
+# ===== 差分取得の状態 =====
+def state_path(repo_name):
+    return OUTPUT_DIR / f"{repo_name}_state.json"
 
-    cmd = [
-        "git", "log",
-        "--name-status",
-        "--pretty=format:commit %H"
-    ]
 
+def delta_path(repo_name):
+    return OUTPUT_DIR / f"{repo_name}_commits_delta.jsonl"
+
+
+def read_state_file(path: Path):
+    if not path.exists():
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_state_file(path: Path, state):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_state(repo_name):
+    """
+    {"head": 取り込み済みの HEAD, "base": 今回の差分の起点（全件取り直しなら None）,
+     "delta_commits": 差分のコミット数, "total_commits": 全コミット数}
+    """
+    return read_state_file(state_path(repo_name))
+
+
+def save_state(repo_name, state):
+    write_state_file(state_path(repo_name), state)
+
+
+def plan_update(state, consumed_head):
+    """
+    下流の処理が consumed_head まで取り込み済みのとき、次に何をすればよいか
+      "none"  : 変化なし
+      "delta" : <repo>_commits_delta.jsonl だけ読めばよい
+      "full"  : 全コミットを読み直す
+    """
+    if state is None:
+        return "full"
+    if consumed_head == state["head"]:
+        return "none"
+    if consumed_head is not None and state.get("base") == consumed_head:
+        return "delta"
+    return "full"
+
+
+def git_head(repo_dir: Path):
     result = subprocess.run(
-        cmd,
-        cwd=repo_dir,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        encoding="utf-8",
-        errors="ignore"
+        ["git", "rev-parse", "HEAD"],
+        cwd=repo_dir, capture_output=True, text=True
     )
+    return result.stdout.strip() if result.returncode == 0 else None
 
-    if result.returncode != 0:
-        print(f"[SKIP] git log failed: {repo_dir.name}")
-        return []
 
-    return result.stdout.splitlines()
+def is_ancestor(repo_dir: Path, old, new):
+    # 履歴の書き換え（force push など）で old が消えていれば False
+    result = subprocess.run(
+        ["git", "merge-base", "--is-ancestor", old, new],
+        cwd=repo_dir, capture_output=True
+    )
+    return result.returncode == 0
 
 
-def parse_git_log(lines):
+def first_commit_in(jsonl_path: Path):
     """
-    git log の出力を
-    [
-      {
-        commit: "...",
-        changes: [
-          {type: "M", file: "src/..."}, ...
-        ]
-      }
-    ]
-    に変換
+    先頭（= 最新）のコミット dict（空なら None）
     """
+    with open(jsonl_path, encoding="utf-8") as f:
+        line = f.readline()
+    return json.loads(line) if line.strip() else None
 
-    commits = []
-    current = None
 
-    for line in lines:
-        if line.startswith("commit "):
-            if current:
-                commits.append(current)
-            current = {
-                "commit": line.split()[1],
-                "changes": []
-            }
+def has_commits_before(jsonl_path: Path, time):
+    """
+    jsonl_path に time より前の時刻のコミットがあるか
+    """
+    return any(c.get("time", time) < time for c in read_commits_jsonl(jsonl_path))
+
 
-        elif line and current:
-            parts = line.split("\t")
-            if len(parts) == 2:
-                change_type, file_path = parts
-                if file_path.endswith(".java"):
-                    current["changes"].append({
-                        "type": change_type,   # A / M / D
-                        "file": file_path
-                    })
+def process_repository(repo_dir: Path, incremental=INCREMENTAL):
+    """
+    1リポジトリ分を取得して書き出し、結果の種類を返す
+    "skip" / "empty" / "up to date" / "delta" / "full"
+    """
+    print(f"[REPO] {repo_dir.name}")
 
-    if current:
-        commits.append(current)
+    name = repo_dir.name
+    jsonl_path = OUTPUT_DIR / f"{name}_commits.jsonl"
+    json_path = OUTPUT_DIR / f"{name}_commits.json" if WRITE_JSON_ARRAY else None
 
-    return commits
+    head = git_head(repo_dir)
+    if head is None:
+        print(f"[SKIP] git log failed: {name}")
+        return "skip"
 
+    state = load_state(name) if incremental else None
+    if state and state.get("format") != LOG_FORMAT_VERSION:
+        state = None
+    last = state["head"] if state else None
+    # 前回の出力が state と食い違っていれば（途中で止まった等）信用しない
+    last_commit = first_commit_in(jsonl_path) if last and jsonl_path.exists() else None
+    if last and (
+        last_commit is None
+        or (json_path is not None and not json_path.exists())
+        or last_commit["commit"] != last
+    ):
+        last = None
 
-def process_repository(repo_dir: Path):
-    print(f"[REPO] {repo_dir.name}")
+    # ---- 変化なし
+    if last == head:
+        delta_path(name).write_text("", encoding="utf-8")
+        save_state(name, {**state, "base": head, "delta_commits": 0})
+        print(f"[DONE] {name}: up to date ({state['total_commits']} commits)")
+        return "up to date"
 
-    lines = get_git_log(repo_dir)
-    if not lines:
-        return
+    # ---- 差分だけ取得して先頭につなぐ
+    if last and is_ancestor(repo_dir, last, head):
+        try:
+            n_delta = write_commits(
+                iter_commits(iter_git_log(repo_dir, revision_range=f"{last}..{head}")),
+                delta_path(name)
+            )
+        except subprocess.CalledProcessError:
+            print(f"[SKIP] git log failed: {name}")
+            return "skip"
+        if not n_delta:
+            delta_path(name).write_text("", encoding="utf-8")
 
-    commits = parse_git_log(lines)
+        # 前回の HEAD より古いコミットがマージされていれば、先頭につなぐと順序が変わる
+        if n_delta and has_commits_before(delta_path(name), last_commit["time"]):
+            print(f"  [REBUILD] merged commits older than {last[:10]}")
+        else:
+            prepend_commits(delta_path(name), jsonl_path, json_path)
+            total = state["total_commits"] + n_delta
+            save_state(name, {
+                "head": head, "base": last, "delta_commits": n_delta, "total_commits": total,
+                "format": LOG_FORMAT_VERSION,
+            })
+            print(f"[DONE] {name}: +{n_delta} commits ({total} total)")
+            return "delta"
 
-    out_path = OUTPUT_DIR / f"{repo_dir.name}_commits.json"
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(commits, f, indent=2)
+    # ---- 全件取り直し（初回 / 履歴の書き換え / 古いコミットのマージ）
+    elif last:
+        print(f"  [REBUILD] {last[:10]} is not an ancestor of HEAD")
+    try:
+        count = write_commits(
+            iter_commits(iter_git_log(repo_dir, revision_range=head)), jsonl_path, json_path
+        )
+    except subprocess.CalledProcessError:
+        print(f"[SKIP] git log failed: {name}")
+        return "skip"
 
-    print(f"[DONE] {repo_dir.name}: {len(commits)} commits")
+    if not count:
+        return "empty"
 
+    delta_path(name).unlink(missing_ok=True)
+    if WRITE_STORE:
+        convert_json(jsonl_path, store_path(OUTPUT_DIR, name), head)
+    save_state(name, {
+        "head": head, "base": None, "delta_commits": count, "total_commits": count,
+        "format": LOG_FORMAT_VERSION,
+    })
+    print(f"[DONE] {name}: {count} commits")
+    return "full"
 
-# ===== main =====
-if __name__ == "__main__":
 
-    for repo_dir in BASE_DIR.iterdir():
-        if not repo_dir.is_dir():
-            continue
+# ===== 複数リポジトリ =====
+def find_repositories(base_dir: Path):
+    return sorted(
+        d for d in base_dir.iterdir()
+        if d.is_dir() and (d / ".git").exists()
+    )
+
+
+def run_repository(repo_dir: Path):
+    """
+    1リポジトリ分を実行して (名前, 結果, 秒数)
+    例外は他のリポジトリに影響しないよう、ここで受け止めて結果にする
+    """
+    start = time.perf_counter()
+    try:
+        status = process_repository(repo_dir)
+    except Exception as e:
+        status = f"error: {type(e).__name__}: {e}"
+        print(f"[ERROR] {repo_dir.name}: {type(e).__name__}: {e}")
+    return repo_dir.name, status, time.perf_counter() - start
+
+
+def extract_all(repo_dirs, max_parallel=MAX_PARALLEL_REPOS, use_processes=USE_PROCESSES):
+    """
+    リポジトリごとの git 待ちを重ねるため、スレッド（またはプロセス）で並行に処理する
+    結果は repo_dirs と同じ順
+    """
+    if max_parallel <= 1:
+        return [run_repository(d) for d in repo_dirs]
+    pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool(max_workers=max_parallel) as executor:
+        return list(executor.map(run_repository, repo_dirs))
+
+
+def print_summary(results, elapsed):
+    print("=" * 40)
+    width = max((len(name) for name, _, _ in results), default=0)
+    for name, status, seconds in sorted(results, key=lambda r: -r[2]):
+        print(f"  {name:<{width}}  {seconds:7.2f}s  {status}")
+    slowest = max((r[2] for r in results), default=0.0)
+    n_errors = sum(1 for _, status, _ in results if status.startswith("error"))
+    print(f"[SUMMARY] {len(results)} repos, {n_errors} errors, "
+          f"total {elapsed:.2f}s (slowest repo {slowest:.2f}s)")
 
-        if not (repo_dir / ".git").exists():
-            continue
 
-        process_repository(repo_dir)
+# ===== main =====
+if __name__ == "__main__":
+
+    start = time.perf_counter()
+    results = extract_all(find_repositories(BASE_DIR))
+    print_summary(results, time.perf_counter() - start)
@@ -0,0 +1,272 @@
+# fp_growth.py
+# コミットごとの変更ファイル集合から、よく一緒に変わるファイルの組（頻出アイテム集合）を
+# FP-growth で求め、「{A, B} が変わると C も変わる」形のルールを作る
+#
+#   support    = 組を含むコミット数 / 全コミット数
+#   confidence = count(前件 ∪ {後件}) / count(前件)
+#   lift       = confidence / support(後件)
+
+import json
+import math
+from itertools import combinations
+from pathlib import Path
+
+
+class _Node:
+    __slots__ = ("item", "count", "parent", "children")
+
+    def __init__(self, item, parent):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children = {}
+
+
+class FPTree:
+    """
+    トランザクション（アイテム ID の昇順タプル）を共有接頭辞でまとめた木
+    header[item] はその item のノード一覧（ノードリンク）
+    """
+
+    def __init__(self):
+        self.root = _Node(None, None)
+        self.header = {}
+        self.n_nodes = 0
+
+    def insert(self, items, count=1):
+        node = self.root
+        for item in items:
+            child = node.children.get(item)
+            if child is None:
+                child = node.children[item] = _Node(item, node)
+                self.header.setdefault(item, []).append(child)
+                self.n_nodes += 1
+            child.count += count
+            node = child
+
+    def prefix_paths(self, item):
+        """
+        item の条件付きパターンベース [(根からの経路, 件数)]
+        """
+        for node in self.header[item]:
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                yield tuple(reversed(path)), node.count
+
+
+def _mine(transactions, min_count, max_len, suffix, out):
+    """
+    (アイテム ID の昇順タプル, 件数) の列から、suffix を末尾に持つ頻出集合を out に足す
+    """
+    counts = {}
+    for items, c in transactions:
+        for item in items:
+            counts[item] = counts.get(item, 0) + c
+    frequent = {item: c for item, c in counts.items() if c >= min_count}
+    if not frequent:
+        return
+
+    tree = FPTree()
+    for items, c in transactions:
+        kept = tuple(i for i in items if i in frequent)
+        if kept:
+            tree.insert(kept, c)
+
+    for item, c in frequent.items():
+        itemset = (item,) + suffix
+        out[itemset] = c
+        if max_len is None or len(itemset) < max_len:
+            _mine(list(tree.prefix_paths(item)), min_count, max_len, itemset, out)
+
+
+def _as_source(transactions):
+    """
+    何度でも読み直せる形（引数なしで iterator を返す関数）にそろえる
+    """
+    if callable(transactions):
+        return transactions
+    transactions = list(transactions)
+    return lambda: iter(transactions)
+
+
+def _resolve_min_count(min_support, n_transactions):
+    # 1 以上の整数ならコミット数、1 未満なら割合
+    if isinstance(min_support, int) and min_support >= 1:
+        return min_support
+    return max(1, math.ceil(min_support * n_transactions))
+
+
+class FrequentItemsets:
+    """
+    fp_growth の結果
+    - itemsets : {ファイル名の昇順タプル: 出現コミット数}
+    - n_transactions : コミット数
+    - passes : 元データを読んだ回数（メモリ上限モードでは増える）
+    """
+
+    def __init__(self, itemsets, n_transactions, passes):
+        self.itemsets = itemsets
+        self.n_transactions = n_transactions
+        self.passes = passes
+
+    def __len__(self):
+        return len(self.itemsets)
+
+    def support(self, itemset):
+        return self.itemsets.get(tuple(sorted(itemset)), 0) / max(self.n_transactions, 1)
+
+
+def fp_growth(transactions, min_support, max_len=None, memory_budget=None):
+    """
+    transactions : ファイル名の iterable の列、または それを返す関数（読み直し可能なもの）
+    min_support  : 1 以上の int ならコミット数、1 未満なら割合
+    max_len      : 集合の最大サイズ（None なら制限なし）
+    memory_budget: 一度にメモリに載せる射影データベースの大きさ（アイテム数の合計）の上限
+      （None なら全部を1本の木で）
+      超える場合は、アイテムごとの射影データベース（そのアイテムを含むトランザクションの
+      接頭辞部分）をいくつかにまとめ、元データを読み直しながら1まとまりずつ掘る
+
+    アイテムは頻度の高い順に ID を振り、各トランザクションは ID の昇順に並べる
+    """
+    source = _as_source(transactions)
+
+    # ---- 1回目: アイテムの出現数
+    counts = {}
+    n_transactions = 0
+    for t in source():
+        n_transactions += 1
+        for item in set(t):
+            counts[item] = counts.get(item, 0) + 1
+    passes = 1
+
+    min_count = _resolve_min_count(min_support, n_transactions)
+    names = sorted((i for i, c in counts.items() if c >= min_count), key=lambda i: (-counts[i], i))
+    ids = {name: k for k, name in enumerate(names)}
+
+    def encoded():
+        for t in source():
+            items = tuple(sorted({ids[i] for i in t if i in ids}))
+            if items:
+                yield items
+
+    found = {}
+    if memory_budget is None:
+        _mine([(items, 1) for items in encoded()], min_count, max_len, (), found)
+        passes += 1
+    else:
+        # ---- 2回目: アイテムごとの射影データベースの大きさ（接頭辞の長さの合計）
+        projected_size = [0] * len(names)
+        for items in encoded():
+            for pos, item in enumerate(items):
+                projected_size[item] += pos
+        passes += 1
+
+        # 上限に収まるように、アイテムをまとめて1回の読み直しで射影する
+        batches, batch, size = [], [], 0
+        for item in range(len(names)):
+            if batch and size + projected_size[item] > memory_budget:
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(item)
+            size += projected_size[item]
+        if batch:
+            batches.append(batch)
+
+        for batch in batches:
+            members = set(batch)
+            projected = {item: [] for item in batch}
+            for items in encoded():
+                for pos, item in enumerate(items):
+                    if item in members and pos:
+                        projected[item].append((items[:pos], 1))
+            passes += 1
+            for item in batch:
+                found[(item,)] = counts[names[item]]
+                if max_len is None or max_len > 1:
+                    _mine(projected.pop(item), min_count, max_len, (item,), found)
+
+    itemsets = {
+        tuple(sorted(names[i] for i in itemset)): c
+        for itemset, c in found.items()
+    }
+    return FrequentItemsets(itemsets, n_transactions, passes)
+
+
+# ===== ルール =====
+def generate_rules(frequent, min_confidence=0.0, max_consequent=1):
+    """
+    頻出集合から「前件 ⇒ 後件」のルールを作る
+    前件は空にしない。部分集合はすべて頻出なので数え直しは不要
+    """
+    itemsets = frequent.itemsets
+    n = max(frequent.n_transactions, 1)
+    rules = []
+    for itemset, count in itemsets.items():
+        if len(itemset) < 2:
+            continue
+        for k in range(1, min(max_consequent, len(itemset) - 1) + 1):
+            for consequent in combinations(itemset, k):
+                antecedent = tuple(i for i in itemset if i not in consequent)
+                confidence = count / itemsets[antecedent]
+                if confidence < min_confidence:
+                    continue
+                rules.append({
+                    "antecedent": list(antecedent),
+                    "consequent": list(consequent),
+                    "count": count,
+                    "support": count / n,
+                    "confidence": confidence,
+                    "lift": confidence / (itemsets[consequent] / n),
+                })
+    rules.sort(key=lambda r: (-r["confidence"], -r["count"], r["antecedent"], r["consequent"]))
+    return rules
+
+
+class RuleIndex:
+    """
+    前件（ファイル名の昇順タプル）→ ルール（confidence の高い順）
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.by_antecedent = {}
+        for r in rules:
+            self.by_antecedent.setdefault(tuple(r["antecedent"]), []).append(r)
+        self.max_antecedent = max((len(a) for a in self.by_antecedent), default=0)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def lookup(self, antecedent):
+        return self.by_antecedent.get(tuple(sorted(antecedent)), [])
+
+    def recommend(self, changed_files, k=10):
+        """
+        変更したファイル集合の部分集合を前件とするルールから、
+        まだ変更していないファイルを confidence の高い順に最大 k 件
+        [(ファイル, confidence, ルール)]
+        """
+        changed = sorted(set(changed_files))
+        best = {}
+        for size in range(1, min(self.max_antecedent, len(changed)) + 1):
+            for antecedent in combinations(changed, size):
+                for r in self.by_antecedent.get(antecedent, ()):
+                    for f in r["consequent"]:
+                        if f in changed:
+                            continue
+                        if f not in best or r["confidence"] > best[f][1]:
+                            best[f] = (f, r["confidence"], r)
+        return sorted(best.values(), key=lambda x: (-x[1], x[0]))[:k]
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.rules, f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(Path(path), encoding="utf-8") as f:
+            return cls(json.load(f))
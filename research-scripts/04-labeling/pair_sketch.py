@@ -0,0 +1,130 @@
+# pair_sketch.py
+# ファイルペアの共変更回数を、決まった大きさのメモリで近似的に数える
+#   - Count-Min sketch : depth 本のハッシュ表（幅 width）に足し、推定値は各行の最小値
+#                        （過大評価のみ。誤差はおおよそ 総重み * e / width 以下）
+#   - 上位ペア         : 推定値の大きいペアだけを最大 capacity 件（一時的に 2 倍まで）保持する
+# 巨大コミットのように全ペアを辞書に持てない場合に使う
+
+import numpy as np
+
+SKETCH_WIDTH = 1 << 20      # 2 のべき乗
+SKETCH_DEPTH = 4
+SKETCH_CAPACITY = 200_000   # 保持する上位ペアの数
+FLUSH_SIZE = 1_000_000      # ペアキーをこの数ためたら表に足す
+
+
+class PairSketch:
+    """
+    ペアキー（(i << 32) | j, int64）→ 重みの合計の近似
+    add() はキーをためておき、FLUSH_SIZE ごとにまとめて表に足す
+    """
+
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH, capacity=SKETCH_CAPACITY, seed=0):
+        if width & (width - 1):
+            raise ValueError(f"width must be a power of two: {width}")
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.seed = seed
+        # multiply-shift ハッシュの係数（奇数）
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(1, 1 << 63, size=depth, dtype=np.uint64) | np.uint64(1)
+        self.table = np.zeros((depth, width), dtype=np.float64)
+        self.heavy = {}
+        self.floor = 0.0            # 上位ペアに入るための推定値の下限
+        self.total = 0.0
+        self._pending_keys = []
+        self._pending_weights = []
+        self._n_pending = 0
+
+    def _rows(self, keys):
+        # 各行でのバケット位置 (depth, len(keys))
+        shift = np.uint64(64 - self.width.bit_length() + 1)
+        h = keys.view(np.uint64)[None, :] * self.multipliers[:, None]
+        return (h >> shift).astype(np.int64)
+
+    def add(self, keys, weight=1):
+        """
+        keys: ペアキーの list または int64 配列（同じ呼び出しの中で重複なし）
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(keys):
+            return
+        self._pending_keys.append(keys)
+        self._pending_weights.append(np.full(len(keys), weight, dtype=np.float64))
+        self._n_pending += len(keys)
+        if self._n_pending >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self._pending_keys:
+            return
+        keys = np.concatenate(self._pending_keys)
+        weights = np.concatenate(self._pending_weights)
+        self._pending_keys, self._pending_weights, self._n_pending = [], [], 0
+        self.total += float(weights.sum())
+
+        rows = self._rows(keys)
+        for r in range(self.depth):
+            self.table[r] += np.bincount(rows[r], weights, minlength=self.width)
+
+        # 推定値が下限以上のペアを上位ペアの候補に入れる
+        estimates = self.table[np.arange(self.depth)[:, None], rows].min(axis=0)
+        hit = estimates >= self.floor
+        self.heavy.update(zip(keys[hit].tolist(), estimates[hit].tolist()))
+        if len(self.heavy) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        # 推定値を付け直して上位 capacity 件だけ残す
+        keys, estimates = self._heavy_arrays()
+        top = np.argpartition(-estimates, self.capacity - 1)[:self.capacity]
+        self.floor = float(estimates[top].min())
+        self.heavy = dict(zip(keys[top].tolist(), estimates[top].tolist()))
+
+    def _heavy_arrays(self):
+        keys = np.fromiter(self.heavy.keys(), dtype=np.int64, count=len(self.heavy))
+        return keys, self.estimate(keys)
+
+    def estimate(self, keys):
+        self.flush()
+        keys = np.asarray(keys, dtype=np.int64)
+        rows = self._rows(keys)
+        return self.table[np.arange(self.depth)[:, None], rows].min(axis=0)
+
+    def get(self, key, default=0):
+        self.flush()
+        return float(self.estimate([key])[0]) if self.total else default
+
+    def arrays(self):
+        """
+        保持している上位ペアの (キー, 推定値)（最大 capacity 件）
+        """
+        self.flush()
+        if len(self.heavy) > self.capacity:
+            self._prune()
+        return self._heavy_arrays()
+
+    def __len__(self):
+        self.flush()
+        return min(len(self.heavy), self.capacity)
+
+    # ===== 保存・読み込み =====
+    def to_arrays(self):
+        keys, _ = self.arrays()
+        return {
+            "sketch_table": self.table,
+            "sketch_params": np.array([self.width, self.depth, self.capacity, self.seed], dtype=np.int64),
+            "sketch_stats": np.array([self.floor, self.total], dtype=np.float64),
+            "sketch_heavy": keys,
+        }
+
+    @classmethod
+    def from_arrays(cls, z):
+        width, depth, capacity, seed = z["sketch_params"].tolist()
+        sketch = cls(width, depth, capacity, seed)
+        sketch.table = z["sketch_table"].copy()
+        sketch.floor, sketch.total = z["sketch_stats"].tolist()
+        keys = z["sketch_heavy"]
+        sketch.heavy = dict(zip(keys.tolist(), sketch.estimate(keys).tolist()))
+        return sketch
@@ -1,13 +1,27 @@
 # put_feature.py
 
+import sys
 import json
+from operator import itemgetter
 from pathlib import Path
 
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from jaccard_engine import JaccardEngine
+from token_bitset import BITSET_MAX_VOCAB, FieldEngines, load_or_build_bitsets, vocab_sizes
+from pair_table import write_table, read_columns, find_tables, to_columns, to_records, factorize, n_rows
+
 # ===== パス設定 =====
 BASE_DIR = Path(__file__).resolve().parents[1]
 DATASET_DIR = BASE_DIR / "outputs" / "dataset_pairs"
 METADATA_DIR = BASE_DIR / "outputs" / "metadata"
 OUTPUT_DIR = BASE_DIR / "outputs" / "datasets_with_features"
+BITSET_DIR = BASE_DIR / "outputs" / "metadata_bitsets"     # ビット集合のキャッシュ
+
+# "sparse": 疎行列 / "bitset": キャッシュしたビット集合 /
+# "auto": 語彙が BITSET_MAX_VOCAB 以下のフィールドだけビット集合、残りは疎行列
+SIMILARITY_BACKEND = "sparse"
 
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -17,74 +31,102 @@ def build_metadata_index(metadata):
     return {item["file_path"]: item for item in metadata}
 
 
-# ===== 類似度 =====
-def jaccard(a, b):
-    if not a or not b:
-        return 0.0
-    a, b = set(a), set(b)
-    return len(a & b) / len(a | b)
-
-
 # ===== test 除外 =====
-def is_valid_pair(pair):
-    return (
-        "src/test" not in pair["file1"]
-        and "src/test" not in pair["file2"]
-    )
+def is_valid_file(file_path):
+    return "src/test" not in file_path
 
 
 # ===== feature 付与 =====
-def enrich_pairs(dataset, meta_index):
-    enriched = []
-    skipped = 0
-
-    for pair in dataset:
-        # ---- v1: test 除外
-        if not is_valid_pair(pair):
-            skipped += 1
-            continue
-
-        f1 = pair["file1"]
-        f2 = pair["file2"]
-
-        if f1 not in meta_index or f2 not in meta_index:
-            skipped += 1
-            continue
-
-        m1 = meta_index[f1]
-        m2 = meta_index[f2]
-
-        enriched.append({
-            **pair,
-
-            "package_similarity": jaccard(
-                m1.get("package_tokens", []),
-                m2.get("package_tokens", [])
-            ),
-
-            "class_name_similarity": jaccard(
-                m1.get("class_name_tokens", []),
-                m2.get("class_name_tokens", [])
-            ),
-
-            "import_similarity": jaccard(
-                m1.get("import_packages", []),
-                m2.get("import_packages", [])
-            ),
+# 出力列名 → メタデータのフィールド
+FEATURE_FIELDS = {
+    "package_similarity": "package_tokens",
+    "class_name_similarity": "class_name_tokens",
+    "import_similarity": "import_packages",
+    "method_similarity": "methods",
+}
+
+
+def build_engine(metadata_file, metadata, backend=SIMILARITY_BACKEND):
+    """
+    類似度の計算器（indices_of / pairs を持つ）
+    """
+    fields = list(FEATURE_FIELDS.values())
+    if backend == "auto":
+        sizes = vocab_sizes(metadata, fields)
+        small = [f for f in fields if sizes[f] <= BITSET_MAX_VOCAB]
+        large = [f for f in fields if sizes[f] > BITSET_MAX_VOCAB]
+        engines = {}
+        if small:
+            bitsets = load_or_build_bitsets(metadata_file, BITSET_DIR / f"{metadata_file.stem}.npz", metadata, small)
+            engines.update((f, bitsets) for f in small)
+        if large:
+            sparse = JaccardEngine(metadata, large)
+            engines.update((f, sparse) for f in large)
+        return FieldEngines({f: engines[f] for f in fields})
+    if backend == "bitset":
+        cache_path = BITSET_DIR / f"{metadata_file.stem}.npz"
+        return load_or_build_bitsets(metadata_file, cache_path, metadata, fields)
+    return JaccardEngine(metadata, fields)
+
+
+def file_indices(paths, meta_index, engine):
+    """
+    ファイルパスの列 → engine の行番号（test・メタデータなしは -1）
+    判定と辞書引きは重複のないパスごとに1回だけ
+    """
+    codes, uniques = factorize(paths)
+    rows = np.array([
+        engine.index[f] if is_valid_file(f) and f in meta_index else -1
+        for f in uniques
+    ], dtype=np.int64)
+    return rows[codes]
+
+
+def take_rows(values, rows):
+    """
+    列から rows（昇順の行番号のリスト）の行だけ取り出す（リストの列も C のループで）
+    """
+    if isinstance(values, np.ndarray):
+        return values[rows]
+    if len(rows) == len(values):
+        return values           # 除外した行が無い
+    if len(rows) == 1:
+        return [values[rows[0]]]
+    return list(itemgetter(*rows)(values)) if rows else []
+
+
+def enrich_columns(columns, meta_index, engine=None):
+    """
+    列形式のデータセットに類似度の列を足す → (列, 除外したペア数)
+    """
+    if not columns:
+        return {**columns, **{name: [] for name in FEATURE_FIELDS}}, 0
+    if engine is None:
+        engine = JaccardEngine(list(meta_index.values()), FEATURE_FIELDS.values())
+
+    idx_a = file_indices(columns["file1"], meta_index, engine)
+    idx_b = file_indices(columns["file2"], meta_index, engine)
+    kept = np.flatnonzero((idx_a >= 0) & (idx_b >= 0))
+    skipped = len(idx_a) - len(kept)
+
+    # ---- 類似度はペア配列でまとめて計算
+    sims = engine.pairs(idx_a[kept], idx_b[kept])
+
+    rows = kept.tolist()
+    enriched = {name: take_rows(values, rows) for name, values in columns.items()}
+    enriched.update({name: sims[field] for name, field in FEATURE_FIELDS.items()})
+    return enriched, skipped
 
-            "method_similarity": jaccard(
-                [m["name"] for m in m1.get("methods", [])],
-                [m["name"] for m in m2.get("methods", [])]
-            ),
-        })
 
-    return enriched, skipped
+def enrich_pairs(dataset, meta_index, engine=None):
+    columns, skipped = enrich_columns(to_columns(dataset), meta_index, engine)
+    return to_records(columns), skipped
 
 
 # ===== main =====
 if __name__ == "__main__":
 
-    for dataset_file in DATASET_DIR.glob("*_dataset.json"):
+    for dataset_file in find_tables(DATASET_DIR, "*_dataset.json"):
         project = dataset_file.stem.replace("_pairs_mini_dataset", "")
         print(f"[PROCESS] {project}")
 
@@ -93,21 +135,21 @@ if __name__ == "__main__":
             print("  [SKIP] metadata not found")
             continue
 
-        with open(dataset_file, encoding="utf-8") as f:
-            dataset = json.load(f)
+        dataset = read_columns(dataset_file)
 
         with open(metadata_file, encoding="utf-8") as f:
             metadata = json.load(f)
 
         meta_index = build_metadata_index(metadata)
 
-        enriched, skipped = enrich_pairs(dataset, meta_index)
+        engine = build_engine(metadata_file, metadata)
+        enriched, skipped = enrich_columns(dataset, meta_index, engine)
 
         out_file = OUTPUT_DIR / f"{project}_dataset_with_features.json"
-        with open(out_file, "w", encoding="utf-8") as f:
-            json.dump(enriched, f, indent=2)
+        write_table(out_file, enriched)
 
-        print(f"  total    = {len(dataset)}")
-        print(f"  enriched = {len(enriched)}")
+        total = n_rows(dataset)
+        print(f"  total    = {total}")
+        print(f"  enriched = {total - skipped}")
         print(f"  skipped  = {skipped}")
         print("-" * 40)
@@ -1,22 +1,30 @@
-import pandas as pd
+import sys
 from pathlib import Path
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "common"))
+from pair_table import read_frame, find_tables, source_path
+
 # ===== パス設定 =====
 BASE_DIR = Path(__file__).resolve().parents[1]
 JSON_DIR = BASE_DIR / "outputs" / "datasets_with_features"
 
-# ===== JSON読み込み =====
-def load_json(json_path):
-    print(f"[LOAD] {json_path.name}")
-    return pd.read_json(json_path)
+FEATURES = [
+    "package_similarity",
+    "class_name_similarity"
+]
+
+# ===== 読み込み（列形式があれば特徴量とラベルの列だけ読む） =====
+def load_dataset(json_path):
+    print(f"[LOAD] {source_path(json_path).name}")
+    return read_frame(json_path, FEATURES + ["label"])
 
 # ===== main =====
 if __name__ == "__main__":
 
-    files = list(JSON_DIR.glob("*_dataset_with_features.json"))
+    files = find_tables(JSON_DIR, "*_dataset_with_features.json")
 
     if not files:
         print("[ERROR] dataset_with_features.json が見つかりません")
@@ -24,7 +32,7 @@ if __name__ == "__main__":
 
     for json_file in files:
 
-        df = load_json(json_file)
+        df = load_dataset(json_file)
 
         print(f"  rows = {len(df)}")
 
@@ -33,12 +41,7 @@ if __name__ == "__main__":
             continue
 
         # ===== 特徴量とラベル =====
-        X = df[
-            [
-                "package_similarity",
-                "class_name_similarity"
-            ]
-        ]
+        X = df[FEATURES]
 
         y = df["label"]
 
@@ -0,0 +1,184 @@
+# ast_store.py
+# javalang のパース結果から特徴量計算に必要な情報だけを取り出し、
+# ファイルごとに1回だけパースして使い回すためのストア
+
+import os
+import json
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import javalang
+
+# ディスクキャッシュ（mtime / size で無効化）。実行時の cwd に依存しないようスクリプト基準で置く
+CACHE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ast_artifacts.sqlite")
+LRU_SIZE = 4096                     # メモリ上に保持するファイル数
+CHUNK_SIZE = 32
+
+
+class FileArtifacts:
+    """
+    1ファイル分の派生情報
+      type_kinds   : トップレベル型の種類名（ClassDeclaration など、個数を保持）
+      invoked      : 呼び出しているメソッド名（MethodInvocation.member）
+      class_names  : 宣言しているクラス名（ClassDeclaration.name）
+    """
+
+    __slots__ = ("type_kinds", "type_kind_set", "invoked", "class_names")
+
+    def __init__(self, type_kinds=(), invoked=(), class_names=()):
+        self.type_kinds = tuple(type_kinds)
+        self.type_kind_set = frozenset(self.type_kinds)
+        self.invoked = frozenset(invoked)
+        self.class_names = frozenset(class_names)
+
+    def to_json(self):
+        return json.dumps([
+            list(self.type_kinds), sorted(self.invoked), sorted(self.class_names)
+        ])
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(*json.loads(text))
+
+
+EMPTY = FileArtifacts()
+
+
+def compute_artifacts(path):
+    """
+    ファイルを1回だけパースして FileArtifacts を作る
+    （読み込み・パースに失敗したら空 = 旧実装で 0.0 になるケース）
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            tree = javalang.parse.parse(f.read())
+    except Exception:
+        return EMPTY
+
+    type_kinds = [type(t).__name__ for t in tree.types]
+
+    invoked = set()
+    try:
+        for _, node in tree.filter(javalang.tree.MethodInvocation):
+            invoked.add(node.member)
+    except Exception:
+        pass
+
+    class_names = set()
+    try:
+        for _, node in tree.filter(javalang.tree.ClassDeclaration):
+            class_names.add(node.name)
+    except Exception:
+        pass
+
+    return FileArtifacts(type_kinds, invoked, class_names)
+
+
+def _compute_chunk(paths):
+    return [compute_artifacts(p).to_json() for p in paths]
+
+
+def _file_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ParseStore:
+    """
+    ファイルパス → FileArtifacts
+    メモリ上は LRU、溢れた分や過去の実行分は SQLite に保存
+    """
+
+    def __init__(self, cache_db=CACHE_DB, lru_size=LRU_SIZE):
+        self.lru = OrderedDict()
+        self.lru_size = lru_size
+        self.db = sqlite3.connect(cache_db) if cache_db else None
+        if self.db is not None:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, data TEXT)"
+            )
+        self.parsed = 0
+
+    def _remember(self, path, artifacts):
+        self.lru[path] = artifacts
+        self.lru.move_to_end(path)
+        if len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    def _load_from_db(self, path, key):
+        if self.db is None or key is None:
+            return None
+        row = self.db.execute(
+            "SELECT mtime_ns, size, data FROM artifacts WHERE path = ?", (path,)
+        ).fetchone()
+        if row and (row[0], row[1]) == key:
+            return FileArtifacts.from_json(row[2])
+        return None
+
+    def _save_to_db(self, path, key, text):
+        if self.db is not None and key is not None:
+            self.db.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?)",
+                (path, key[0], key[1], text)
+            )
+
+    def get(self, path):
+        artifacts = self.lru.get(path)
+        if artifacts is not None:
+            self.lru.move_to_end(path)
+            return artifacts
+
+        key = _file_key(path)
+        artifacts = self._load_from_db(path, key)
+        if artifacts is None:
+            artifacts = compute_artifacts(path)
+            self.parsed += 1
+            self._save_to_db(path, key, artifacts.to_json())
+
+        self._remember(path, artifacts)
+        return artifacts
+
+    def prefetch(self, paths, n_workers=1, chunksize=CHUNK_SIZE):
+        """
+        まだキャッシュにない異なるファイルをまとめてパース
+        n_workers > 1 ならプロセスプールで並列化
+        """
+        todo = []
+        for path in dict.fromkeys(paths):
+            if path in self.lru:
+                continue
+            key = _file_key(path)
+            artifacts = self._load_from_db(path, key)
+            if artifacts is not None:
+                self._remember(path, artifacts)
+            else:
+                todo.append((path, key))
+
+        if n_workers > 1 and len(todo) > chunksize:
+            chunks = [
+                [p for p, _ in todo[i:i + chunksize]]
+                for i in range(0, len(todo), chunksize)
+            ]
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                texts = [t for chunk in executor.map(_compute_chunk, chunks) for t in chunk]
+        else:
+            texts = _compute_chunk([p for p, _ in todo])
+
+        for (path, key), text in zip(todo, texts):
+            self._save_to_db(path, key, text)
+            self._remember(path, FileArtifacts.from_json(text))
+        self.parsed += len(todo)
+
+        if self.db is not None:
+            self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
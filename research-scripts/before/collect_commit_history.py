@@ -2,47 +2,104 @@
 import subprocess
 import pandas as pd
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 PROJECTS = [
     "awaitility", "ByteLegend", "immutables", "java-design-patterns", "leet-code"
 ]
 
 OUTPUT_CSV = "commit_history.csv"
-MAX_COMMITS = 100
+MAX_COMMITS = None        # None: 全履歴 / 数値: 新しい順にその件数だけ
+N_WORKERS = os.cpu_count() or 1   # 同時に走らせる git log の数
+CHUNKS_PER_WORKER = 4             # 1ワーカーあたりの区間数（区間ごとの重さの偏りをならす）
+MIN_CHUNK_SIZE = 500              # これより小さい区間には分けない
 
-all_commits = []
 
-base_dir = os.path.abspath("..")  # java-data ディレクトリ
+def list_commits(repo_path, max_commits=MAX_COMMITS):
+    """
+    git log と同じ順序のコミット一覧（rev-list は git log と同じ並び順）
+    """
+    cmd = ["git", "-C", repo_path, "rev-list", "HEAD"]
+    if max_commits is not None:
+        cmd.append(f"-n{max_commits}")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return result.stdout.split()
 
-print(f" Base dir: {base_dir}")
 
-for proj in PROJECTS:
-    repo_path = os.path.join(base_dir, proj)
+def split_ranges(commits, n_workers=N_WORKERS):
+    """
+    コミット一覧を連続した区間に分ける（互いに重ならない）
+    """
+    if not commits:
+        return []
+    n_chunks = max(1, min(n_workers * CHUNKS_PER_WORKER, len(commits) // MIN_CHUNK_SIZE))
+    size = -(-len(commits) // n_chunks)
+    return [commits[i:i + size] for i in range(0, len(commits), size)]
 
-    print(f" Reading repo: {repo_path}")
 
+def log_range(repo_path, commits):
+    """
+    指定したコミットだけの git log --name-only を取る
+    --no-walk=unsorted で親をたどらず、渡した順のまま出力させる
+    """
     cmd = [
         "git", "-C", repo_path,
-        "log", f"-n{MAX_COMMITS}",
+        "log", "--no-walk=unsorted", "--stdin",
         "--name-only", "--pretty=format:COMMIT:%H"
     ]
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
+    result = subprocess.run(cmd, input="\n".join(commits) + "\n", capture_output=True, text=True)
     if result.stderr:
-        print(f" Error in {proj}:", result.stderr)
-        continue
+        raise RuntimeError(result.stderr.strip())
+    return result.stdout
+
 
-    lines = result.stdout.splitlines()
+def parse_log(proj, output):
+    rows = []
     current_commit = None
 
-    for line in lines:
+    for line in output.splitlines():
         line = line.strip()
 
         if line.startswith("COMMIT:"):
             current_commit = line.replace("COMMIT:", "")
         elif line and current_commit:
-            all_commits.append([proj, current_commit, line])
+            rows.append([proj, current_commit, line])
+
+    return rows
+
+
+def collect_history(proj, repo_path, max_commits=MAX_COMMITS, n_workers=N_WORKERS):
+    """
+    区間ごとの git log を並行に実行し、区間の順につなぐ
+    （1回の git log と同じ行が同じ順で得られる）
+    """
+    ranges = split_ranges(list_commits(repo_path, max_commits), n_workers)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        outputs = executor.map(lambda r: log_range(repo_path, r), ranges)
+        rows = []
+        for output in outputs:
+            rows.extend(parse_log(proj, output))
+    return rows
+
+
+all_commits = []
+
+base_dir = os.path.abspath("..")  # java-data ディレクトリ
+
+print(f" Base dir: {base_dir}")
+
+for proj in PROJECTS:
+    repo_path = os.path.join(base_dir, proj)
+
+    print(f" Reading repo: {repo_path}")
+
+    try:
+        all_commits.extend(collect_history(proj, repo_path))
+    except RuntimeError as e:
+        print(f" Error in {proj}:", e)
+        continue
 
 df = pd.DataFrame(all_commits, columns=["project", "commit_id", "file_path"])
 df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8-sig")
@@ -20,66 +20,71 @@ def read_file(path):
 
 
 # --------------------------
-# Feature 1: file length
+# Phase 1: per-file artifacts
+#   各ファイルを1回だけ読み、ペア計算に必要な情報をまとめて作る
 # --------------------------
-def file_length(path):
-    content = read_file(path)
-    return len(content.splitlines())
+TOKEN_RE = re.compile(r"[A-Za-z_]+")
+METHOD_RE = re.compile(r"[A-Za-z0-9_]+(?=\()")   # かなり簡易な Java メソッド抽出
 
 
-# --------------------------
-# Feature 2: import similarity
-# --------------------------
-def import_similarity(f1, f2):
-    def get_imports(text):
-        imports = set()
-        for line in text.splitlines():
-            line = line.strip()
-            if line.startswith("import "):
-                imports.add(line)
-        return imports
-
-    t1 = read_file(f1)
-    t2 = read_file(f2)
-
-    i1, i2 = get_imports(t1), get_imports(t2)
-
-    if len(i1) == 0 and len(i2) == 0:
-        return 0.0
-    return len(i1 & i2) / max(len(i1), len(i2))
-
+def get_imports(text):
+    imports = set()
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("import "):
+            imports.add(line)
+    return imports
 
-# --------------------------
-# Feature 3: token jaccard
-# --------------------------
-def token_jaccard(f1, f2):
-    def tokenize(text):
-        return set(re.findall(r"[A-Za-z_]+", text))
 
-    t1 = tokenize(read_file(f1))
-    t2 = tokenize(read_file(f2))
+def file_artifacts(path):
+    text = read_file(path)
+    return {
+        "length": len(text.splitlines()),
+        "imports": frozenset(get_imports(text)),
+        "tokens": frozenset(TOKEN_RE.findall(text)),
+        "methods": frozenset(METHOD_RE.findall(text)),
+    }
 
-    if len(t1) == 0 and len(t2) == 0:
-        return 0.0
 
-    return len(t1 & t2) / len(t1 | t2)
+def build_artifact_table(paths):
+    table = {}
+    for path in paths:
+        if path not in table:
+            table[path] = file_artifacts(path)
+            if len(table) % 500 == 0:
+                print(f"Loaded {len(table)} files...")
+    return table
 
 
 # --------------------------
-# Feature 4: method name overlap
+# Phase 2: pair features (artifacts only)
 # --------------------------
-def method_name_overlap(f1, f2):
-    def extract_methods(text):
-        # かなり簡易な Java メソッド抽出 (public int func(...){ のような行)
-        return set(re.findall(r"[A-Za-z0-9_]+(?=\()", text))
+def overlap_ratio(a, b):
+    # import / method 用: 共通数 / 大きい方の要素数
+    if len(a) == 0 and len(b) == 0:
+        return 0.0
+    return len(a & b) / max(len(a), len(b))
 
-    m1 = extract_methods(read_file(f1))
-    m2 = extract_methods(read_file(f2))
 
-    if len(m1) == 0 and len(m2) == 0:
+def jaccard(a, b):
+    if len(a) == 0 and len(b) == 0:
         return 0.0
+    return len(a & b) / len(a | b)
 
-    return len(m1 & m2) / max(len(m1), len(m2))
+
+def compute_pair_features(file1, file2, table):
+    """
+    file1, file2 の列（同じ長さのリスト）から特徴量の列をまとめて計算
+    """
+    a1 = [table[f] for f in file1]
+    a2 = [table[f] for f in file2]
+    return {
+        "len1": [a["length"] for a in a1],
+        "len2": [a["length"] for a in a2],
+        "import_sim": [overlap_ratio(a["imports"], b["imports"]) for a, b in zip(a1, a2)],
+        "token_jaccard": [jaccard(a["tokens"], b["tokens"]) for a, b in zip(a1, a2)],
+        "method_overlap": [overlap_ratio(a["methods"], b["methods"]) for a, b in zip(a1, a2)],
+    }
 
 
 # --------------------------
@@ -87,26 +92,14 @@ def method_name_overlap(f1, f2):
 # --------------------------
 def main():
     df = pd.read_csv(INPUT_CSV)
-    
-    rows = []
-
-    for idx, row in df.iterrows():
-        f1, f2, label = row["file1"], row["file2"], row["label"]
 
-        fl1 = file_length(f1)
-        fl2 = file_length(f2)
-        imp_sim = import_similarity(f1, f2)
-        tok_jac = token_jaccard(f1, f2)
-        meth_ov = method_name_overlap(f1, f2)
+    file1 = df["file1"].tolist()
+    file2 = df["file2"].tolist()
 
-        rows.append([
-            f1, f2, label,
-            fl1, fl2,
-            imp_sim, tok_jac, meth_ov
-        ])
+    table = build_artifact_table(file1 + file2)
+    print(f"Loaded {len(table)} unique files for {len(df)} pairs")
 
-        if idx % 500 == 0:
-            print(f"Processed {idx} pairs...")
+    features = compute_pair_features(file1, file2, table)
 
     columns = [
         "file1", "file2", "label",
@@ -116,7 +109,12 @@ def main():
         "method_overlap"
     ]
 
-    out = pd.DataFrame(rows, columns=columns)
+    out = pd.DataFrame({
+        "file1": file1,
+        "file2": file2,
+        "label": df["label"],
+        **features,
+    }, columns=columns)
     out.to_csv(OUTPUT_CSV, index=False)
 
     print(f"✅ Saved feature dataset → {OUTPUT_CSV}")
@@ -125,4 +123,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
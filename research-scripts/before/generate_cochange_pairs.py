@@ -4,6 +4,10 @@ import pandas as pd
 import random
 from itertools import combinations
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from pair_sampler import pair_key, sample_negative_pairs
 
 INPUT_CSV = "commit_history.csv"
 OUTPUT_CSV = "cochange_pairs.csv"
@@ -50,18 +54,12 @@ def main():
         if len(positive_pairs) > 0:
             all_files = df_proj["file_path"].unique().tolist()
 
-            pos_set = {(p[1], p[2]) for p in positive_pairs if p[0] == proj}
-            pos_rev = {(p[2], p[1]) for p in positive_pairs if p[0] == proj}
-
-            neg_candidates = []
-            for f1, f2 in combinations(all_files, 2):
-                if (f1, f2) not in pos_set and (f1, f2) not in pos_rev:
-                    neg_candidates.append([proj, f1, f2, 0])
-
-            random.shuffle(neg_candidates)
+            pos_set = {pair_key(p[1], p[2]) for p in positive_pairs if p[0] == proj}
 
+            # 候補を全列挙せず、必要な数だけ棄却法で抽出
             needed = MAX_NEG - len(negative_pairs)
-            negative_pairs.extend(neg_candidates[:needed])
+            for f1, f2 in sample_negative_pairs(all_files, pos_set, needed, rng=random):
+                negative_pairs.append([proj, f1, f2, 0])
 
         print(f"📌 {proj}: 正例={len(positive_pairs)}, 負例={len(negative_pairs)}")
 
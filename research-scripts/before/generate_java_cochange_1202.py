@@ -1,6 +1,13 @@
 import pandas as pd
 import random
-from itertools import combinations
+import os
+import sys
+from bisect import bisect_right
+from collections import Counter
+from itertools import combinations, accumulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from pair_sampler import pair_key, count_negative_pairs, sample_negative_pairs
 
 INPUT_CSV = "commit_history.csv"
 OUTPUT_CSV = "cochange_pairs_java.csv"
@@ -29,7 +36,7 @@ def main():
     projects = df["project"].unique()
 
     all_positive_pairs = []
-    all_negative_pairs = []
+    negative_spaces = []   # (proj, ファイル一覧, 正例セット, 負例候補数)
 
     for proj in projects:
         df_proj = df[df["project"] == proj]
@@ -53,32 +60,36 @@ def main():
             for f1, f2 in combinations(java_files, 2):
                 positive_pairs.append([proj, f1, f2, 1])
 
-        # ---- 2) 負例（非共変更ペア） ----
+        # ---- 2) 負例（非共変更ペア）の候補空間 ----
+        #   候補は列挙せず、ファイル一覧と正例セット（重複防止用）だけ持つ
         all_files = df_proj["file_path"].unique().tolist()
+        positive_set = {pair_key(p[1], p[2]) for p in positive_pairs}
+        negative_spaces.append((
+            proj, all_files, positive_set,
+            count_negative_pairs(all_files, positive_set)
+        ))
 
-        # 正例セット（重複防止用）
-        positive_set = {(p[1], p[2]) for p in positive_pairs}
-        positive_reverse = {(p[2], p[1]) for p in positive_pairs}
-
-        negative_candidates = []
-        for f1, f2 in combinations(all_files, 2):
-            if (f1, f2) not in positive_set and (f1, f2) not in positive_reverse:
-                negative_candidates.append([proj, f1, f2, 0])
-
-        # 正例と負例をシャッフルして均等に
+        # 正例をシャッフル
         random.shuffle(positive_pairs)
-        random.shuffle(negative_candidates)
 
         # このプロジェクト分だけ追加
         all_positive_pairs.extend(positive_pairs)
-        all_negative_pairs.extend(negative_candidates)
 
     # ---- 3) 全体で 2000 行に制限 ----
     random.shuffle(all_positive_pairs)
-    random.shuffle(all_negative_pairs)
-
     selected_positive = all_positive_pairs[:TARGET_POSITIVE]
-    selected_negative = all_negative_pairs[:TARGET_NEGATIVE]
+
+    # 全プロジェクトの負例候補から一様に TARGET_NEGATIVE 個選ぶのと同じになるよう、
+    # 先に「何番目の候補か」を引いてプロジェクトごとの個数を決める
+    offsets = list(accumulate((space[3] for space in negative_spaces), initial=0))
+    picks = random.sample(range(offsets[-1]), min(TARGET_NEGATIVE, offsets[-1]))
+    quota = Counter(bisect_right(offsets, r) - 1 for r in picks)
+
+    selected_negative = []
+    for k, (proj, all_files, positive_set, _) in enumerate(negative_spaces):
+        for f1, f2 in sample_negative_pairs(all_files, positive_set, quota[k], rng=random):
+            selected_negative.append([proj, f1, f2, 0])
+    random.shuffle(selected_negative)
 
     pairs = selected_positive + selected_negative
     random.shuffle(pairs)
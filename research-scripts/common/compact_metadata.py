@@ -0,0 +1,203 @@
+# compact_metadata.py
+# extract_java_metadata.py の出力（dict のリスト）を
+# 共有語彙 + 整数 ID 配列のコンパクトな表現に変換する
+# ペア生成（generate_class_pairs.py）は、この形のまま特徴量を計算する
+
+import sys
+import json
+from array import array
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+# class_role の並び順（ビットマスクのビット位置）
+ROLE_KEYS = ("controller", "service", "repository", "dto")
+
+# 語彙 ID の配列として持つフィールド
+ARRAY_FIELDS = ("package_tokens", "class_name_tokens", "imports", "import_packages", "methods")
+
+
+class Vocabulary:
+    """
+    トークン・パッケージ名・import・メソッド名 → 整数 ID の共有辞書
+    同じ文字列は全クラスで1つのオブジェクトだけを持つ
+    """
+
+    __slots__ = ("ids", "items")
+
+    def __init__(self, items=()):
+        self.ids = {}
+        self.items = []
+        for item in items:
+            self.id_of(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def id_of(self, item):
+        i = self.ids.get(item)
+        if i is None:
+            item = sys.intern(item)
+            i = len(self.items)
+            self.ids[item] = i
+            self.items.append(item)
+        return i
+
+    def get(self, item):
+        return self.ids.get(item)
+
+    def encode(self, items):
+        return array("I", [self.id_of(x) for x in items])
+
+    def decode(self, ids):
+        return [self.items[i] for i in ids]
+
+
+class ClassRecord:
+    """
+    1クラス分のメタデータ
+    文字列の代わりに Vocabulary の ID（array('I')）を保持する
+    """
+
+    __slots__ = ("file_path", "package", "class_name", "roles") + ARRAY_FIELDS
+
+    @classmethod
+    def from_dict(cls, item, vocab: Vocabulary):
+        rec = cls()
+        rec.file_path = item["file_path"]
+        rec.package = vocab.id_of(item["package"])
+        rec.class_name = vocab.id_of(item["class_name"])
+        rec.roles = sum(
+            1 << bit for bit, key in enumerate(ROLE_KEYS) if item["class_role"][key]
+        )
+        rec.package_tokens = vocab.encode(item["package_tokens"])
+        rec.class_name_tokens = vocab.encode(item["class_name_tokens"])
+        rec.imports = vocab.encode(item["imports"])
+        rec.import_packages = vocab.encode(item["import_packages"])
+        rec.methods = vocab.encode(m["name"] for m in item["methods"])
+        return rec
+
+    def to_dict(self, vocab: Vocabulary):
+        """
+        extract_java_metadata.py の出力と同じ dict（キー順も同じ）に戻す
+        """
+        return {
+            "file_path": self.file_path,
+            "package": vocab.items[self.package],
+            "package_tokens": vocab.decode(self.package_tokens),
+            "class_name": vocab.items[self.class_name],
+            "class_name_tokens": vocab.decode(self.class_name_tokens),
+            "class_role": {
+                key: bool(self.roles >> bit & 1) for bit, key in enumerate(ROLE_KEYS)
+            },
+            "imports": vocab.decode(self.imports),
+            "import_packages": vocab.decode(self.import_packages),
+            "methods": [{"name": m} for m in vocab.decode(self.methods)],
+        }
+
+
+class CompactMetadata:
+    """
+    1プロジェクト分の ClassRecord と共有 Vocabulary
+    """
+
+    def __init__(self, vocab=None):
+        self.vocab = vocab if vocab is not None else Vocabulary()
+        self.records = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    @classmethod
+    def from_dicts(cls, items, vocab=None):
+        meta = cls(vocab)
+        meta.records = [ClassRecord.from_dict(item, meta.vocab) for item in items]
+        return meta
+
+    def to_dicts(self):
+        return [rec.to_dict(self.vocab) for rec in self.records]
+
+    def index(self):
+        return {rec.file_path: rec for rec in self.records}
+
+    # ===== 特徴量計算用の配列 =====
+    def column(self, attr):
+        """
+        package / class_name / roles などスカラーのフィールド → (クラス数,) の int64 配列
+        """
+        return np.fromiter((getattr(r, attr) for r in self.records), dtype=np.int64, count=len(self.records))
+
+    def token_matrix(self, field):
+        """
+        語彙 ID を列とする 0/1 の CSR 行列（クラス数 x 語彙数）
+        jaccard_engine.build_token_matrix と行の集合が同じなので、Jaccard も同じになる
+        """
+        rows = [np.unique(np.frombuffer(getattr(r, field), dtype=np.uint32)) for r in self.records]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        indices = np.concatenate(rows).astype(np.int64) if rows else np.empty(0, dtype=np.int64)
+        data = np.ones(len(indices), dtype=np.int32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), len(self.vocab)))
+
+    # ===== JSON（従来形式）との相互変換 =====
+    @classmethod
+    def load_json(cls, json_path: Path, vocab=None):
+        with open(json_path, encoding="utf-8") as f:
+            return cls.from_dicts(json.load(f), vocab)
+
+    def save_json(self, json_path: Path):
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dicts(), f, indent=2)
+
+    # ===== NumPy バッファ（.npz）での保存 =====
+    def save_npz(self, npz_path: Path):
+        """
+        可変長フィールドは CSR 形式（連結した ID 列 + offsets）で保存
+        """
+        arrays = {
+            "vocab": np.array(self.vocab.items, dtype=str),
+            "file_path": np.array([r.file_path for r in self.records], dtype=str),
+            "package": np.array([r.package for r in self.records], dtype=np.uint32),
+            "class_name": np.array([r.class_name for r in self.records], dtype=np.uint32),
+            "roles": np.array([r.roles for r in self.records], dtype=np.uint8),
+        }
+        for field in ARRAY_FIELDS:
+            lengths = np.array([len(getattr(r, field)) for r in self.records], dtype=np.int64)
+            offsets = np.zeros(len(self.records) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            data = np.empty(int(offsets[-1]), dtype=np.uint32)
+            for r, start, end in zip(self.records, offsets[:-1], offsets[1:]):
+                data[start:end] = getattr(r, field)
+            arrays[f"{field}_data"] = data
+            arrays[f"{field}_offsets"] = offsets
+        np.savez(npz_path, **arrays)
+
+    @classmethod
+    def load_npz(cls, npz_path: Path):
+        with np.load(npz_path) as z:
+            meta = cls(Vocabulary(z["vocab"].tolist()))
+            file_paths = z["file_path"].tolist()
+            packages = z["package"].tolist()
+            class_names = z["class_name"].tolist()
+            roles = z["roles"].tolist()
+            fields = {
+                field: (z[f"{field}_data"], z[f"{field}_offsets"].tolist())
+                for field in ARRAY_FIELDS
+            }
+
+            for i, file_path in enumerate(file_paths):
+                rec = ClassRecord()
+                rec.file_path = file_path
+                rec.package = packages[i]
+                rec.class_name = class_names[i]
+                rec.roles = roles[i]
+                for field, (data, offsets) in fields.items():
+                    ids = array("I")
+                    ids.frombytes(data[offsets[i]:offsets[i + 1]].tobytes())
+                    setattr(rec, field, ids)
+                meta.records.append(rec)
+        return meta
@@ -0,0 +1,95 @@
+# git_log.py
+# git log --name-status の出力を1行ずつ読み、コミットごとの dict にする
+# （extract_commit_log_to_json.py / extract_commit_log.py などで共有。import しても何も作らない）
+
+import json
+import subprocess
+from pathlib import Path
+
+# コミット行: "commit <hash>\t<UNIX 時刻>\t<作者名>"
+LOG_PRETTY = "commit %H%x09%ct%x09%an"
+
+
+def iter_git_log(repo_dir: Path, pretty=LOG_PRETTY, revision_range=None):
+    """
+    git log --name-status の出力を1行ずつ返す（全体をメモリに載せない）
+    revision_range（例: "abc123..HEAD"）を渡すとその範囲だけ
+    git が失敗した場合は、読み終わった時点で CalledProcessError を送出
+    """
+
+    cmd = [
+        "git", "log",
+        "--name-status",
+        f"--pretty=format:{pretty}"
+    ]
+    if revision_range:
+        cmd.append(revision_range)
+
+    proc = subprocess.Popen(
+        cmd,
+        cwd=repo_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,   # stderr を溜めてパイプが詰まらないよう捨てる
+        encoding="utf-8",
+        errors="ignore"
+    )
+    try:
+        for line in proc.stdout:
+            yield line.rstrip("\n")
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def iter_commits(lines):
+    """
+    git log の出力行から、コミットを1件ずつ
+      {commit: "...", time: UNIX 秒, author: "...", changes: [{type: "M", file: "src/..."}, ...]}
+    の形で返す（v1: 同一コミット内共変更用）
+    コミット行がハッシュだけ（"commit %H"）なら time / author は付けない
+    """
+
+    current = None
+
+    for line in lines:
+        if line.startswith("commit "):
+            if current:
+                yield current
+            fields = line[len("commit "):].split("\t", 2)
+            current = {"commit": fields[0].strip()}
+            if len(fields) == 3:
+                current["time"] = int(fields[1])
+                current["author"] = fields[2]
+            current["changes"] = []
+
+        elif line and current:
+            parts = line.split("\t")
+            if len(parts) == 2:
+                change_type, file_path = parts
+                if file_path.endswith(".java"):
+                    current["changes"].append({
+                        "type": change_type,   # A / M / D
+                        "file": file_path
+                    })
+
+    if current:
+        yield current
+
+
+def parse_git_log(lines):
+    """
+    iter_commits の結果をリストにまとめたもの
+    """
+    return list(iter_commits(lines))
+
+
+def read_commits_jsonl(path: Path):
+    """
+    <repo>_commits.jsonl を1コミットずつ読む
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
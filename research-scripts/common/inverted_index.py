@@ -0,0 +1,161 @@
+# inverted_index.py
+# メタデータから「トークン → そのトークンを持つファイル」の転置インデックスを作り、
+# 共通トークンを1つ以上（min_overlap 以上）持つペアだけを列挙する
+# 計算量は出力（共通トークンを持つペア）の数に比例し、全ペア O(n^2) を回らない
+
+import numpy as np
+
+from jaccard_engine import field_values
+
+# インデックス名 → メタデータのフィールド
+INDEX_FIELDS = {
+    "import": "import_packages",
+    "package": "package_tokens",
+    "method": "methods",
+}
+
+FLUSH_SIZE = 5_000_000   # ペアキーをこの数ためたら集計する
+
+
+def _pair_keys(members, block_size=FLUSH_SIZE):
+    """
+    ポスティングリスト（昇順のインデックス）内の全ペア i < j を (i << 32) | j で表し、
+    block_size 個前後ずつ返す（m ファイルのポスティングでも m^2/2 個を一度に作らない）
+    """
+    m = len(members)
+    if m * (m - 1) // 2 <= block_size:
+        a, b = np.triu_indices(m, k=1)
+        yield (members[a] << 32) | members[b]
+        return
+    rows = max(1, block_size // m)
+    for start in range(0, m - 1, rows):
+        yield np.concatenate([
+            (members[r] << 32) | members[r + 1:] for r in range(start, min(start + rows, m - 1))
+        ])
+
+
+def _count_keys(keys):
+    """
+    ペアキー（重複あり）→ (昇順の重複のないキー, 出現数)
+    """
+    keys, counts = np.unique(keys, return_counts=True)
+    return keys, counts.astype(np.int64)
+
+
+def _merge_counts(partials):
+    """
+    flush ごとの (keys, counts) をまとめて1回だけ集計し直す
+    """
+    if len(partials) == 1:
+        return partials[0]
+    keys, inverse = np.unique(np.concatenate([k for k, _ in partials]), return_inverse=True)
+    counts = np.bincount(
+        inverse.ravel(), weights=np.concatenate([c for _, c in partials]), minlength=len(keys)
+    ).astype(np.int64)
+    return keys, counts
+
+
+class InvertedIndex:
+    """
+    1プロジェクト分のメタデータ、1フィールド分の転置インデックス
+    - postings : {トークン: そのトークンを持つファイルのインデックス（昇順 int64 配列）}
+    - sizes    : ファイルごとのトークン数（重複なし）
+    max_posting を超える長さのポスティング（java.util のようにほぼ全員が持つもの）は
+    ペア数が二乗で増えるだけで区別に役立たないので、join から外す
+    （float ならファイル数に対する割合。例: 0.2 → 2割より多くのファイルが持つトークンを外す）
+    """
+
+    def __init__(self, items, field, max_posting=None):
+        self.field = field
+        if isinstance(max_posting, float):
+            max_posting = max(2, int(max_posting * len(items)))
+        self.max_posting = max_posting
+        self.index = {item["file_path"]: i for i, item in enumerate(items)}
+
+        postings = {}
+        self.file_tokens = []
+        for i, item in enumerate(items):
+            tokens = set(field_values(item, field))
+            self.file_tokens.append(tokens)
+            for t in tokens:
+                postings.setdefault(t, []).append(i)
+
+        self.postings = {t: np.array(m, dtype=np.int64) for t, m in postings.items()}
+        self.sizes = np.array([len(t) for t in self.file_tokens], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def _usable(self, members):
+        return self.max_posting is None or len(members) <= self.max_posting
+
+    def files_with(self, token):
+        return self.postings.get(token, np.empty(0, dtype=np.int64))
+
+    def skipped_tokens(self):
+        if self.max_posting is None:
+            return []
+        return [t for t, m in self.postings.items() if len(m) > self.max_posting]
+
+    def overlap_counts(self, min_overlap=1, flush_size=FLUSH_SIZE):
+        """
+        共通トークン数が min_overlap 以上のペア (i, j, 共通数) を i < j で返す
+        ポスティングを1回ずつ走査してペアキーを溜め、flush ごとに数えておき、最後に合算する
+        """
+        partials = []
+        pending = []
+        n_pending = 0
+        for members in self.postings.values():
+            if len(members) < 2 or not self._usable(members):
+                continue
+            for keys in _pair_keys(members, flush_size):
+                pending.append(keys)
+                n_pending += len(keys)
+                if n_pending >= flush_size:
+                    partials.append(_count_keys(np.concatenate(pending)))
+                    pending, n_pending = [], 0
+        if pending:
+            partials.append(_count_keys(np.concatenate(pending)))
+
+        if not partials:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+
+        keys, counts = _merge_counts(partials)
+        keep = counts >= min_overlap
+        keys, counts = keys[keep], counts[keep]
+        return keys >> 32, keys & 0xFFFFFFFF, counts
+
+    def overlap_join(self, min_overlap=1):
+        """
+        共通トークン数が min_overlap 以上のペア (i, j, Jaccard) を返す
+        max_posting で外したトークンは共通数に数えないが、分母（和集合）には含める
+        """
+        i, j, inter = self.overlap_counts(min_overlap)
+        union = self.sizes[i] + self.sizes[j] - inter
+        return i, j, inter / np.maximum(union, 1)
+
+    def neighbors(self, file_path, min_overlap=1):
+        """
+        1ファイルと共通トークンを持つファイル {インデックス: 共通数}
+        """
+        q = self.index[file_path]
+        found = {}
+        for t in self.file_tokens[q]:
+            members = self.postings[t]
+            if not self._usable(members):
+                continue
+            for other in members.tolist():
+                if other != q:
+                    found[other] = found.get(other, 0) + 1
+        return {k: v for k, v in found.items() if v >= min_overlap}
+
+
+def build_indexes(items, fields=INDEX_FIELDS, max_posting=None):
+    """
+    {インデックス名: InvertedIndex}
+    """
+    return {
+        name: InvertedIndex(items, field, max_posting)
+        for name, field in fields.items()
+    }
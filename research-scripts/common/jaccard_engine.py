@@ -0,0 +1,160 @@
+# jaccard_engine.py
+# メタデータ（extract_java_metadata.py の出力）のトークン集合を
+# 疎行列の行として持ち、多数のペアの Jaccard 類似度をまとめて計算する
+
+import numpy as np
+from scipy import sparse
+
+# 集合として扱うフィールド
+SET_FIELDS = ("package_tokens", "class_name_tokens", "import_packages", "methods")
+
+BATCH_SIZE = 1_000_000   # 行ごとの積を取るときに一度に処理するペア数
+
+
+def field_values(item, field):
+    """
+    メタデータ1件からフィールドの値（文字列のリスト）を取り出す
+    methods だけは [{"name": ...}] 形式なので名前に直す
+    """
+    values = item.get(field, [])
+    if field == "methods":
+        return [m["name"] for m in values]
+    return values
+
+
+def build_token_matrix(items, field):
+    """
+    items の各要素を1行とする 0/1 の CSR 行列（n_items x 語彙数）
+    同じトークンが複数回出ても1として数える
+    """
+    vocab = {}
+    indptr = [0]
+    indices = []
+    for item in items:
+        row = {vocab.setdefault(v, len(vocab)) for v in field_values(item, field)}
+        indices.extend(sorted(row))
+        indptr.append(len(indices))
+
+    data = np.ones(len(indices), dtype=np.int32)
+    return sparse.csr_matrix(
+        (data, np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+        shape=(len(items), len(vocab))
+    )
+
+
+def _jaccard(inter, sizes_a, sizes_b):
+    union = sizes_a + sizes_b - inter
+    out = np.zeros(len(inter), dtype=np.float64)
+    np.divide(inter, union, out=out, where=union > 0)
+    return out
+
+
+def pair_intersections(matrix, idx_a, idx_b, batch_size=BATCH_SIZE):
+    """
+    ペア (idx_a[k], idx_b[k]) ごとの共通トークン数
+    行を取り出して要素積 → 行和、をバッチ単位で行う
+    """
+    idx_a = np.asarray(idx_a, dtype=np.int64)
+    idx_b = np.asarray(idx_b, dtype=np.int64)
+    inter = np.empty(len(idx_a), dtype=np.int64)
+    for start in range(0, len(idx_a), batch_size):
+        a = matrix[idx_a[start:start + batch_size]]
+        b = matrix[idx_b[start:start + batch_size]]
+        inter[start:start + batch_size] = np.asarray(a.multiply(b).sum(axis=1)).ravel()
+    return inter
+
+
+def jaccard_pairs(matrix, idx_a, idx_b, batch_size=BATCH_SIZE):
+    """
+    明示したペアの Jaccard 類似度（どちらも空集合なら 0.0）
+    """
+    sizes = np.diff(matrix.indptr)
+    idx_a = np.asarray(idx_a, dtype=np.int64)
+    idx_b = np.asarray(idx_b, dtype=np.int64)
+    inter = pair_intersections(matrix, idx_a, idx_b, batch_size)
+    return _jaccard(inter, sizes[idx_a], sizes[idx_b])
+
+
+def stacked_intersections(matrix, owner, n_fields, idx_a, idx_b, batch_size=BATCH_SIZE):
+    """
+    フィールドの行列を横に並べた matrix について、ペアごと・フィールドごとの共通トークン数
+    owner[列] = その列のフィールド番号 → (ペア数, n_fields) の int64 配列
+    行の取り出しと要素積はフィールドをまとめて1回
+    """
+    inter = np.zeros((len(idx_a), n_fields), dtype=np.int64)
+    for start in range(0, len(idx_a), batch_size):
+        a = matrix[idx_a[start:start + batch_size]]
+        b = matrix[idx_b[start:start + batch_size]]
+        common = a.multiply(b).tocsr()
+        rows = np.repeat(np.arange(common.shape[0]), np.diff(common.indptr))
+        counts = np.bincount(
+            rows * n_fields + owner[common.indices], minlength=common.shape[0] * n_fields
+        )
+        inter[start:start + common.shape[0]] = counts.reshape(-1, n_fields)
+    return inter
+
+
+def jaccard_all_pairs(matrix):
+    """
+    全ペア (i < j) のうち共通トークンが1つ以上あるものについて
+    (i, j, jaccard) の配列を返す（M @ M.T の上三角）
+    共通0のペアは類似度 0.0 なので含めない
+    """
+    sizes = np.diff(matrix.indptr)
+    inter = sparse.triu(matrix @ matrix.T, k=1).tocoo()
+    i = inter.row.astype(np.int64)
+    j = inter.col.astype(np.int64)
+    return i, j, _jaccard(inter.data.astype(np.int64), sizes[i], sizes[j])
+
+
+class JaccardEngine:
+    """
+    1プロジェクト分のメタデータに対して、フィールドごとの行列を1回だけ作り
+    ペア配列（インデックス）から類似度の配列を返す
+    """
+
+    def __init__(self, items, fields=SET_FIELDS):
+        self.items = items
+        self.index = {item["file_path"]: i for i, item in enumerate(items)}
+        self.matrices = {field: build_token_matrix(items, field) for field in fields}
+        self._stacked = {}
+
+    def indices_of(self, file_paths):
+        return np.array([self.index[f] for f in file_paths], dtype=np.int64)
+
+    def stacked(self, fields):
+        """
+        fields の行列を横に並べたもの → (行列, 列ごとのフィールド番号, (行数, フィールド数) のトークン数)
+        """
+        fields = tuple(fields)
+        if fields not in self._stacked:
+            matrices = [self.matrices[field] for field in fields]
+            self._stacked[fields] = (
+                sparse.hstack(matrices, format="csr"),
+                np.repeat(np.arange(len(fields)), [m.shape[1] for m in matrices]),
+                np.stack([np.diff(m.indptr) for m in matrices], axis=1),
+            )
+        return self._stacked[fields]
+
+    def pairs(self, idx_a, idx_b, fields=None):
+        """
+        {field: Jaccard 配列}（idx_a, idx_b と同じ長さ）
+        全フィールドを1回の行列演算で計算し、同じペアが何度出ても1回だけ計算する
+        （コミット×ペアのデータセットでは同じペアが繰り返し現れる）
+        """
+        fields = list(fields or self.matrices.keys())
+        idx_a = np.asarray(idx_a, dtype=np.int64)
+        idx_b = np.asarray(idx_b, dtype=np.int64)
+        n = max(len(self.index), 1)
+        keys, inverse = np.unique(idx_a * n + idx_b, return_inverse=True)
+        uniq_a, uniq_b = keys // n, keys % n
+
+        matrix, owner, sizes = self.stacked(fields)
+        inter = stacked_intersections(matrix, owner, len(fields), uniq_a, uniq_b)
+        return {
+            field: _jaccard(inter[:, k], sizes[uniq_a, k], sizes[uniq_b, k])[inverse.ravel()]
+            for k, field in enumerate(fields)
+        }
+
+    def all_pairs(self, field):
+        return jaccard_all_pairs(self.matrices[field])
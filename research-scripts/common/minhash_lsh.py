@@ -0,0 +1,191 @@
+# minhash_lsh.py
+# クラスごとのトークン集合（クラス名トークン・import パッケージ・メソッド名）に
+# MinHash 署名を付け、LSH（バンド分割）で Jaccard の近いクラスを高速に探す
+
+import hashlib
+
+import numpy as np
+
+# LSH で候補になる類似度の目安は (1 / BANDS) ** (1 / 行数)。64 x 3 行 → 約 0.25
+# （近傍 top-10 の Jaccard はおおむね 0.3〜0.45。2行にすると java.util や get / toString を
+#   共有するだけのクラスまで候補になり、全件比較に近づく）
+NUM_PERM = 192           # 署名の長さ
+BANDS = 64               # バンド数（1バンド = NUM_PERM / BANDS 行）
+SEED = 1
+
+_PRIME = (1 << 61) - 1   # メルセンヌ素数
+_MAX_HASH = np.uint64(_PRIME)
+
+
+def tokens_from_metadata(item):
+    """
+    extract_java_metadata.py の1件 → 種類の接頭辞付きトークン集合
+    """
+    tokens = set()
+    tokens.update("c:" + t for t in item.get("class_name_tokens", []))
+    tokens.update("i:" + t for t in item.get("import_packages", []))
+    tokens.update("m:" + m["name"] for m in item.get("methods", []))
+    return tokens
+
+
+def _token_hash(token):
+    # 実行ごとに変わらない 32bit ハッシュ（hash() は PYTHONHASHSEED で変わる）
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+class MinHasher:
+    """
+    h_k(x) = (a_k * x + b_k) mod p  を NUM_PERM 個使う
+    a_k < 2^31, x < 2^32 なので uint64 で桁あふれしない
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=SEED):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def signature(self, tokens):
+        if not tokens:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        x = np.array([_token_hash(t) for t in tokens], dtype=np.uint64)
+        hashed = (np.outer(self.a, x) + self.b[:, None]) % _MAX_HASH
+        return hashed.min(axis=1)
+
+
+def exact_jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def estimate_jaccard(sig_a, sig_b):
+    empty = sig_a[0] == _MAX_HASH and (sig_a == _MAX_HASH).all()
+    if empty:
+        return 0.0
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+class MinHashLSHIndex:
+    """
+    キー（ファイルパス）→ MinHash 署名 と、バンドごとのバケット
+    - insert / remove で差分更新
+    - query(key, k) は同じバケットに入った候補だけを並べる
+      keep_tokens=True ならトークン集合も保持し、候補を厳密な Jaccard で並べ直す
+      （推定値だけだと近い候補同士の順位がぶれるため）
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, seed=SEED, keep_tokens=True):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.hasher = MinHasher(num_perm, seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.seed = seed
+        self.keep_tokens = keep_tokens
+        self.signatures = {}
+        self.tokens = {}
+        self.buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __contains__(self, key):
+        return key in self.signatures
+
+    def _band_keys(self, sig):
+        return [
+            sig[i * self.rows:(i + 1) * self.rows].tobytes()
+            for i in range(self.bands)
+        ]
+
+    def insert(self, key, tokens):
+        self.insert_signature(key, self.hasher.signature(tokens), tokens)
+
+    def insert_signature(self, key, sig, tokens=None):
+        if key in self.signatures:
+            self.remove(key)
+        self.signatures[key] = sig
+        if self.keep_tokens and tokens is not None:
+            self.tokens[key] = frozenset(tokens)
+        if sig[0] == _MAX_HASH and (sig == _MAX_HASH).all():
+            return      # 空集合はどのバケットにも入れない
+        for bucket, band_key in zip(self.buckets, self._band_keys(sig)):
+            bucket.setdefault(band_key, set()).add(key)
+
+    def remove(self, key):
+        sig = self.signatures.pop(key, None)
+        self.tokens.pop(key, None)
+        if sig is None:
+            return
+        for bucket, band_key in zip(self.buckets, self._band_keys(sig)):
+            members = bucket.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del bucket[band_key]
+
+    def candidates(self, sig):
+        found = set()
+        for bucket, band_key in zip(self.buckets, self._band_keys(sig)):
+            found.update(bucket.get(band_key, ()))
+        return found
+
+    def _score(self, sig, tokens, other):
+        if tokens is not None and other in self.tokens:
+            return exact_jaccard(tokens, self.tokens[other])
+        return estimate_jaccard(sig, self.signatures[other])
+
+    def query_signature(self, sig, k, exclude=None, tokens=None):
+        scored = [
+            (other, self._score(sig, tokens, other))
+            for other in self.candidates(sig)
+            if other != exclude
+        ]
+        scored.sort(key=lambda x: (-x[1], x[0]))
+        return scored[:k]
+
+    def query(self, key, k=10):
+        """
+        登録済みのファイル key に近い上位 k 件 [(file_path, Jaccard)]
+        """
+        return self.query_signature(
+            self.signatures[key], k, exclude=key, tokens=self.tokens.get(key)
+        )
+
+    def query_tokens(self, tokens, k=10):
+        tokens = frozenset(tokens)
+        return self.query_signature(
+            self.hasher.signature(tokens), k,
+            tokens=tokens if self.keep_tokens else None
+        )
+
+    # ===== 保存・読み込み（バケットは読み込み時に作り直す） =====
+    def save(self, path):
+        keys = list(self.signatures)
+        sigs = (
+            np.stack([self.signatures[k] for k in keys])
+            if keys else np.empty((0, self.num_perm), dtype=np.uint64)
+        )
+        # トークン集合はタブ区切りの1文字列として保存
+        tokens = ["\t".join(sorted(self.tokens.get(k, ()))) for k in keys]
+        np.savez(
+            path,
+            keys=np.array(keys, dtype=str),
+            signatures=sigs,
+            tokens=np.array(tokens, dtype=str),
+            params=np.array(
+                [self.num_perm, self.bands, self.seed, int(self.keep_tokens)], dtype=np.int64
+            ),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            num_perm, bands, seed, keep_tokens = z["params"].tolist()
+            index = cls(num_perm, bands, seed, bool(keep_tokens))
+            for key, sig, tokens in zip(z["keys"].tolist(), z["signatures"], z["tokens"].tolist()):
+                token_set = tokens.split("\t") if tokens else ()
+                index.insert_signature(key, sig.copy(), token_set if keep_tokens else None)
+        return index
@@ -0,0 +1,191 @@
+# pair_sampler.py
+# n 個の要素から、順序なしペア (i < j) を k 個だけ重複なく一様に抽出する
+# itertools.combinations を全部作らないので、メモリは O(k)（層別時は O(n + k)）
+
+import math
+import random
+from bisect import bisect_right
+from itertools import accumulate
+
+
+def n_pairs(n):
+    return n * (n - 1) // 2
+
+
+def unrank_pair(r, n):
+    """
+    itertools.combinations(range(n), 2) の r 番目 (0始まり) のペアを直接求める
+    """
+    # 行 i の先頭の順位は S(i) = i * (2n - i - 1) / 2
+    b = 2 * n - 1
+    i = (b - math.isqrt(b * b - 8 * r)) // 2
+    # isqrt の切り捨て誤差を補正
+    while i > 0 and i * (b - i) // 2 > r:
+        i -= 1
+    while (i + 1) * (b - i - 1) // 2 <= r:
+        i += 1
+    j = r - i * (b - i) // 2 + i + 1
+    return i, j
+
+
+def _make_rng(seed=None, rng=None):
+    if rng is not None:
+        return rng
+    return random.Random(seed)
+
+
+def sample_pairs(n, k, seed=None, rng=None):
+    """
+    C(n, 2) 通りから k 個のペアを一様・非復元で抽出（抽出順）
+    k が全ペア数以上なら全ペアを返す
+    """
+    rng = _make_rng(seed, rng)
+    total = n_pairs(n)
+    ranks = rng.sample(range(total), min(k, total))
+    return [unrank_pair(r, n) for r in ranks]
+
+
+class GroupedPairSpace:
+    """
+    グループ（パッケージなど）付きの要素に対して
+      same  : 同じグループ内のペア
+      cross : 異なるグループ間のペア
+    の全体を、列挙せずに順位 ↔ ペアで扱う
+    """
+
+    def __init__(self, groups):
+        # グループごとに連続するよう並べ替えた位置 → 元のインデックス
+        self.order = sorted(range(len(groups)), key=lambda i: groups[i])
+        n = len(self.order)
+
+        # 各位置が属するグループの終端（排他的）
+        self.group_end = [0] * n
+        end = n
+        for pos in range(n - 1, -1, -1):
+            if pos < n - 1 and groups[self.order[pos]] != groups[self.order[pos + 1]]:
+                end = pos + 1
+            self.group_end[pos] = end
+
+        # 位置 p を小さい方とするペア数の累積
+        self.same_prefix = list(accumulate(
+            (self.group_end[p] - p - 1 for p in range(n)), initial=0
+        ))
+        self.cross_prefix = list(accumulate(
+            (n - self.group_end[p] for p in range(n)), initial=0
+        ))
+
+    def count(self, mode):
+        return (self.same_prefix if mode == "same" else self.cross_prefix)[-1]
+
+    def unrank(self, r, mode):
+        prefix = self.same_prefix if mode == "same" else self.cross_prefix
+        p = bisect_right(prefix, r) - 1
+        offset = r - prefix[p]
+        q = (p + 1 + offset) if mode == "same" else (self.group_end[p] + offset)
+        i, j = self.order[p], self.order[q]
+        return (i, j) if i < j else (j, i)
+
+    def sample(self, k, mode, rng):
+        total = self.count(mode)
+        ranks = rng.sample(range(total), min(k, total))
+        return [self.unrank(r, mode) for r in ranks]
+
+
+def sample_pairs_by_group(groups, k, mode="same", seed=None, rng=None):
+    """
+    same / cross のどちらかの層だけから k 個を一様に抽出
+    """
+    rng = _make_rng(seed, rng)
+    return GroupedPairSpace(groups).sample(k, mode, rng)
+
+
+def sample_stratified_pairs(groups, k, same_ratio, seed=None, rng=None):
+    """
+    同一グループ内ペアが same_ratio の割合になるように k 個を抽出
+    片方の層が足りない場合は、もう片方で埋める
+    """
+    rng = _make_rng(seed, rng)
+    space = GroupedPairSpace(groups)
+
+    n_same = min(round(k * same_ratio), space.count("same"))
+    n_cross = min(k - n_same, space.count("cross"))
+    n_same = min(k - n_cross, space.count("same"))
+
+    pairs = space.sample(n_same, "same", rng) + space.sample(n_cross, "cross", rng)
+    rng.shuffle(pairs)
+    return pairs
+
+
+# ===== 負例（正例に含まれないペア）の抽出 =====
+# 欲しい数が候補全体のこの割合を超えたら、棄却法ではなく順に走査して選ぶ
+DENSE_FRACTION = 0.5
+
+
+def pair_key(a, b):
+    """
+    順序なしペアの正規化キー（正例集合の照合用）
+    """
+    return (a, b) if a <= b else (b, a)
+
+
+def count_negative_pairs(items, positive_pairs):
+    """
+    items の全ペアのうち positive_pairs に含まれないものの数
+    """
+    members = set(items)
+    blocked = {
+        pair_key(a, b) for a, b in positive_pairs
+        if a != b and a in members and b in members
+    }
+    return n_pairs(len(items)) - len(blocked)
+
+
+def sample_negative_pairs(items, positive_pairs, k, seed=None, rng=None):
+    """
+    items（重複なし）の順序なしペアのうち、positive_pairs に含まれないものを
+    k 個（足りなければ全部）非復元で一様に抽出して [(items[i], items[j])] (i < j) で返す
+
+    positive_pairs は pair_key で正規化したタプルの set（ハッシュで照合）
+    - 通常は全ペア空間から順位を引き、正例・抽出済みを棄却する（O(k) 時間・メモリ）
+    - k が候補数の DENSE_FRACTION を超える場合だけ、全ペアを1回走査して選ぶ
+    """
+    rng = _make_rng(seed, rng)
+    n = len(items)
+    total = n_pairs(n)
+    available = count_negative_pairs(items, positive_pairs)
+    k = min(k, available)
+    if k <= 0:
+        return []
+
+    def is_positive(i, j):
+        return pair_key(items[i], items[j]) in positive_pairs
+
+    if k <= available * DENSE_FRACTION:
+        chosen = set()
+        result = []
+        while len(result) < k:
+            r = rng.randrange(total)
+            if r in chosen:
+                continue
+            i, j = unrank_pair(r, n)
+            if is_positive(i, j):
+                continue
+            chosen.add(r)
+            result.append((items[i], items[j]))
+        return result
+
+    # 候補が少ない場合: 選択抽出法（Knuth Algorithm S）で走査
+    result = []
+    remaining = available
+    for i in range(n):
+        for j in range(i + 1, n):
+            if is_positive(i, j):
+                continue
+            if rng.random() * remaining < k - len(result):
+                result.append((items[i], items[j]))
+                if len(result) == k:
+                    rng.shuffle(result)
+                    return result
+            remaining -= 1
+    rng.shuffle(result)
+    return result
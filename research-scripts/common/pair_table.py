@@ -0,0 +1,320 @@
+# pair_table.py
+# ステージ間で受け渡すペア・データセット（同じキーを持つ辞書の配列）の保存と読み込み
+#   - JSON     : これまでどおりの indent=2 の配列（中身の確認用）
+#   - 列形式   : pyarrow があれば Parquet（文字列の列は dictionary 型）、
+#                なければ .npz（文字列の列は重複のない値の表 + int32 のコード）
+#                ファイルパスのように同じ文字列が何度も出る列は値を1回だけ持つ
+# 書き出しは既定では JSON だけで、列形式は FORMATS / formats で指定したときだけ作る
+# 読み込みは <名前>.json と同じ場所の列形式を優先し、必要な列だけ取り出せる
+# （JSON の方が新しければ JSON を読む。列形式だけでも JSON だけでも読める）
+
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# 書き出す形式（"json" / "columnar"）。既定は JSON だけ。
+# ("columnar",) なら列形式だけ、("json", "columnar") なら両方（読み込みはどちらでもよい）
+FORMATS = ("json",)
+SCHEMA_KEY = "pair_table"        # 列の種類（str / int / float / bool / json）の記録先
+WRITE_CHUNK = 100_000            # JSON を書くときに一度に組み立てる行数
+
+
+# ===== 行 ↔ 列 =====
+def to_columns(records):
+    """
+    [{列名: 値}] → {列名: 値のリスト}
+    列名はすべての行のキーの和集合（初出順）。キーの無い行の値は None
+    """
+    if not records:
+        return {}
+    names = list(records[0])
+    try:
+        columns = {key: [row[key] for row in records] for key in names}
+        # どの行にも先頭の行のキーがあり、キーの総数も同じなら余分なキーは無い
+        if sum(map(len, records)) == len(names) * len(records):
+            return columns
+    except KeyError:
+        pass
+    names = dict.fromkeys(key for row in records for key in row)
+    return {key: [row.get(key) for row in records] for key in names}
+
+
+def to_records(columns):
+    names = list(columns)
+    values = [v.tolist() if isinstance(v, np.ndarray) else v for v in columns.values()]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def n_rows(columns):
+    return len(next(iter(columns.values()), ()))
+
+
+def factorize(values):
+    """
+    値の列 → (値ごとのコード配列, 重複のない値のリスト（初出順）)
+    """
+    codes = {}
+    ids = np.fromiter(
+        (codes.setdefault(v, len(codes)) for v in values), dtype=np.int64, count=len(values)
+    )
+    return ids, list(codes)
+
+
+def column_kind(values):
+    """
+    列の保存のしかた: str（辞書符号化）/ int / float / bool / json（それ以外、値ごとに JSON 文字列）
+    """
+    if isinstance(values, np.ndarray):
+        return {"b": "bool", "i": "int", "u": "int", "f": "float"}.get(values.dtype.kind, "json")
+    types = set(map(type, values))
+    if len(types) == 1:
+        return {str: "str", int: "int", float: "float", bool: "bool"}.get(types.pop(), "json")
+    return "json"
+
+
+def _encoded(values, kind):
+    # 保存する値: str / json は (コード, 重複のない文字列)、数値は配列
+    if kind == "str":
+        return factorize(values)
+    if kind == "json":
+        return factorize([json.dumps(v, ensure_ascii=False) for v in values])
+    dtype = {"int": np.int64, "float": np.float64, "bool": np.bool_}[kind]
+    return np.asarray(values, dtype=dtype)
+
+
+def _decoded(codes, uniques, kind):
+    if kind == "json":
+        uniques = [json.loads(u) for u in uniques]
+    return np.array(uniques, dtype=object)[codes].tolist()
+
+
+# ===== JSON =====
+def _encode_column(values, before, after, ensure_ascii):
+    """
+    列の値 → before + JSON 文字列 + after のリスト
+    変換と連結は重複のない値ごとに1回だけ
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+        uniques, codes = np.unique(values, return_inverse=True)
+        encoded = [before + json.dumps(v) + after for v in uniques.tolist()]
+    else:
+        if isinstance(values, np.ndarray):
+            values = values.tolist()
+        if len(set(map(type, values))) > 1:
+            # 1 と True のように等しい値を別の JSON にするため、型が混ざる列は1件ずつ
+            return [before + json.dumps(v, ensure_ascii=ensure_ascii) + after for v in values]
+        codes, uniques = factorize(values)
+        encoded = [before + json.dumps(v, ensure_ascii=ensure_ascii) + after for v in uniques]
+    return np.array(encoded, dtype=object)[codes].tolist()
+
+
+def write_json(path, columns, ensure_ascii=True):
+    """
+    列形式のまま、json.dump(to_records(columns), f, indent=2) と同じ JSON を書く
+    行の区切りやキーは各列の値の前後に付けておき、列を交互に並べて連結するだけにする
+    """
+    n = n_rows(columns)
+    with open(path, "w", encoding="utf-8") as f:
+        if n == 0:
+            f.write("[]")
+            return
+        names = list(columns)
+        encoded = []
+        for k, name in enumerate(names):
+            before = (",\n  {\n" if k == 0 else ",\n") + f"    {json.dumps(name, ensure_ascii=ensure_ascii)}: "
+            after = "\n  }" if k == len(names) - 1 else ""
+            encoded.append(_encode_column(columns[name], before, after, ensure_ascii))
+
+        f.write("[")
+        for start in range(0, n, WRITE_CHUNK):
+            size = min(WRITE_CHUNK, n - start)
+            parts = [None] * (size * len(names))
+            for k, column in enumerate(encoded):
+                parts[k::len(names)] = column[start:start + size]
+            if start == 0:
+                parts[0] = parts[0][1:]     # 先頭の行には区切りの "," が要らない
+            f.write("".join(parts))
+        f.write("\n]")
+
+
+def read_json(path, columns=None):
+    with open(path, encoding="utf-8") as f:
+        data = to_columns(json.load(f))
+    if columns is not None:
+        data = {name: data[name] for name in columns if name in data}
+    return data
+
+
+# ===== 列形式 =====
+def columnar_suffix():
+    return ".parquet" if pq is not None else ".npz"
+
+
+def _write_parquet(path, columns, kinds):
+    arrays = {}
+    for name, values in columns.items():
+        enc = _encoded(values, kinds[name])
+        if isinstance(enc, tuple):
+            codes, uniques = enc
+            arrays[name] = pa.DictionaryArray.from_arrays(
+                pa.array(codes.astype(np.int32)), pa.array(uniques, type=pa.string())
+            )
+        else:
+            arrays[name] = pa.array(enc)
+    table = pa.table(arrays) if arrays else pa.table({})
+    table = table.replace_schema_metadata({SCHEMA_KEY: json.dumps(kinds)})
+    pq.write_table(table, path)
+
+
+def _read_parquet(path, columns=None):
+    kinds = json.loads(pq.read_schema(path).metadata[SCHEMA_KEY.encode()])
+    names = list(kinds) if columns is None else [c for c in columns if c in kinds]
+    table = pq.read_table(path, columns=names)
+    data = {}
+    for name in names:
+        column = table.column(name)
+        if kinds[name] in ("str", "json"):
+            # dictionary はチャンクごとに違うことがあるので、チャンクごとに戻す
+            values = []
+            for chunk in column.chunks:
+                if not pa.types.is_dictionary(chunk.type):
+                    chunk = chunk.dictionary_encode()
+                codes = chunk.indices.to_numpy(zero_copy_only=False)
+                values += _decoded(codes, chunk.dictionary.to_pylist(), kinds[name])
+            data[name] = values
+        else:
+            data[name] = column.to_numpy()
+    return data
+
+
+def _write_npz(path, columns, kinds):
+    arrays = {}
+    for k, (name, values) in enumerate(columns.items()):
+        enc = _encoded(values, kinds[name])
+        if isinstance(enc, tuple):
+            codes, uniques = enc
+            arrays[f"c{k}"] = codes.astype(np.int32)
+            arrays[f"v{k}"] = np.frombuffer(
+                json.dumps(uniques, ensure_ascii=False).encode("utf-8"), dtype=np.uint8
+            )
+        else:
+            arrays[f"c{k}"] = enc
+    schema = json.dumps([[name, kinds[name]] for name in columns], ensure_ascii=False)
+    np.savez(path, schema=np.frombuffer(schema.encode("utf-8"), dtype=np.uint8), **arrays)
+
+
+def _read_npz(path, columns=None):
+    data = {}
+    with np.load(path) as z:
+        schema = json.loads(z["schema"].tobytes().decode("utf-8"))
+        kinds = dict(schema)
+        names = list(kinds) if columns is None else [c for c in columns if c in kinds]
+        position = {name: k for k, (name, _) in enumerate(schema)}
+        for name in names:
+            k = position[name]
+            if kinds[name] in ("str", "json"):
+                uniques = json.loads(z[f"v{k}"].tobytes().decode("utf-8"))
+                data[name] = _decoded(z[f"c{k}"], uniques, kinds[name])
+            else:
+                data[name] = z[f"c{k}"]
+    return data
+
+
+def write_columnar(path, columns):
+    path = Path(path)
+    kinds = {name: column_kind(values) for name, values in columns.items()}
+    tmp = path.with_name(path.stem + ".tmp" + path.suffix)
+    if path.suffix == ".parquet":
+        _write_parquet(tmp, columns, kinds)
+    else:
+        _write_npz(tmp, columns, kinds)
+    os.replace(tmp, path)
+
+
+def read_columnar(path, columns=None):
+    """
+    {列名: 値}（str / json の列はリスト、数値の列は NumPy 配列）
+    """
+    if Path(path).suffix == ".parquet":
+        return _read_parquet(path, columns)
+    return _read_npz(path, columns)
+
+
+# ===== <名前>.json を基準にした入出力 =====
+def columnar_paths(json_path):
+    json_path = Path(json_path)
+    suffixes = (".parquet", ".npz") if pq is not None else (".npz",)
+    return [json_path.with_suffix(s) for s in suffixes]
+
+
+def source_path(json_path):
+    """
+    json_path に対応する、実際に読むファイル（一番新しいもの。同時刻なら列形式。どれも無ければ None）
+    """
+    candidates = [p for p in [*columnar_paths(json_path), Path(json_path)] if p.exists()]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda p: p.stat().st_mtime_ns)
+
+
+def table_exists(json_path):
+    return source_path(json_path) is not None
+
+
+def find_tables(directory, pattern):
+    """
+    directory.glob(pattern) の列形式版（pattern は "*_pairs.json" のような JSON 名）
+    どの形式で書かれていても、基準の <名前>.json のパスを返す
+    """
+    directory = Path(directory)
+    found = set()
+    for suffix in (".json", ".parquet", ".npz"):
+        for p in directory.glob(pattern[:-len(".json")] + suffix):
+            found.add(p.with_suffix(".json"))
+    return sorted(found)
+
+
+def write_table(json_path, data, formats=FORMATS, ensure_ascii=True):
+    """
+    行（dict のリスト）または列（{列名: 値}）を formats の形式で保存する
+    JSON は json_path、列形式は同じ名前の .parquet / .npz
+    """
+    columns = to_columns(data) if isinstance(data, list) else data
+    if "json" in formats:
+        write_json(json_path, columns, ensure_ascii)
+    if "columnar" in formats:
+        # JSON より後に書く（読み込みは新しい方を使うため）
+        write_columnar(Path(json_path).with_suffix(columnar_suffix()), columns)
+
+
+def read_columns(json_path, columns=None):
+    """
+    json_path（または同じ名前の列形式）を読み、{列名: 値} を返す
+    columns を渡すとその列だけ（列形式なら他の列は読まない）
+    """
+    path = source_path(json_path)
+    if path is None:
+        raise FileNotFoundError(json_path)
+    if path.suffix == ".json":
+        return read_json(path, columns)
+    return read_columnar(path, columns)
+
+
+def read_records(json_path, columns=None):
+    return to_records(read_columns(json_path, columns))
+
+
+def read_frame(json_path, columns=None):
+    """
+    pandas.DataFrame として読む（学習用）
+    """
+    import pandas as pd
+    return pd.DataFrame(read_columns(json_path, columns))
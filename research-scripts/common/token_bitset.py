@@ -0,0 +1,245 @@
+# token_bitset.py
+# ファイルごとのトークン集合を、プロジェクト全体の語彙に対するビット集合で表す
+#   Jaccard = popcount(a & b) / popcount(a | b)
+# - 1ペアずつ  : Python の int（任意長）と int.bit_count
+# - まとめて  : uint64 配列に詰めて numpy で popcount
+# 一度作ったビット集合は .npz（uint64 の行）に保存し、元のメタデータが変わらない限り使い回す
+# メモリは ファイル数 × 語彙数 / 8 バイト、1ペアの手間は 語彙数 / 64 に比例するので、
+# 語彙の大きいフィールド（メソッド名など）は疎行列（jaccard_engine）の方が軽い → FieldEngines
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from jaccard_engine import SET_FIELDS, field_values
+
+# ビット集合の作り方や保存形式を変えたら上げる（古いキャッシュは破棄）
+CACHE_VERSION = 2
+
+BATCH_SIZE = 200_000   # packed 版で一度に処理するペア数
+BITSET_MAX_VOCAB = 4096   # 語彙がこれ以下のフィールドだけビット集合にする（1行 64 ワード）
+
+
+def bitset_jaccard(a, b):
+    """
+    int のビット集合2つの Jaccard（どちらも空なら 0.0）
+    """
+    union = (a | b).bit_count()
+    if union == 0:
+        return 0.0
+    return (a & b).bit_count() / union
+
+
+def _popcount(words):
+    if hasattr(np, "bitwise_count"):   # numpy >= 2.0
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    bytes_ = words.view(np.uint8).reshape(*words.shape[:-1], -1)
+    return np.unpackbits(bytes_, axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+def pack_bitsets(bitsets, n_bits):
+    """
+    int のビット集合のリスト → (件数, ワード数) の uint64 配列
+    """
+    n_words = max(1, (n_bits + 63) // 64)
+    buf = b"".join(b.to_bytes(n_words * 8, "little") for b in bitsets)
+    return np.frombuffer(buf, dtype="<u8").reshape(len(bitsets), n_words).copy()
+
+
+def packed_jaccard_pairs(packed, idx_a, idx_b, batch_size=BATCH_SIZE):
+    """
+    packed[idx_a[k]] と packed[idx_b[k]] の Jaccard をまとめて計算
+    """
+    idx_a = np.asarray(idx_a, dtype=np.int64)
+    idx_b = np.asarray(idx_b, dtype=np.int64)
+    out = np.zeros(len(idx_a), dtype=np.float64)
+    for start in range(0, len(idx_a), batch_size):
+        a = packed[idx_a[start:start + batch_size]]
+        b = packed[idx_b[start:start + batch_size]]
+        inter = _popcount(a & b)
+        union = _popcount(a | b)
+        np.divide(inter, union, out=out[start:start + batch_size], where=union > 0)
+    return out
+
+
+class TokenBitsets:
+    """
+    1プロジェクト分のメタデータについて、フィールドごとに
+      vocab[field]  : トークン → ビット位置（初出順）
+      packed(field) : ファイルごとのビット集合（(ファイル数, ワード数) の uint64）
+      bits[field]   : 同じビット集合の int 版（1ペアずつ計算するときに作る）
+    を持つ。JaccardEngine と同じ indices_of / pairs でも使える
+    """
+
+    def __init__(self, file_paths, vocabs, bits=None, packed=None):
+        self.file_paths = file_paths
+        self.index = {f: i for i, f in enumerate(file_paths)}
+        self.vocabs = vocabs
+        self.bits = dict(bits or {})
+        self._packed = dict(packed or {})
+
+    @classmethod
+    def from_metadata(cls, items, fields=SET_FIELDS):
+        vocabs = {}
+        bits = {}
+        for field in fields:
+            vocab = {}
+            column = []
+            for item in items:
+                b = 0
+                for v in field_values(item, field):
+                    b |= 1 << vocab.setdefault(v, len(vocab))
+                column.append(b)
+            vocabs[field] = vocab
+            bits[field] = column
+        return cls([item["file_path"] for item in items], vocabs, bits)
+
+    @property
+    def fields(self):
+        return list(self.vocabs)
+
+    def column(self, field):
+        # int のビット集合（読み込んだキャッシュなら packed から作る）
+        if field not in self.bits:
+            self.bits[field] = [int.from_bytes(row.tobytes(), "little") for row in self._packed[field]]
+        return self.bits[field]
+
+    def encode(self, field, tokens):
+        """
+        任意のトークン列 → ビット集合（語彙にないトークンは無視）
+        """
+        vocab = self.vocabs[field]
+        b = 0
+        for t in tokens:
+            pos = vocab.get(t)
+            if pos is not None:
+                b |= 1 << pos
+        return b
+
+    def jaccard(self, field, file1, file2):
+        column = self.column(field)
+        return bitset_jaccard(column[self.index[file1]], column[self.index[file2]])
+
+    def packed(self, field):
+        if field not in self._packed:
+            self._packed[field] = pack_bitsets(self.bits[field], len(self.vocabs[field]))
+        return self._packed[field]
+
+    # ===== JaccardEngine 互換 =====
+    def indices_of(self, file_paths):
+        return np.array([self.index[f] for f in file_paths], dtype=np.int64)
+
+    def pairs(self, idx_a, idx_b, fields=None):
+        fields = fields or self.fields
+        return {
+            field: packed_jaccard_pairs(self.packed(field), idx_a, idx_b)
+            for field in fields
+        }
+
+    # ===== 保存・読み込み（.npz） =====
+    def to_arrays(self):
+        arrays = {"file_paths": _json_bytes(self.file_paths), "fields": _json_bytes(self.fields)}
+        for k, field in enumerate(self.fields):
+            arrays[f"vocab{k}"] = _json_bytes(list(self.vocabs[field]))     # ビット位置の順
+            arrays[f"packed{k}"] = self.packed(field)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, z):
+        vocabs = {}
+        packed = {}
+        for k, field in enumerate(_from_json_bytes(z["fields"])):
+            vocabs[field] = {t: i for i, t in enumerate(_from_json_bytes(z[f"vocab{k}"]))}
+            packed[field] = z[f"packed{k}"]
+        return cls(_from_json_bytes(z["file_paths"]), vocabs, packed=packed)
+
+
+class FieldEngines:
+    """
+    フィールドごとに別の計算器（TokenBitsets / JaccardEngine）を使う
+    どの計算器も同じメタデータの並びから作ったもの（行番号が共通）であること
+    """
+
+    def __init__(self, engines):
+        self.engines = engines
+        self.index = next(iter(engines.values())).index
+
+    def indices_of(self, file_paths):
+        return np.array([self.index[f] for f in file_paths], dtype=np.int64)
+
+    def pairs(self, idx_a, idx_b, fields=None):
+        fields = fields or self.engines.keys()
+        return {
+            field: self.engines[field].pairs(idx_a, idx_b, [field])[field]
+            for field in fields
+        }
+
+
+def vocab_sizes(items, fields=SET_FIELDS):
+    return {
+        field: len({v for item in items for v in field_values(item, field)})
+        for field in fields
+    }
+
+
+def _json_bytes(value):
+    return np.frombuffer(json.dumps(value, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+
+
+def _from_json_bytes(array):
+    return json.loads(array.tobytes().decode("utf-8"))
+
+
+def _file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_or_build_bitsets(metadata_path, cache_path, items=None, fields=SET_FIELDS):
+    """
+    metadata_path（extract_java_metadata.py の出力）に対応するビット集合を返す
+    cache_path の内容が同じメタデータ・同じフィールドから作られたものなら読み込み、
+    そうでなければ作り直して保存する
+    """
+    metadata_path = Path(metadata_path)
+    cache_path = Path(cache_path)
+    digest = _file_digest(metadata_path)
+
+    if cache_path.exists():
+        try:
+            with np.load(cache_path) as z:
+                cached = {
+                    "version": int(z["version"]),
+                    "source_digest": _from_json_bytes(z["source_digest"]),
+                    "fields": _from_json_bytes(z["fields"]),
+                }
+                if (
+                    cached["version"] == CACHE_VERSION
+                    and cached["source_digest"] == digest
+                    and cached["fields"] == list(fields)
+                ):
+                    return TokenBitsets.from_arrays(z)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    if items is None:
+        with open(metadata_path, encoding="utf-8") as f:
+            items = json.load(f)
+    bitsets = TokenBitsets.from_metadata(items, fields)
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_name(cache_path.stem + ".tmp" + cache_path.suffix)
+    np.savez(
+        tmp,
+        version=np.array(CACHE_VERSION),
+        source_digest=_json_bytes(digest),
+        **bitsets.to_arrays(),
+    )
+    os.replace(tmp, cache_path)
+    return bitsets